@@ -0,0 +1,459 @@
+# Copyright (C) 2025 Protik Das
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Content-addressed incremental backups.
+
+A store directory holds every distinct file content once, as a compressed blob
+named after its SHA-256 (objects/ab/cdef...), plus one JSON manifest per snapshot
+(snapshots/*.json) mapping archive names to blob hashes. A new snapshot only
+hashes files whose size or mtime changed since the previous snapshot and only
+writes blobs the store does not already have.
+"""
+
+import os
+import stat
+import json
+import zlib
+import uuid
+import struct
+import zipfile
+import hashlib
+import datetime
+import threading
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import fastcopy
+
+CHUNK_SIZE = 1024 * 1024
+SNAPSHOT_RETENTION = 7
+# Every full ZIP is a whole copy of the working folder, so only a few are kept.
+ZIP_BACKUP_RETENTION = 3
+# Scheduled backups always go to the incremental store (one full copy plus deltas) under
+# their own label and retention, so frequent runs cannot rotate manual backups out.
+AUTO_BACKUP_RETENTION = 24
+AUTO_BACKUP_PREFIX = "Auto"
+# Throughput cap for scheduled backups, so they stay out of the way of interactive work.
+AUTO_BACKUP_BYTES_PER_SECOND = 8 * 1024 * 1024
+
+class BackupCancelled(Exception):
+    pass
+
+class IOThrottle:
+    """
+    Keeps the average rate of consume() calls under bytes_per_second by sleeping.
+    Safe to share between worker threads. cancel() makes the next consume() raise
+    BackupCancelled, which is how a backup is stopped early; with bytes_per_second
+    None nothing is slowed down and the throttle only carries that cancellation.
+    """
+    def __init__(self, bytes_per_second):
+        self.bytes_per_second = bytes_per_second
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._consumed = 0
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def consume(self, nbytes):
+        if self._cancelled.is_set(): raise BackupCancelled()
+        if self.bytes_per_second is None: return
+        with self._lock:
+            self._consumed += nbytes
+            delay = self._started + self._consumed / self.bytes_per_second - time.monotonic()
+        # Sleep on the event so a cancel wakes the worker immediately.
+        if delay > 0 and self._cancelled.wait(delay): raise BackupCancelled()
+
+# --- Compression policy by file type ---
+# Formats that are already compressed gain nothing from deflate; they are stored as-is.
+STORED_EXTENSIONS = {
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".tif", ".tiff",
+    ".zip", ".7z", ".rar", ".gz", ".bz2", ".xz",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp",
+    ".mp3", ".mp4", ".mov", ".avi", ".mkv",
+}
+# Plain text shrinks a lot and is small; spend more effort on it.
+TEXT_EXTENSIONS = {".txt", ".csv", ".json", ".xml", ".html", ".htm", ".log", ".md", ".rtf", ".qss"}
+DEFAULT_LEVEL = 6
+TEXT_LEVEL = 9
+
+def compression_level_for(file_path):
+    """ zlib level for a file: 0 (store) for compressed formats, 9 for text, 6 otherwise. """
+    suffix = Path(file_path).suffix.lower()
+    if suffix in STORED_EXTENSIONS: return 0
+    if suffix in TEXT_EXTENSIONS: return TEXT_LEVEL
+    return DEFAULT_LEVEL
+
+def default_worker_count():
+    return max(1, min(8, os.cpu_count() or 1))
+
+# Compressed members up to this size stay in memory while they wait to be written.
+SPOOL_IN_MEMORY = 8 * 1024 * 1024
+
+def _deflate_member(file_path, level, throttle=None):
+    """ Raw-deflates a file into a spooled temp file, as a ZIP member holds it. Returns (spool, crc, size). """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_IN_MEMORY)
+    crc = size = 0
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                if throttle: throttle.consume(len(chunk))
+                crc = zlib.crc32(chunk, crc); size += len(chunk)
+                spool.write(compressor.compress(chunk))
+        spool.write(compressor.flush())
+    except BaseException:
+        spool.close()
+        raise
+    return spool, crc, size
+
+def _write_deflated_member(zipf, file_path, arcname, spool, crc, size):
+    """
+    Appends an already deflated member. zipfile has no public call for this, so it
+    does what ZipFile.open(..., 'w') does, with the sizes and CRC known up front.
+    """
+    zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.flag_bits = 0
+    zinfo.CRC, zinfo.file_size, zinfo.compress_size = crc, size, spool.tell()
+    zipf.fp.seek(zipf.start_dir)
+    zinfo.header_offset = zipf.fp.tell()
+    zipf._writecheck(zinfo)
+    zipf._didModify = True
+    zipf.fp.write(zinfo.FileHeader(zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT))
+    spool.seek(0)
+    for chunk in iter(lambda: spool.read(CHUNK_SIZE), b''):
+        zipf.fp.write(chunk)
+    zipf.start_dir = zipf.fp.tell()
+    zipf.filelist.append(zinfo)
+    zipf.NameToInfo[zinfo.filename] = zinfo
+
+def write_zip_backup(files_to_backup, zip_path, progress=None, throttle=None, max_workers=None):
+    """
+    Writes a ZIP backup choosing the method per member: ZIP_STORED for already
+    compressed formats, ZIP_DEFLATED at the type's level for everything else.
+    Members to deflate are compressed ahead on a thread pool (zlib releases the
+    GIL) and written in order; stored members are copied straight in. A partially
+    written archive is removed if writing fails or is cancelled.
+    """
+    total_files = len(files_to_backup) or 1
+    workers = max_workers or default_worker_count()
+    pending = {}   # index -> future; at most a couple per worker, so spooled output stays bounded
+    next_to_submit = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool, zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            try:
+                for i, (file_path, arcname) in enumerate(files_to_backup):
+                    while next_to_submit < len(files_to_backup) and len(pending) < workers * 2:
+                        path, _ = files_to_backup[next_to_submit]
+                        level = compression_level_for(path)
+                        if level: pending[next_to_submit] = pool.submit(_deflate_member, path, level, throttle)
+                        next_to_submit += 1
+                    if i in pending:
+                        spool, crc, size = pending.pop(i).result()
+                        with spool: _write_deflated_member(zipf, file_path, arcname, spool, crc, size)
+                    else:
+                        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+                        zinfo.compress_type = zipfile.ZIP_STORED
+                        # Copied chunk by chunk so a cancel stops even a large file part-way.
+                        with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+                            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                                if throttle: throttle.consume(len(chunk))
+                                dst.write(chunk)
+                    if progress: progress(int(((i + 1) / total_files) * 100))
+            except BaseException:
+                for future in pending.values(): future.cancel()
+                for future in pending.values():
+                    if not future.cancelled() and future.exception() is None: future.result()[0].close()
+                raise
+    except BaseException:
+        Path(zip_path).unlink(missing_ok=True)
+        raise
+
+def hash_file(file_path, digest=None):
+    """ Returns the hex digest of a file, read in chunks (SHA-256 unless another hasher is given). """
+    digest = digest or hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class Crc32:
+    """ hashlib-style wrapper around zlib.crc32, matching the checksum ZIP members carry. """
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+class IncrementalBackupStore:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.snapshots_dir = self.root / "snapshots"
+
+    # --- Blobs ---
+    def blob_path(self, digest):
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def has_blob(self, digest):
+        return self.blob_path(digest).exists()
+
+    def put_blob(self, file_path, digest):
+        """
+        Compresses file_path into the store under digest (written to a temp file, then renamed into place).
+        Already-compressed types use zlib level 0, i.e. stored blocks, so every blob reads back the same way.
+        """
+        target = self.blob_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Unique temp name: two workers may store identical content at the same time.
+        tmp_path = target.with_name(f"{target.name}.{uuid.uuid4().hex}.tmp")
+        compressor = zlib.compressobj(compression_level_for(file_path))
+        with open(file_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                dst.write(compressor.compress(chunk))
+            dst.write(compressor.flush())
+        os.replace(tmp_path, target)
+
+    def iter_blob(self, digest):
+        """ Yields the decompressed content of a blob in chunks. """
+        decompressor = zlib.decompressobj()
+        with open(self.blob_path(digest), 'rb') as src:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+
+    def extract_blob(self, digest, destination):
+        """ Decompresses a blob to destination, creating parent folders as needed. """
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        with open(destination, 'wb') as dst:
+            for chunk in self.iter_blob(digest):
+                dst.write(chunk)
+
+    # --- Snapshots ---
+    def list_snapshots(self, label=None):
+        """ Snapshot manifests, oldest first, optionally only those recorded under `label`. """
+        if not self.snapshots_dir.exists(): return []
+        pattern = f"Snapshot_{label}_*.json" if label else "Snapshot_*.json"
+        # Names end in a sortable timestamp, whatever label precedes it.
+        return sorted(self.snapshots_dir.glob(pattern), key=lambda p: p.stem[-19:])
+
+    def load_manifest(self, manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _ingest(self, file_path, throttle=None):
+        if throttle: throttle.consume(os.path.getsize(file_path))
+        digest = hash_file(file_path)
+        if not self.has_blob(digest): self.put_blob(file_path, digest)
+        return digest
+
+    def create_snapshot(self, files_to_backup, label, progress=None, max_workers=None, throttle=None):
+        """
+        Records a snapshot of files_to_backup, a list of (path, arcname) pairs.
+        Files whose size and mtime match the previous snapshot reuse its hash
+        without being read again; the rest are hashed and compressed on a thread
+        pool (hashlib and zlib release the GIL). Returns the manifest path.
+        """
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        snapshots = self.list_snapshots()
+        previous_files = self.load_manifest(snapshots[-1]).get("files", {}) if snapshots else {}
+
+        files = {}
+        changed = []
+        for file_path, arcname in files_to_backup:
+            stat = os.stat(file_path)
+            previous = previous_files.get(arcname)
+            if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns and self.has_blob(previous["sha256"]):
+                files[arcname] = {"sha256": previous["sha256"], "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            else:
+                changed.append((file_path, arcname, stat))
+
+        total_files = len(files_to_backup) or 1
+        done = len(files)
+        if progress: progress(int((done / total_files) * 100))
+        with ThreadPoolExecutor(max_workers=max_workers or default_worker_count()) as pool:
+            futures = {pool.submit(self._ingest, file_path, throttle): (arcname, stat) for file_path, arcname, stat in changed}
+            for future in as_completed(futures):
+                arcname, stat = futures[future]
+                files[arcname] = {"sha256": future.result(), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                done += 1
+                if progress: progress(int((done / total_files) * 100))
+
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        manifest_path = self.snapshots_dir / f"Snapshot_{label}_{timestamp}.json"
+        manifest = {"created": datetime.datetime.now(datetime.timezone.utc).isoformat(), "label": label, "files": files}
+        tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, manifest_path)
+        return manifest_path
+
+    def materialize(self, manifest_path, target_dir, progress=None):
+        """ Recreates every file of a snapshot under target_dir, laid out by archive name. """
+        files = self.load_manifest(manifest_path).get("files", {})
+        total_files = len(files) or 1
+        for i, (arcname, entry) in enumerate(files.items()):
+            self.extract_blob(entry["sha256"], Path(target_dir) / arcname)
+            if progress: progress(int(((i + 1) / total_files) * 100))
+
+    # --- Retention ---
+    def prune(self, keep=SNAPSHOT_RETENTION, label=None):
+        """ Deletes all but the newest `keep` snapshots (of `label` only, if given), then removes blobs no snapshot refers to. """
+        for old_manifest in self.list_snapshots(label)[:-keep]:
+            old_manifest.unlink()
+        self.collect_garbage()
+
+    def collect_garbage(self):
+        referenced = set()
+        for manifest_path in self.list_snapshots():
+            referenced.update(entry["sha256"] for entry in self.load_manifest(manifest_path).get("files", {}).values())
+        if not self.objects_dir.exists(): return 0
+        removed = 0
+        for shard in self.objects_dir.iterdir():
+            if not shard.is_dir(): continue
+            for blob in shard.iterdir():
+                if shard.name + blob.name not in referenced:
+                    blob.unlink(); removed += 1
+        return removed
+
+# --- Streaming restore ---
+class ZipBackupSource:
+    """ Restore source over a ZIP backup. Members are checked against the CRC-32 stored in the archive. """
+    def __init__(self, zip_path):
+        self.zip_path = Path(zip_path)
+        self.zipf = zipfile.ZipFile(zip_path, 'r')
+        self.members = {info.filename: info for info in self.zipf.infolist() if not info.is_dir()}
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.zipf.close()
+
+    def arcnames(self): return list(self.members)
+    def size_of(self, arcname): return self.members[arcname].file_size
+    def checksum_of(self, arcname): return f"{self.members[arcname].CRC:08x}"
+    def new_hasher(self): return Crc32()
+
+    def iter_chunks(self, arcname):
+        with self.zipf.open(arcname) as src:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b''):
+                yield chunk
+
+    def stored_range(self, arcname):
+        """
+        (archive path, offset, size) of a member kept uncompressed (ZIP_STORED, not
+        encrypted), whose bytes can be copied straight out of the archive; else None.
+        """
+        info = self.members[arcname]
+        if info.compress_type != zipfile.ZIP_STORED or info.flag_bits & 0x1: return None
+        with open(self.zip_path, 'rb') as f:
+            f.seek(info.header_offset)
+            header = f.read(30)
+        if len(header) < 30 or header[:4] != b'PK\x03\x04': return None
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        return self.zip_path, info.header_offset + 30 + name_length + extra_length, info.file_size
+
+class SnapshotBackupSource:
+    """ Restore source over an incremental snapshot manifest (<store>/snapshots/*.json). Files are checked by SHA-256. """
+    def __init__(self, manifest_path):
+        self.store = IncrementalBackupStore(Path(manifest_path).parent.parent)
+        self.files = self.store.load_manifest(manifest_path).get("files", {})
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): pass
+
+    def arcnames(self): return list(self.files)
+    def size_of(self, arcname): return self.files[arcname]["size"]
+    def checksum_of(self, arcname): return self.files[arcname]["sha256"]
+    def new_hasher(self): return hashlib.sha256()
+
+    def iter_chunks(self, arcname):
+        return self.store.iter_blob(self.files[arcname]["sha256"])
+
+    def stored_range(self, arcname):
+        return None  # blobs are always zlib streams
+
+def open_backup_source(backup_path):
+    """ Picks the restore source for a backup file: .json is a snapshot manifest, anything else a ZIP. """
+    if str(backup_path).lower().endswith('.json'):
+        return SnapshotBackupSource(backup_path)
+    return ZipBackupSource(backup_path)
+
+def _clear_destination(destination):
+    """
+    Removes a file that is about to be replaced if it is hardlinked or read-only, as
+    project documents linked to the blob store are. The link is broken rather than
+    written through, and Windows refuses to replace a read-only file.
+    """
+    try: st = os.stat(destination)
+    except FileNotFoundError: return
+    if st.st_nlink <= 1 and st.st_mode & stat.S_IWUSR: return
+    try:
+        os.unlink(destination)
+    except PermissionError:
+        os.chmod(destination, stat.S_IMODE(st.st_mode) | stat.S_IWUSR)
+        os.unlink(destination)
+
+def restore_members(source, targets, progress=None):
+    """
+    Streams members of a backup straight to their final location.
+    targets maps archive names to destination paths. A destination whose size and
+    checksum already match the backup is left untouched; anything else is written
+    to a temp file beside it, verified, then renamed into place, so an interrupted
+    restore never leaves a half-written file. Returns (written, skipped) path lists.
+    """
+    written, skipped = [], []
+    total_files = len(targets) or 1
+    for i, (arcname, destination) in enumerate(targets.items()):
+        destination = Path(destination)
+        expected = source.checksum_of(arcname)
+        if destination.is_file() and destination.stat().st_size == source.size_of(arcname) \
+                and hash_file(destination, source.new_hasher()) == expected:
+            skipped.append(destination)
+        else:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = destination.with_name(f"{destination.name}.{uuid.uuid4().hex}.restore")
+            stored = source.stored_range(arcname)
+            try:
+                if stored:
+                    # Uncompressed members are byte-for-byte in the archive; let the kernel copy
+                    # them, then verify the result (read back from the page cache).
+                    archive_path, offset, size = stored
+                    with open(archive_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                        fastcopy.copy_range(src.fileno(), dst.fileno(), offset, size)
+                    actual = hash_file(tmp_path, source.new_hasher())
+                else:
+                    hasher = source.new_hasher()
+                    with open(tmp_path, 'wb') as dst:
+                        for chunk in source.iter_chunks(arcname):
+                            hasher.update(chunk)
+                            dst.write(chunk)
+                    actual = hasher.hexdigest()
+                if actual != expected:
+                    raise IOError(f"Checksum mismatch for '{arcname}'; the backup may be damaged.")
+                _clear_destination(destination)
+                os.replace(tmp_path, destination)
+            finally:
+                if tmp_path.exists(): tmp_path.unlink()
+            written.append(destination)
+        if progress: progress(int(((i + 1) / total_files) * 100))
+    return written, skipped
@@ -92,3 +92,18 @@ initial_project_data_template = {
   'vendorPayments': [],
   'projectFolderPath': '', 'createdAt': '', 'updatedAt': '',
 }
+
+# Scalar copies of frequently searched values that otherwise live inside the JSON
+# section columns. Each entry maps column -> (source section, SQL type, SQL expression).
+# They are recomputed in SQL whenever their source section is written. Every expression
+# is guarded with json_valid(), so one corrupt section yields NULL instead of failing the update.
+DERIVED_PROJECT_COLUMNS = {
+    "workOrderId": ("proposalOrderDetails", "TEXT", "CASE WHEN json_valid(proposalOrderDetails) THEN json_extract(proposalOrderDetails, '$.departmentWorkOrderId') END"),
+    "proposalId": ("proposalOrderDetails", "TEXT", "CASE WHEN json_valid(proposalOrderDetails) THEN json_extract(proposalOrderDetails, '$.officeProposalId') END"),
+    "vendorName": ("oemVendorDetails", "TEXT", "CASE WHEN json_valid(oemVendorDetails) THEN json_extract(oemVendorDetails, '$.vendorName') END"),
+    "bomTotal": ("billOfMaterials", "REAL", "CASE WHEN json_valid(billOfMaterials) THEN (SELECT IFNULL(SUM(json_extract(value, '$.total')), 0) FROM json_each(billOfMaterials, '$.items')) END"),
+    "amountPending": ("financialDetails", "REAL", "CASE WHEN json_valid(financialDetails) THEN json_extract(financialDetails, '$.totalAmountPending') END"),
+}
+
+# Columns on the projects table that get a B-tree index.
+INDEXED_PROJECT_COLUMNS = ["status", "departmentId", "projectLead", "updatedAt"] + list(DERIVED_PROJECT_COLUMNS)
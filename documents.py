@@ -0,0 +1,741 @@
+# Copyright (C) 2025 Protik Das
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Document ingestion: copies attachments into project folders on a worker pool.
+
+Pages hand the service a list of (source, destination) pairs and a callback.
+Copies run off the GUI thread; each result is delivered back on the GUI thread
+as it completes, so a page only adds a document to its lists once the file is
+actually in the project folder.
+
+With a DocumentBlobStore attached, every file is stored once per working folder
+under its SHA-256 and the project folders receive reflinks or hardlinks of it.
+
+ThumbnailCache renders downscaled previews of attachments (images, and the first
+page of PDFs when PyMuPDF is available) on its own pool and keeps them on disk.
+"""
+
+import os
+import sys
+import stat
+import hashlib
+import threading
+import uuid
+import datetime
+import mimetypes
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, pyqtSignal, Qt, QSize
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+from PyQt6.QtWidgets import QProgressDialog, QMessageBox
+
+import fastcopy
+
+try:
+    import fitz  # PyMuPDF, for PDF first pages
+except ImportError:
+    fitz = None
+
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_WORKERS = 4
+BLOB_STORE_DIR = "_document_store"
+# Blobs are shared by every project that links them, so nothing may edit one in place.
+BLOB_MODE = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+THUMBNAIL_SIZE = 480                       # longest edge, in pixels
+THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024   # disk budget before least-recently-used thumbnails are evicted
+THUMBNAIL_MEMORY_ENTRIES = 64              # decoded pixmaps kept for instant redisplay
+THUMBNAIL_WORKERS = 2
+
+IngestionCancelled = fastcopy.CopyCancelled
+
+def _temp_path_for(destination):
+    return destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.part")
+
+def copy_document(source, destination, cancelled=None, digest=None):
+    """
+    Copies source to destination through fastcopy, checking `cancelled` (a threading.Event)
+    as it goes; `digest` (a hashlib object) receives the copied content. The data goes to a
+    temp file that is renamed into place, so a failed or cancelled copy never leaves a
+    truncated document behind.
+    """
+    source, destination = Path(source), Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _temp_path_for(destination)
+    try:
+        fastcopy.copy_file(source, tmp_path, cancelled, digest)
+        os.replace(tmp_path, destination)
+    finally:
+        if tmp_path.exists(): tmp_path.unlink()
+
+def _make_writable(path):
+    os.chmod(path, stat.S_IMODE(os.stat(path).st_mode) | stat.S_IWUSR)
+
+def remove_document(path, missing_ok=False):
+    """
+    Deletes a document from a project folder. Hardlinks into the blob store are
+    read-only, which Windows refuses to delete until the attribute is cleared.
+    """
+    path = Path(path)
+    try:
+        path.unlink(missing_ok=missing_ok)
+    except PermissionError:
+        if sys.platform != "win32" or not path.exists(): raise
+        _make_writable(path)
+        path.unlink()
+
+def sha256_of(path, cancelled=None):
+    """ SHA-256 hex digest of a file, read in chunks; `cancelled` is checked between chunks. """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            if cancelled is not None and cancelled.is_set(): raise IngestionCancelled()
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def project_file_entry(original_file, destination_path, project_folder, sha256=None):
+    """ The doc-list entry for a file copied into a project folder. """
+    entry = {'name': Path(original_file).name, 'path': str(Path(destination_path).relative_to(project_folder)), 'type': 'project_file'}
+    if sha256: entry['sha256'] = sha256
+    return entry
+
+# ========================================================================
+# Class: DocumentBlobStore
+# ========================================================================
+class DocumentBlobStore:
+    """
+    Content-addressed attachment store for one working folder: objects/ab/cdef...
+    keyed by SHA-256. Adding a file that is already stored costs one read to hash
+    it and no copy; the project folder gets a link to the existing blob.
+    """
+    def __init__(self, root):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+
+    def blob_path(self, digest):
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def add(self, source, cancelled=None):
+        """
+        Stores source if its content is new and returns its SHA-256. New blobs are
+        made read-only. An existing blob is only reused once it checks out; one that
+        was altered anyway is replaced by a fresh copy of source.
+        """
+        digest = sha256_of(source, cancelled)
+        blob = self.blob_path(digest)
+        if not self._blob_intact(blob, digest, os.path.getsize(source), cancelled):
+            # Windows cannot replace a read-only file.
+            if blob.exists(): _make_writable(blob)
+            copy_document(source, blob, cancelled)
+            os.chmod(blob, BLOB_MODE)
+        return digest
+
+    def _blob_intact(self, blob, digest, size, cancelled=None):
+        """ False if the blob is missing or its content no longer matches its name. """
+        try: blob_stat = blob.stat()
+        except FileNotFoundError: return False
+        if blob_stat.st_size != size: return False
+        if blob_stat.st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH):
+            # Writable (stored before blobs were locked, restored, or unlocked by hand): it may
+            # have been edited through a linked project file, so check it before linking it again.
+            if sha256_of(blob, cancelled) != digest: return False
+            os.chmod(blob, BLOB_MODE)
+        return True
+
+    def materialize(self, digest, destination, cancelled=None):
+        """ Places the blob at destination as a reflink, hardlink or, failing both, a copy. """
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _temp_path_for(destination)
+        try:
+            # Only a hardlink must stay read-only; a reflink or a copy is the project's own file.
+            if fastcopy.link_or_copy(self.blob_path(digest), tmp_path, cancelled) != "hardlink":
+                _make_writable(tmp_path)
+            os.replace(tmp_path, destination)
+        finally:
+            if tmp_path.exists(): tmp_path.unlink()
+
+# ========================================================================
+# Class: IngestionJob
+# ========================================================================
+class IngestionJob(QObject):
+    """ One batch of copies. Lives on the GUI thread; its signals fire there. """
+    progress = pyqtSignal(int, str)   # files resolved so far, name of the last one
+    finished = pyqtSignal()
+
+    def __init__(self, copies, on_file_done, parent=None, record_as=None):
+        super().__init__(parent)
+        self.copies = list(copies)
+        self.on_file_done = on_file_done
+        # (project id, section) whose documents rows the copies get; a project not saved yet has none.
+        self.record_as = record_as if record_as and record_as[0] is not None else None
+        self.done = 0                     # copies resolved in any way
+        self.processed = 0                # copies reported to on_file_done (succeeded or failed)
+        self.failed = []                  # (source, error message)
+        self.futures = []
+        # Copies finish in any order; results wait here until every earlier copy has
+        # been reported, so on_file_done always sees the files in input order.
+        self.resolved = {}                # input index -> (source, destination, error, sha256)
+        self.next_to_report = 0
+        self.cancel_event = threading.Event()
+
+    @property
+    def total(self):
+        return len(self.copies)
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """ Stops the batch: queued copies are dropped and running ones abort at their next chunk. """
+        self.cancel_event.set()
+        for future in self.futures: future.cancel()
+
+# ========================================================================
+# Class: DocumentIngestionService
+# ========================================================================
+class DocumentIngestionService(QObject):
+    """
+    Shared copy pool for every attachment handler. Owned by the main window;
+    call shutdown() before the application exits.
+    """
+    _resolved = pyqtSignal(object, int, object, object, object, object)   # job, input index, source, destination, sha256, error (None on success)
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, parent=None):
+        super().__init__(parent)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="document-ingest")
+        self.jobs = set()
+        self.blob_store = None
+        self.recorder = None
+        # Emitted from pool threads, delivered on the GUI thread.
+        self._resolved.connect(self._on_resolved, Qt.ConnectionType.QueuedConnection)
+
+    def ingest(self, copies, on_file_done, record_as=None):
+        """
+        Starts copying (source, destination) pairs. on_file_done(source, destination, error, sha256)
+        runs on the GUI thread for each copy, in input order; error is None on success and a
+        message if that copy failed, sha256 is the digest of the copied file (recorded in
+        the documents table). Cancelled copies are not reported. With record_as, a
+        (project id, section) pair, each completed copy is also passed to the recorder
+        before on_file_done sees it. Returns the job.
+        """
+        job = IngestionJob(copies, on_file_done, self, record_as)
+        if not job.copies: return job
+        self.jobs.add(job)
+        for index, (source, destination) in enumerate(job.copies):
+            future = self.executor.submit(self._copy, job, index, Path(source), Path(destination))
+            future.add_done_callback(lambda f, i=index, s=Path(source), d=Path(destination): self._on_future_done(f, job, i, s, d))
+            job.futures.append(future)
+        return job
+
+    def ingest_with_progress(self, parent, copies, on_file_done, on_finished=None, failure_note="", record_as=None):
+        """
+        ingest() behind a window-modal progress dialog with a Cancel button. The GUI
+        keeps running while files copy. Failures are reported together at the end.
+        on_finished(job) runs once every copy has completed, failed or been cancelled.
+        """
+        dialog = QProgressDialog("Copying documents...", "Cancel", 0, len(copies), parent)
+        dialog.setWindowTitle("Adding Documents")
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        # Shown at once: the dialog is what keeps the user on this project until the
+        # copies have been recorded against it.
+        dialog.setMinimumDuration(0)
+        dialog.setValue(0)
+        job = self.ingest(copies, on_file_done, record_as)
+
+        def update_progress(done, name):
+            dialog.setValue(done)
+            dialog.setLabelText(f"Copied {name} ({done} of {job.total})")
+
+        def finish():
+            dialog.reset(); dialog.deleteLater()
+            if job.failed:
+                details = "\n".join(f"{Path(source).name}: {error}" for source, error in job.failed)
+                QMessageBox.critical(parent, "File Copy Error", f"Could not copy {len(job.failed)} file(s):\n{details}{failure_note}")
+            if on_finished: on_finished(job)
+
+        dialog.canceled.connect(job.cancel)
+        job.progress.connect(update_progress)
+        job.finished.connect(finish)
+        if job not in self.jobs: finish()   # nothing to copy
+        return job
+
+    def set_blob_store(self, blob_store):
+        """ Enables (a DocumentBlobStore) or disables (None) deduplicated storage for new attachments. """
+        self.blob_store = blob_store
+
+    def set_recorder(self, recorder):
+        """ recorder(project_id, section, source, destination, sha256) writes the documents row of a completed copy. """
+        self.recorder = recorder
+
+    def shutdown(self):
+        """ Cancels every running job and waits for the pool to stop. """
+        for job in list(self.jobs): job.cancel()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def _copy(self, job, index, source, destination):
+        blob_store, digest = self.blob_store, None
+        try:
+            if blob_store is not None:
+                digest = blob_store.add(source, job.cancel_event)
+                blob_store.materialize(digest, destination, job.cancel_event)
+            else:
+                # Hashed during the copy (or straight after it, from the page cache) so the metadata index needn't read it later.
+                hasher = hashlib.sha256()
+                copy_document(source, destination, job.cancel_event, hasher)
+                digest = hasher.hexdigest()
+            error = None
+        except Exception as e:
+            error = e
+        self._resolved.emit(job, index, source, destination, digest, error)
+
+    def _on_future_done(self, future, job, index, source, destination):
+        # A copy cancelled before it started never runs _copy; account for it here.
+        if future.cancelled(): self._resolved.emit(job, index, source, destination, None, IngestionCancelled())
+
+    def _report(self, job, source, destination, error, digest):
+        if isinstance(error, IngestionCancelled):
+            return
+        job.processed += 1
+        if error is not None:
+            job.failed.append((source, str(error)))
+            job.on_file_done(source, destination, str(error), None)
+        else:
+            # Includes copies that completed just before a cancel; the file is in place, so it is kept.
+            if job.record_as and self.recorder: self.recorder(*job.record_as, source, destination, digest)
+            job.on_file_done(source, destination, None, digest)
+
+    def _on_resolved(self, job, index, source, destination, digest, error):
+        if job not in self.jobs: return
+        job.done += 1
+        job.resolved[index] = (source, destination, error, digest)
+        while job.next_to_report in job.resolved:
+            self._report(job, *job.resolved.pop(job.next_to_report))
+            job.next_to_report += 1
+        job.progress.emit(job.done, source.name)
+        if job.done >= job.total:
+            self.jobs.discard(job)
+            job.finished.emit()
+
+# --- Integrity scanning ---
+MISSING = "missing"
+CHANGED = "changed"
+OK = "ok"
+# Folders of a working folder that never hold project documents.
+SCAN_EXCLUDED_DIRS = {"backups", BLOB_STORE_DIR}
+
+def _path_key(path):
+    return os.path.normcase(os.path.abspath(str(path)))
+
+def iter_document_references(value):
+    """ Yields every document entry (a dict with 'path' and 'type') nested anywhere in a project section. """
+    if isinstance(value, dict):
+        if isinstance(value.get('path'), str) and isinstance(value.get('type'), str):
+            yield value
+        for child in value.values():
+            if isinstance(child, (dict, list)): yield from iter_document_references(child)
+    elif isinstance(value, list):
+        for child in value:
+            if isinstance(child, (dict, list)): yield from iter_document_references(child)
+
+def resolve_document_path(project_folder, doc):
+    """ Absolute path of a doc entry, or None if it does not point at a file. """
+    doc_type, path = doc.get('type', ''), doc.get('path')
+    if not path: return None
+    if doc_type == 'project_file':
+        return Path(project_folder) / path if project_folder else None
+    if doc_type.startswith('local_file_link'):
+        return Path(path)
+    return None
+
+def _scan_tree(root, files, cancelled=None):
+    """ One os.scandir pass over root, recording (size, mtime_ns) of every file. `cancelled` is checked per folder. """
+    pending = [str(root)]
+    while pending:
+        if cancelled is not None and cancelled.is_set(): raise IngestionCancelled()
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not (directory == str(root) and entry.name in SCAN_EXCLUDED_DIRS):
+                                pending.append(entry.path)
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            files[_path_key(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+def _inside_any(key, folders):
+    """ True if the path key lies somewhere below one of folders (a set of path keys). """
+    parent = os.path.dirname(key)
+    while parent not in folders:
+        up = os.path.dirname(parent)
+        if up == parent: return False
+        parent = up
+    return True
+
+class DocumentIndex:
+    """
+    Result of an integrity scan: the size/mtime of every document file plus the
+    problems found. Views look statuses up here instead of touching the disk.
+    """
+    def __init__(self, files=None, missing=None, changed=None, orphans=None, scanned_at=None, references=None):
+        self.files = files or {}          # path key -> (size, mtime_ns)
+        self.references = references or []  # (project id, section, doc entry, path)
+        self.missing = missing or []      # (project id, doc name, path)
+        self.changed = changed or []      # (project id, doc name, path)
+        self.orphans = orphans or []      # paths inside project folders that no project references
+        self.scanned_at = scanned_at
+        self._missing_keys = {_path_key(path) for _, _, path in self.missing}
+        self._changed_keys = {_path_key(path) for _, _, path in self.changed}
+
+    def status(self, path):
+        """ MISSING, CHANGED or OK for a scanned path; None if the last scan did not cover it. """
+        key = _path_key(path)
+        if key in self._missing_keys: return MISSING
+        if key in self._changed_keys: return CHANGED
+        if key in self.files: return OK
+        return None
+
+    def status_of(self, project_folder, doc):
+        full_path = resolve_document_path(project_folder, doc)
+        return self.status(full_path) if full_path else None
+
+def scan_documents(working_folder, projects, previous=None, cancelled=None):
+    """
+    Checks every document reference of `projects` (an iterable of (project id,
+    project folder, project data)) against the disk. The working folder is read in a
+    single scandir pass and each folder of external links is listed once, so no
+    per-document stat calls are made. Files whose size or mtime differ from the
+    previous index are reported as changed. Returns a DocumentIndex. Setting
+    `cancelled` (a threading.Event) stops the walk with IngestionCancelled.
+    """
+    files = {}
+    if working_folder and Path(working_folder).is_dir():
+        _scan_tree(working_folder, files, cancelled)
+
+    references = []
+    project_folders = set()
+    for project_id, project_folder, project in projects:
+        if project_folder: project_folders.add(_path_key(project_folder))
+        for section, value in project.items():
+            for doc in iter_document_references(value):
+                full_path = resolve_document_path(project_folder, doc)
+                if full_path: references.append((project_id, section, doc, full_path))
+
+    # Links outside the working folder: list each of their folders once.
+    listed = set()
+    for _, _, _, full_path in references:
+        key = _path_key(full_path)
+        parent = os.path.dirname(key)
+        if key in files or parent in listed: continue
+        if cancelled is not None and cancelled.is_set(): raise IngestionCancelled()
+        listed.add(parent)
+        try:
+            with os.scandir(parent) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files[_path_key(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+        except OSError:
+            pass
+
+    missing, changed, referenced = [], [], set()
+    previous_files = previous.files if previous else {}
+    for project_id, _, doc, full_path in references:
+        key = _path_key(full_path)
+        name = doc.get('name', full_path.name)
+        referenced.add(key)
+        if key not in files:
+            missing.append((project_id, name, full_path))
+        elif key in previous_files and previous_files[key] != files[key]:
+            changed.append((project_id, name, full_path))
+
+    orphans = []
+    for key in files:
+        if key in referenced or os.path.basename(key).startswith('.'): continue
+        if _inside_any(key, project_folders): orphans.append(Path(key))
+    return DocumentIndex(files, missing, changed, sorted(orphans), datetime.datetime.now(), references)
+
+# --- Document metadata table ---
+def init_documents_table(cursor):
+    """ One row per file referenced by a project section, with its size, hash, mtime and MIME type. """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS documents (
+        projectId INTEGER NOT NULL,
+        section TEXT NOT NULL,
+        path TEXT NOT NULL,
+        name TEXT,
+        type TEXT,
+        size INTEGER,
+        sha256 TEXT,
+        mtimeNs INTEGER,
+        mimeType TEXT,
+        indexedAt TEXT,
+        PRIMARY KEY (projectId, section, path)
+    )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents (sha256)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_path ON documents (path)")
+
+def load_document_baseline(cursor):
+    """ DocumentIndex holding the size/mtime last recorded for each file, to detect changes across sessions. """
+    return DocumentIndex(files={path: (size, mtime_ns) for path, size, mtime_ns in cursor.execute("SELECT path, size, mtimeNs FROM documents")})
+
+_DOCUMENT_ROW_UPSERT = ("INSERT OR REPLACE INTO documents (projectId, section, path, name, type, size, sha256, mtimeNs, mimeType, indexedAt) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+def record_document_row(conn, project_id, section, name, full_path, sha256):
+    """
+    Writes the row of a file that has just been copied into a project, so the next
+    scan finds it current instead of hashing it. If the doc entry is never saved,
+    that scan removes the row again with the other stale references.
+    """
+    stat = os.stat(full_path)
+    path = _path_key(full_path)
+    with conn:
+        conn.execute(_DOCUMENT_ROW_UPSERT, (project_id, section, path, name, 'project_file', stat.st_size, sha256, stat.st_mtime_ns,
+                                            mimetypes.guess_type(path)[0], datetime.datetime.now(datetime.timezone.utc).isoformat()))
+
+def refresh_document_rows(conn, index, cancelled=None):
+    """
+    Brings the documents table in line with a scan. Rows are rewritten only for
+    files that are new or whose size or mtime moved; their hash comes from the doc
+    entry (recorded at ingestion) when the file is new, otherwise it is recomputed.
+    Rows of missing files and of references that no longer exist are removed.
+    If `cancelled` is set the work done so far is kept. Returns the rows written.
+    """
+    existing = {(row[0], row[1], row[2]): row[3:] for row in conn.execute("SELECT projectId, section, path, size, mtimeNs, sha256 FROM documents")}
+    known_hashes = {(key[2], size, mtime_ns): sha for key, (size, mtime_ns, sha) in existing.items() if sha}
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+    current, upserts = set(), []
+    for project_id, section, doc, full_path in index.references:
+        path = _path_key(full_path)
+        row_key = (project_id, section, path)
+        stat = index.files.get(path)
+        if stat is None or row_key in current: continue
+        current.add(row_key)
+        size, mtime_ns = stat
+        previous = existing.get(row_key)
+        if previous and previous[0] == size and previous[1] == mtime_ns and previous[2]: continue
+
+        sha = known_hashes.get((path, size, mtime_ns)) or (doc.get('sha256') if previous is None else None)
+        if not sha:
+            if cancelled is not None and cancelled.is_set(): break
+            try: sha = sha256_of(full_path, cancelled)
+            except IngestionCancelled: break
+            except OSError: continue
+            known_hashes[(path, size, mtime_ns)] = sha
+        upserts.append((project_id, section, path, doc.get('name', full_path.name), doc.get('type'), size, sha, mtime_ns,
+                        mimetypes.guess_type(path)[0], timestamp))
+
+    stale = [] if cancelled is not None and cancelled.is_set() else [key for key in existing if key not in current]
+    with conn:
+        conn.executemany(_DOCUMENT_ROW_UPSERT, upserts)
+        conn.executemany("DELETE FROM documents WHERE projectId = ? AND section = ? AND path = ?", stale)
+    return len(upserts)
+
+def project_storage(conn):
+    """ [(project id, file count, bytes)] largest first; a file referenced from several sections counts once. """
+    return conn.execute("""
+        SELECT projectId, COUNT(*), COALESCE(SUM(size), 0) FROM (
+            SELECT projectId, path, MAX(size) AS size FROM documents GROUP BY projectId, path)
+        GROUP BY projectId ORDER BY 3 DESC""").fetchall()
+
+def duplicate_documents(conn):
+    """ [(sha256, copies, bytes per copy, names)] for content stored at more than one path, most wasteful first. """
+    return conn.execute("""
+        SELECT sha256, COUNT(DISTINCT path), MAX(size), GROUP_CONCAT(DISTINCT name) FROM documents
+        WHERE sha256 IS NOT NULL GROUP BY sha256 HAVING COUNT(DISTINCT path) > 1
+        ORDER BY (COUNT(DISTINCT path) - 1) * MAX(size) DESC""").fetchall()
+
+def referenced_bytes(conn):
+    """ Total size of all distinct files the projects reference. """
+    return conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT path, MAX(size) AS size FROM documents GROUP BY path)").fetchone()[0]
+
+def format_size(num_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB": return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+
+
+# ========================================================================
+# Class: ThumbnailCache
+# ========================================================================
+class ThumbnailCache(QObject):
+    """
+    Disk cache of downscaled previews. A thumbnail's key is derived from the file's
+    SHA-256 (when the doc entry records one, else its path and size) and its mtime,
+    so an edited file gets a new thumbnail and identical files share one. Rendering
+    runs on a small pool; disk use is capped by evicting the least recently shown
+    thumbnails (a cache hit refreshes the file's mtime). Owned by the main window;
+    call shutdown() before the application exits.
+    """
+    ready = pyqtSignal(str, object)     # key, QPixmap (None if the file could not be rendered)
+    _rendered = pyqtSignal(str, object)  # key, QImage or None; emitted from pool threads
+
+    def __init__(self, cache_dir, max_bytes=THUMBNAIL_CACHE_BYTES, max_workers=THUMBNAIL_WORKERS, parent=None):
+        super().__init__(parent)
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnail")
+        self.memory = OrderedDict()
+        self.pending = set()
+        self.failed = set()
+        self._disk_bytes = None          # measured lazily on the first render
+        self._disk_lock = threading.Lock()
+        self._fitz_lock = threading.Lock()   # PyMuPDF is not safe to use from several threads at once
+        self._image_suffixes = {f".{bytes(fmt).decode()}" for fmt in QImageReader.supportedImageFormats()}
+        self._rendered.connect(self._on_rendered, Qt.ConnectionType.QueuedConnection)
+
+    def can_preview(self, path):
+        suffix = Path(path).suffix.lower()
+        return suffix in self._image_suffixes or (suffix == ".pdf" and fitz is not None)
+
+    def key_for(self, path, doc=None):
+        """ Cache key of path's current content, or None if the file is missing. """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        identity = (doc or {}).get('sha256') or f"{_path_key(path)}:{st.st_size}"
+        return hashlib.sha256(f"{identity}:{st.st_mtime_ns}:{THUMBNAIL_SIZE}".encode()).hexdigest()
+
+    def request(self, path, doc=None):
+        """
+        Returns (key, pixmap). The pixmap is None when the thumbnail is not cached yet;
+        it is then rendered in the background and delivered through ready(key, pixmap).
+        key is None if the file is missing or of a type that cannot be previewed.
+        """
+        path = Path(path)
+        if not self.can_preview(path): return None, None
+        key = self.key_for(path, doc)
+        if key is None or key in self.failed: return key, None
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return key, self.memory[key]
+        cached = self._cache_path(key)
+        pixmap = QPixmap(str(cached)) if cached.exists() else QPixmap()
+        if not pixmap.isNull():
+            self._remember(key, pixmap)
+            try: os.utime(cached)
+            except OSError: pass
+            return key, pixmap
+        if key not in self.pending:
+            self.pending.add(key)
+            self.executor.submit(self._render, key, path)
+        return key, None
+
+    def clear(self):
+        """ Drops every cached thumbnail, in memory and on disk. """
+        self.memory.clear(); self.failed.clear()
+        with self._disk_lock:
+            for entry in self._iter_cache_files():
+                try: entry.unlink()
+                except OSError: pass
+            self._disk_bytes = 0
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def _cache_path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _remember(self, key, pixmap):
+        self.memory[key] = pixmap
+        self.memory.move_to_end(key)
+        while len(self.memory) > THUMBNAIL_MEMORY_ENTRIES: self.memory.popitem(last=False)
+
+    def _render(self, key, path):
+        try:
+            image = self._render_pdf(path) if path.suffix.lower() == ".pdf" else self._render_image(path)
+            if image is not None and not image.isNull():
+                self._store(key, image)
+            else:
+                image = None
+        except Exception:
+            image = None
+        self._rendered.emit(key, image)
+
+    def _render_image(self, path):
+        reader = QImageReader(str(path))
+        reader.setAutoTransform(True)
+        size = reader.size()
+        if size.isValid() and max(size.width(), size.height()) > THUMBNAIL_SIZE:
+            # Let the decoder downscale (JPEG decodes at reduced resolution), instead of decoding full size first.
+            reader.setScaledSize(size.scaled(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE), Qt.AspectRatioMode.KeepAspectRatio))
+        return reader.read()
+
+    def _render_pdf(self, path):
+        if fitz is None: return None
+        with self._fitz_lock:
+            with fitz.open(str(path)) as pdf:
+                if pdf.page_count == 0: return None
+                page = pdf.load_page(0)
+                zoom = THUMBNAIL_SIZE / max(page.rect.width, page.rect.height, 1)
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                return QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format.Format_RGB888).copy()
+
+    def _iter_cache_files(self):
+        if not self.cache_dir.is_dir(): return
+        for bucket in self.cache_dir.iterdir():
+            if bucket.is_dir(): yield from bucket.glob("*.png")
+
+    def _store(self, key, image):
+        target = self._cache_path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _temp_path_for(target)
+        if not image.save(str(tmp_path), "PNG"): return
+        os.replace(tmp_path, target)
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(entry.stat().st_size for entry in self._iter_cache_files())
+            else:
+                self._disk_bytes += target.stat().st_size
+            if self._disk_bytes > self.max_bytes: self._evict()
+
+    def _evict(self):
+        """ Deletes least recently used thumbnails until the cache is back under 80% of its budget. """
+        entries = []
+        for entry in self._iter_cache_files():
+            try: st = entry.stat()
+            except OSError: continue
+            entries.append((st.st_mtime_ns, st.st_size, entry))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes * 0.8: break
+            try: entry.unlink()
+            except OSError: continue
+            total -= size
+        self._disk_bytes = total
+
+    def _on_rendered(self, key, image):
+        self.pending.discard(key)
+        pixmap = None
+        if image is None:
+            self.failed.add(key)
+        else:
+            pixmap = QPixmap.fromImage(image)
+            self._remember(key, pixmap)
+        self.ready.emit(key, pixmap)
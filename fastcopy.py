@@ -0,0 +1,146 @@
+# Copyright (C) 2025 Protik Das
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Fast file copies.
+
+Data is moved by the kernel where the platform allows it, from cheapest to
+most expensive: a reflink (copy-on-write clone, no data copied at all),
+copy_file_range, sendfile, and finally a chunked read/write with a large
+buffer. link_or_copy() can also fall back to a hardlink, for content the
+document blob store shares between projects.
+"""
+
+import os
+import sys
+import errno
+import shutil
+
+CHUNK_SIZE = 8 * 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl: clone a whole file (btrfs, XFS, bcachefs, ...)
+
+# Errors that mean "this mechanism does not work here", as opposed to a real I/O failure.
+_UNSUPPORTED = {errno.ENOSYS, errno.EINVAL, errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EBADF, errno.ENOTTY, errno.EPERM}
+
+class CopyCancelled(Exception):
+    pass
+
+def _check(cancelled):
+    if cancelled is not None and cancelled.is_set(): raise CopyCancelled()
+
+def _reflink(src_fd, dst_fd):
+    if not sys.platform.startswith("linux"): return False
+    import fcntl
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in _UNSUPPORTED: return False
+        raise
+
+def _kernel_copy(copy_step, src_fd, dst_fd, offset, count, cancelled):
+    """
+    Runs a kernel copy primitive until count bytes are moved. Returns False if the
+    primitive is unsupported and nothing has been written yet, so the caller can
+    fall back; errors after a partial copy are real and propagate.
+    """
+    copied = 0
+    while copied < count:
+        _check(cancelled)
+        try:
+            sent = copy_step(src_fd, dst_fd, offset + copied, min(CHUNK_SIZE, count - copied))
+        except OSError as e:
+            if copied == 0 and e.errno in _UNSUPPORTED: return False
+            raise
+        if sent == 0: break  # source shorter than expected
+        copied += sent
+    return True
+
+def _copy_file_range_step(src_fd, dst_fd, offset, size):
+    return os.copy_file_range(src_fd, dst_fd, size, offset)
+
+def _sendfile_step(src_fd, dst_fd, offset, size):
+    return os.sendfile(dst_fd, src_fd, offset, size)
+
+def copy_range(src_fd, dst_fd, offset, count, cancelled=None, digest=None):
+    """
+    Copies count bytes starting at offset in src_fd to the current position of
+    dst_fd. Returns the mechanism used: "copy_file_range", "sendfile" or "chunked".
+    A hashlib object passed as `digest` is fed the data only on the "chunked" path;
+    the kernel copies never surface it, so the caller must hash their output itself.
+    """
+    if hasattr(os, "copy_file_range") and _kernel_copy(_copy_file_range_step, src_fd, dst_fd, offset, count, cancelled):
+        return "copy_file_range"
+    # sendfile() to a regular file only works on Linux.
+    if sys.platform.startswith("linux") and _kernel_copy(_sendfile_step, src_fd, dst_fd, offset, count, cancelled):
+        return "sendfile"
+    os.lseek(src_fd, offset, os.SEEK_SET)
+    remaining = count
+    while remaining > 0:
+        _check(cancelled)
+        chunk = os.read(src_fd, min(CHUNK_SIZE, remaining))
+        if not chunk: break
+        if digest is not None: digest.update(chunk)
+        view = memoryview(chunk)
+        while view:
+            written = os.write(dst_fd, view)
+            view = view[written:]
+        remaining -= len(chunk)
+    return "chunked"
+
+def copy_file(source, destination, cancelled=None, digest=None):
+    """
+    Copies source to destination (created or truncated) and its timestamps.
+    `cancelled` is an optional threading.Event checked between chunks; setting it
+    raises CopyCancelled. A hashlib object passed as `digest` receives the file's
+    content: fed on the way through when the copy is chunked anyway, otherwise read
+    back from the fresh copy, so the fast paths are kept. Returns the mechanism used.
+    """
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        src_fd, dst_fd = src.fileno(), dst.fileno()
+        if _reflink(src_fd, dst_fd):
+            method = "reflink"
+        else:
+            method = copy_range(src_fd, dst_fd, 0, os.fstat(src_fd).st_size, cancelled, digest)
+    shutil.copystat(source, destination)
+    if digest is not None and method != "chunked":
+        _hash_into(destination, digest, cancelled)
+    return method
+
+def _hash_into(path, digest, cancelled=None):
+    """ Feeds a file to digest; just after a kernel copy it is read from the page cache. """
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            _check(cancelled)
+            digest.update(chunk)
+
+def link_or_copy(source, destination, cancelled=None):
+    """
+    Makes destination (which must not exist) share source's content as cheaply as
+    possible: a reflink where the filesystem supports it (an independent copy-on-write
+    clone), else a hardlink on the same volume, else a full copy. Returns the mechanism used.
+    """
+    with open(source, 'rb') as src, open(destination, 'xb') as dst:
+        cloned = _reflink(src.fileno(), dst.fileno())
+    if cloned:
+        shutil.copystat(source, destination)
+        return "reflink"
+    os.unlink(destination)
+    try:
+        os.link(source, destination)
+        return "hardlink"
+    except OSError:
+        pass
+    return copy_file(source, destination, cancelled)
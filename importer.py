@@ -0,0 +1,339 @@
+# Copyright (C) 2025 Protik Das
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Bulk project import from CSV or XLSX spreadsheets.
+
+Every row names a project. Rows that repeat a project's name (or its Import Key,
+when that column is present) add more BOM lines and client transactions to the
+same project; its other fields are taken from the first row. Headers are matched
+loosely ("Project Name", "projectName" and "project_name" are the same column).
+
+read_projects() parses and validates without touching the database, so it can
+run on a worker thread. find_clashes() points out projects that already exist,
+and insert_projects() writes the accepted ones with executemany in one transaction.
+"""
+
+import csv
+import copy
+import datetime
+import json
+import re
+from pathlib import Path
+
+from config import initial_project_data_template, DERIVED_PROJECT_COLUMNS
+import utils
+
+VALID_STATUSES = ("PENDING", "PARTIALLY_FULFILLED", "FULFILLED")
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y/%m/%d")
+TRUE_VALUES = {"1", "yes", "y", "true", "x"}
+FALSE_VALUES = {"", "0", "no", "n", "false"}
+
+# Column -> (section, field) of initial_project_data_template; section None is a top-level field.
+PROJECT_COLUMNS = {
+    "projectName": (None, "projectName"),
+    "projectLead": (None, "projectLead"),
+    "status": (None, "status"),
+    "isTenderProject": (None, "isTenderProject"),
+    "isLimitedTenderProject": (None, "isLimitedTenderProject"),
+    "department": ("departmentDetails", "name"),
+    "departmentAddress": ("departmentDetails", "address"),
+    "memoId": ("departmentDetails", "memoId"),
+    "memoDate": ("departmentDetails", "memoDate"),
+    "oemName": ("oemVendorDetails", "oemName"),
+    "vendorName": ("oemVendorDetails", "vendorName"),
+    "vendorPrice": ("oemVendorDetails", "price"),
+    "vendorDate": ("oemVendorDetails", "date"),
+    "scope": ("scopeOfWorkDetails", "scope"),
+    "officeProposalId": ("proposalOrderDetails", "officeProposalId"),
+    "proposalDate": ("proposalOrderDetails", "proposalDate"),
+    "departmentWorkOrderId": ("proposalOrderDetails", "departmentWorkOrderId"),
+    "issuingDate": ("proposalOrderDetails", "issuingDate"),
+    "oenRegistrationNo": ("oenDetails", "oenRegistrationNo"),
+    "registrationDate": ("oenDetails", "registrationDate"),
+    "officeOenNo": ("oenDetails", "officeOenNo"),
+    "oenDate": ("oenDetails", "oenDate"),
+    "officeWorkOrderId": ("oenDetails", "officeWorkOrderId"),
+    "officeWorkOrderDate": ("oenDetails", "officeWorkOrderDate"),
+    "tenderNoticeURL": ("tenderDetails", "tenderNoticeURL"),
+}
+# Column -> key of a billOfMaterials item.
+BOM_COLUMNS = {"hsn": "hsn", "item": "item", "specs": "specs", "qty": "qty", "unitPrice": "unitPrice", "gstPercent": "gstPercent"}
+# Column -> key of a financialDetails transaction.
+TRANSACTION_COLUMNS = {"transactionDetails": "transactionDetails", "amountReceived": "amountReceived", "transactionDate": "date"}
+KEY_COLUMN = "importKey"
+
+COLUMN_ALIASES = {
+    "name": "projectName", "project": "projectName", "lead": "projectLead",
+    "departmentname": "department", "dept": "department", "address": "departmentAddress",
+    "oem": "oemName", "vendor": "vendorName", "price": "vendorPrice", "scopeofwork": "scope",
+    "proposalid": "officeProposalId", "workorderid": "departmentWorkOrderId",
+    "hsncode": "hsn", "itemname": "item", "specifications": "specs", "quantity": "qty",
+    "rate": "unitPrice", "gst": "gstPercent", "gstrate": "gstPercent",
+    "transaction": "transactionDetails", "amount": "amountReceived", "received": "amountReceived",
+    "paymentdate": "transactionDate", "key": "importKey",
+}
+DATE_FIELDS = {"memoDate", "vendorDate", "proposalDate", "issuingDate", "registrationDate", "oenDate", "officeWorkOrderDate", "transactionDate"}
+BOOLEAN_FIELDS = {"isTenderProject", "isLimitedTenderProject"}
+
+class ImportFormatError(Exception):
+    """ The file cannot be imported at all (unreadable, wrong type, no project name column). """
+
+class ImportPlan:
+    """ Result of read_projects(): the projects ready to insert and what was rejected. """
+    def __init__(self, source):
+        self.source = source
+        self.projects = []          # template-shaped project dicts, without id or timestamps
+        self.errors = []            # (row number, message); the row's project is not imported
+        self.ignored_columns = []   # headers that matched no field
+        self.rows = 0
+
+    @property
+    def bom_lines(self):
+        return sum(len(p['billOfMaterials']['items']) for p in self.projects)
+
+    @property
+    def transactions(self):
+        return sum(len(p['financialDetails']['transactions']) for p in self.projects)
+
+    def department_names(self):
+        """ Distinct department names the projects refer to, with the first address given for each. """
+        names = {}
+        for project in self.projects:
+            dept = project['departmentDetails']
+            if dept['name'] and not names.get(dept['name']): names[dept['name']] = dept['address']
+        return names
+
+def _normalize(header):
+    return re.sub(r'[^a-z0-9]', '', str(header).lower())
+
+_CANONICAL = {_normalize(c): c for c in (*PROJECT_COLUMNS, *BOM_COLUMNS, *TRANSACTION_COLUMNS, KEY_COLUMN)}
+_CANONICAL.update({_normalize(f"{section}.{field}"): column for column, (section, field) in PROJECT_COLUMNS.items() if section})
+_CANONICAL.update(COLUMN_ALIASES)
+
+def match_columns(headers):
+    """ Maps each header position to its canonical column name, or None if it matches nothing. """
+    return [_CANONICAL.get(_normalize(h)) if h not in (None, "") else None for h in headers]
+
+def _cell_text(value):
+    if value is None: return ""
+    if isinstance(value, datetime.datetime): return value.date().isoformat()
+    if isinstance(value, datetime.date): return value.isoformat()
+    if isinstance(value, float) and value.is_integer(): return str(int(value))
+    return str(value).strip()
+
+def _csv_rows(path, encoding, errors="strict"):
+    with open(path, newline="", encoding=encoding, errors=errors) as f:
+        for row in csv.reader(f):
+            yield [cell.strip() for cell in row]
+
+def iter_rows(path):
+    """
+    Yields the header row and then every data row of a .csv or .xlsx file, as lists of strings.
+    A CSV that is not UTF-8 is read as cp1252, which is what Excel on Windows saves.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        yielded = 0
+        try:
+            for row in _csv_rows(path, "utf-8-sig"):
+                yield row
+                yielded += 1
+        except UnicodeDecodeError:
+            # Rows already yielded were plain UTF-8 and split the same way in cp1252; carry on after them.
+            for row_number, row in enumerate(_csv_rows(path, "cp1252", errors="replace")):
+                if row_number >= yielded: yield row
+    elif suffix in (".xlsx", ".xlsm"):
+        try:
+            import openpyxl  # optional; only needed for Excel files
+        except ImportError:
+            raise ImportFormatError("Reading Excel files needs the 'openpyxl' package (pip install openpyxl). "
+                                    "Alternatively, save the sheet as CSV and import that.")
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield [_cell_text(cell) for cell in row]
+        finally:
+            workbook.close()
+    else:
+        raise ImportFormatError(f"Unsupported file type '{path.suffix}'. Use a .csv or .xlsx file.")
+
+def _parse_number(text):
+    return float(text.replace(",", "").replace("₹", "").strip()) if text else 0.0
+
+def _parse_date(text):
+    if not text: return ""
+    for fmt in DATE_FORMATS:
+        try: return datetime.datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError: continue
+    raise ValueError(f"'{text}' is not a date (use YYYY-MM-DD or DD/MM/YYYY)")
+
+def _parse_field(column, text):
+    if column in DATE_FIELDS: return _parse_date(text)
+    if column in BOOLEAN_FIELDS:
+        lowered = text.lower()
+        if lowered in TRUE_VALUES: return True
+        if lowered in FALSE_VALUES: return False
+        raise ValueError(f"'{text}' is not yes/no")
+    if column == "status":
+        status = text.upper().replace(" ", "_") or "PENDING"
+        if status not in VALID_STATUSES: raise ValueError(f"unknown status '{text}'")
+        return status
+    return text
+
+def _new_project(values):
+    project = copy.deepcopy(initial_project_data_template)
+    for column, (section, field) in PROJECT_COLUMNS.items():
+        if column not in values: continue
+        value = _parse_field(column, values[column])
+        if section is None: project[field] = value
+        else: project[section][field] = value
+    project['projectName'] = project['projectName'].strip()
+    return project
+
+def _bom_line(values):
+    if not values.get("item"): return None
+    line = {key: values.get(column, "") for column, key in BOM_COLUMNS.items()}
+    try:
+        qty, unit_price, gst_percent = (_parse_number(line[k]) for k in ("qty", "unitPrice", "gstPercent"))
+    except ValueError:
+        raise ValueError("Qty, Unit Price and GST% must be numbers")
+    line.update({
+        'qty': qty, 'unitPrice': unit_price, 'gstPercent': gst_percent,
+        'amount': qty * unit_price,
+        'gstAmount': (qty * unit_price) * (gst_percent / 100.0),
+        'total': (qty * unit_price) * (1 + gst_percent / 100.0),
+        'fulfillments': []
+    })
+    return line
+
+def _transaction(values):
+    details, amount = values.get("transactionDetails", ""), values.get("amountReceived", "")
+    if not details and not amount: return None
+    if not details or not amount: raise ValueError("a transaction needs both details and an amount received")
+    try: amount = _parse_number(amount)
+    except ValueError: raise ValueError(f"amount received '{amount}' is not a number")
+    return {'transactionDetails': details, 'amountReceived': amount, 'date': _parse_date(values.get("transactionDate", "")), 'documents': []}
+
+def _finish_project(project):
+    """ Fills in what the BOM and financial pages would compute: serial numbers, totals, pending amounts and words. """
+    bom = project['billOfMaterials']
+    for i, line in enumerate(bom['items']): line['sl_no'] = i + 1
+    bom_total = sum(line['total'] for line in bom['items'])
+    bom['amountInWords'] = utils.convert_number_to_words(bom_total)
+
+    fin = project['financialDetails']
+    fin['transactions'].sort(key=lambda t: t['date'] or '9999-12-31')
+    received = 0.0
+    for i, trans in enumerate(fin['transactions']):
+        trans['sl_no'] = i + 1
+        received += trans['amountReceived']
+        trans['amountPending'] = max(0.0, bom_total - received)
+    fin['totalAmountReceived'] = received
+    fin['totalAmountPending'] = max(0.0, bom_total - received)
+    fin['totalPendingInWords'] = utils.convert_number_to_words(fin['totalAmountPending'])
+
+def read_projects(path):
+    """ Reads and validates a spreadsheet. Returns an ImportPlan; raises ImportFormatError if nothing can be read. """
+    plan = ImportPlan(path)
+    rows = iter_rows(path)
+    try:
+        headers = next(rows)
+    except StopIteration:
+        raise ImportFormatError("The file is empty.")
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"Could not read the file: {e}")
+    columns = match_columns(headers)
+    if "projectName" not in columns:
+        raise ImportFormatError("No project name column was found. The first row must hold column headers, e.g. 'Project Name'.")
+    plan.ignored_columns = [h for h, c in zip(headers, columns) if h and c is None]
+
+    projects, rejected = {}, set()
+    try:
+        for row_number, row in enumerate(rows, start=2):
+            values = {c: v for c, v in zip(columns, row) if c and v}
+            if not values: continue
+            plan.rows += 1
+            name = values.get("projectName", "").strip()
+            key = (values.get(KEY_COLUMN) or name).casefold()
+            if not key:
+                plan.errors.append((row_number, "no project name"))
+                continue
+            if key in rejected: continue
+            try:
+                project = projects.get(key)
+                if project is None:
+                    if not name: raise ValueError("no project name")
+                    project = _new_project(values)
+                line = _bom_line(values)
+                trans = _transaction(values)
+            except ValueError as e:
+                plan.errors.append((row_number, f"{name or key}: {e}; project skipped"))
+                rejected.add(key); projects.pop(key, None)
+                continue
+            projects[key] = project
+            if line: project['billOfMaterials']['items'].append(line)
+            if trans: project['financialDetails']['transactions'].append(trans)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"Could not read the file: {e}")
+
+    for project in projects.values():
+        _finish_project(project)
+        plan.projects.append(project)
+    return plan
+
+def find_clashes(conn, projects):
+    """
+    Matches projects against the ones already in the database, by name (ignoring case)
+    or by department work order ID. Returns {index in projects: reason} for each match.
+    """
+    names, work_orders = {}, {}
+    for name, work_order in conn.execute("SELECT projectName, workOrderId FROM projects"):
+        if name: names.setdefault(name.strip().casefold(), name)
+        if work_order: work_orders.setdefault(str(work_order).strip().casefold(), name)
+    clashes = {}
+    for index, project in enumerate(projects):
+        work_order = str(project['proposalOrderDetails'].get('departmentWorkOrderId') or '').strip()
+        if project['projectName'].casefold() in names:
+            clashes[index] = f"{project['projectName']}: a project with this name already exists"
+        elif work_order and work_order.casefold() in work_orders:
+            clashes[index] = f"{project['projectName']}: work order ID '{work_order}' is already used by '{work_orders[work_order.casefold()]}'"
+    return clashes
+
+def insert_projects(conn, projects, fts_available):
+    """
+    Inserts template-shaped projects (ids are assigned here) with their derived search
+    columns and full-text rows, all in one transaction. Returns the new ids in order.
+    """
+    if not projects: return []
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    columns = ["id", *initial_project_data_template]
+    with conn:
+        first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM projects").fetchone()[0]
+        rows = []
+        for project_id, project in enumerate(projects, start=first_id):
+            project['id'] = project_id
+            project['createdAt'] = project['updatedAt'] = timestamp
+            rows.append(tuple(json.dumps(project[k]) if isinstance(project[k], (dict, list)) else project[k] for k in columns))
+        last_id = first_id + len(projects) - 1
+        conn.executemany(f"INSERT INTO projects ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})", rows)
+        assignments = ", ".join(f"{col} = {expr}" for col, (_, _, expr) in DERIVED_PROJECT_COLUMNS.items())
+        conn.execute(f"UPDATE projects SET {assignments} WHERE id BETWEEN ? AND ?", (first_id, last_id))
+        if fts_available:
+            placeholders = ", ".join(["?"] * (len(utils.PROJECT_FTS_COLUMNS) + 1))
+            conn.executemany(f"INSERT INTO projects_fts (rowid, {', '.join(utils.PROJECT_FTS_COLUMNS)}) VALUES ({placeholders})",
+                             [(p['id'], *utils.build_project_search_row(p)) for p in projects])
+    return list(range(first_id, last_id + 1))
@@ -18,27 +18,32 @@ import os
 import sqlite3
 import json
 import uuid
+import hashlib
 import datetime
 import copy
 import re
 import tempfile
-import shutil
-import zipfile
+import queue
+import threading
 import darkdetect 
 from pathlib import Path
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QStackedWidget, QMessageBox,QDialog, QVBoxLayout, QHBoxLayout, QLabel, QDialogButtonBox,
-    QFileDialog, QMenuBar, QMenu, QProgressDialog, QStatusBar, QPushButton, QToolButton ,QGridLayout,
-    QHBoxLayout,  QWidgetAction, QGraphicsDropShadowEffect, 
+    QFileDialog, QInputDialog, QMenuBar, QMenu, QProgressBar, QStatusBar, QPushButton, QToolButton ,QGridLayout,
+    QHBoxLayout,  QWidgetAction, QGraphicsDropShadowEffect, QProgressDialog,
 )
 from PyQt6.QtGui import QIcon, QAction, QActionGroup, QPixmap, QPalette, QBrush, QPainter, QFont, QColor
-from PyQt6.QtCore import Qt, QTimer, QThread, QObject, pyqtSignal, QRectF
+from PyQt6.QtCore import Qt, QTimer, QThread, QObject, QEventLoop, pyqtSignal, QRectF
 
 import utils
+import backup
+import documents
+import importer
 from config import (
     DEFAULT_ICON_PATH, DEFAULT_LOGO_PATH,
-    SUBFOLDER_NAMES, initial_project_data_template
+    initial_project_data_template,
+    DERIVED_PROJECT_COLUMNS, INDEXED_PROJECT_COLUMNS
 )
 from ui.pages import (
     HomeView, NewProjectP1, NewProjectP2_Department,NewProjectP2A_Enquiry, NewProjectP3_OEM,
@@ -57,17 +62,218 @@ else:
     BASE_PATH = Path(__file__).parent.resolve()
 
 APP_VERSION = "2.0.0"
+# Menu label -> minutes between scheduled backups (0 turns them off).
+AUTO_BACKUP_INTERVALS = {"Off": 0, "Every 30 Minutes": 30, "Every Hour": 60, "Every 4 Hours": 240}
+AUTO_BACKUP_RETRY_MS = 60 * 1000
+BACKUP_STOP_GRACE_MS = 300
+DOCUMENT_RESCAN_DELAY_MS = 15 * 1000
 DARK_THEMES = { "github_dark", "carbon_fiber_theme", "crimson_gold", "scifi_theme", "blueprint_theme", "charcoal_teal" }
 
+def refresh_derived_columns(cursor, project_id=None, changed_keys=None):
+    """Recomputes the derived search columns from their JSON sections, for one project or all of them."""
+    assignments = [f"{col} = {expr}" for col, (section, _, expr) in DERIVED_PROJECT_COLUMNS.items()
+                   if changed_keys is None or section in changed_keys]
+    if not assignments: return
+    if project_id is None:
+        cursor.execute(f"UPDATE projects SET {', '.join(assignments)}")
+    else:
+        cursor.execute(f"UPDATE projects SET {', '.join(assignments)} WHERE id = ?", (project_id,))
+
+def sync_project_fts(cursor, project_data, changed_keys):
+    """Re-indexes one project in projects_fts if any section feeding the index changed."""
+    if not (changed_keys & utils.PROJECT_FTS_SOURCE_SECTIONS): return
+    placeholders = ", ".join(["?"] * (len(utils.PROJECT_FTS_COLUMNS) + 1))
+    cursor.execute("DELETE FROM projects_fts WHERE rowid = ?", (project_data['id'],))
+    cursor.execute(f"INSERT INTO projects_fts (rowid, {', '.join(utils.PROJECT_FTS_COLUMNS)}) VALUES ({placeholders})",
+                   (project_data['id'], *utils.build_project_search_row(project_data)))
+
+class PersistenceWorker(QObject):
+    """
+    Write-behind queue for project updates. Runs on its own QThread, merges
+    repeated saves of the same project and commits each batch in one transaction.
+    Jobs carry read-only snapshots from the controller's project index.
+    """
+    saved = pyqtSignal(list)         # project ids committed
+    error = pyqtSignal(str, list)    # message, jobs (db_path, snapshot, changed_keys, fts_available) that were rolled back
+    COALESCE_WINDOW = 0.3            # seconds to wait for more saves before writing
+    MAX_BATCH = 100
+
+    _STOP = object()
+    _RELEASE = object()
+
+    def __init__(self):
+        super().__init__()
+        self.jobs = queue.Queue()
+
+    def submit(self, db_path, snapshot, changed_keys, fts_available):
+        self.jobs.put((db_path, snapshot, set(changed_keys), fts_available))
+
+    def wait_until_idle(self):
+        """Blocks until every submitted job has been written (or has failed)."""
+        self.jobs.join()
+
+    def is_idle(self):
+        return self.jobs.unfinished_tasks == 0
+
+    def stop(self):
+        self.jobs.put(self._STOP)
+
+    def release_connections(self):
+        """Blocks until queued writes are done and the worker has closed its database connections."""
+        self.jobs.put(self._RELEASE)
+        self.jobs.join()
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.jobs.get()]
+            # Keep collecting while saves are still arriving, up to the batch limit.
+            while len(batch) < self.MAX_BATCH:
+                try: batch.append(self.jobs.get(timeout=self.COALESCE_WINDOW))
+                except queue.Empty: break
+            received = len(batch)
+            stopping = any(job is self._STOP for job in batch)
+            releasing = any(job is self._RELEASE for job in batch)
+            batch = [job for job in batch if job is not self._STOP and job is not self._RELEASE]
+            try:
+                if batch: self._write_batch(batch)
+                if releasing: utils.release_thread_db_connections()
+            except Exception as e:
+                # Never let one bad batch end the thread: flush_pending_saves() would then wait forever.
+                self.error.emit(f"An error occurred while saving: {e}", batch)
+            finally:
+                for _ in range(received): self.jobs.task_done()
+        utils.release_thread_db_connections()
+
+    def _write_batch(self, batch):
+        # Coalesce per (database, project): the latest snapshot wins, changed keys accumulate.
+        merged = {}
+        for db_path, snapshot, changed_keys, fts_available in batch:
+            key = (db_path, snapshot['id'])
+            if key in merged: changed_keys = merged[key][1] | changed_keys
+            merged[key] = (snapshot, changed_keys, fts_available)
+
+        by_db = {}
+        for (db_path, project_id), job in merged.items(): by_db.setdefault(db_path, {})[project_id] = job
+        for db_path, projects in by_db.items():
+            failed_jobs = [(db_path, snapshot, changed_keys, fts_available) for snapshot, changed_keys, fts_available in projects.values()]
+            try:
+                # The search row reads every indexed section; load lazy ones now, before the transaction opens.
+                for snapshot, changed_keys, fts_available in projects.values():
+                    if fts_available and changed_keys & utils.PROJECT_FTS_SOURCE_SECTIONS and isinstance(snapshot, utils.ProjectRecord):
+                        snapshot.hydrate()
+                with utils.get_db_connection(db_path) as conn:
+                    cursor = conn.cursor()
+                    for project_id, (snapshot, changed_keys, fts_available) in projects.items():
+                        data_for_sql = {k: json.dumps(snapshot[k]) if isinstance(snapshot[k], (dict, list)) else snapshot[k] for k in changed_keys if k in snapshot}
+                        update_fields = ", ".join([f"{key} = ?" for key in data_for_sql])
+                        cursor.execute(f"UPDATE projects SET {update_fields} WHERE id = ?", (*data_for_sql.values(), project_id))
+                        refresh_derived_columns(cursor, project_id, changed_keys)
+                        if fts_available: sync_project_fts(cursor, snapshot, changed_keys)
+            except Exception as e:
+                self.error.emit(f"An error occurred while saving: {e}", failed_jobs)
+                continue
+            self.saved.emit(list(projects))
+            for snapshot, _, _ in projects.values():
+                try: utils.log_activity(f"Project '{snapshot.get('projectName', '')}' updated.", project_id=snapshot.get('id'), db_path=db_path)
+                except Exception as e: print(f"Could not log project update: {e}")
+
+class DocumentScanWorker(QObject):
+    """
+    Runs the document integrity scan over every saved project on a background
+    thread, then brings the documents metadata table up to date with it.
+    """
+    scanned = pyqtSignal(object)    # documents.DocumentIndex as soon as the walk is done, or None if the scan failed
+    finished = pyqtSignal()
+
+    def __init__(self, working_folder, db_path, previous_index):
+        super().__init__()
+        self.working_folder = working_folder; self.db_path = db_path
+        self.previous_index = previous_index
+        self.cancelled = threading.Event()   # set by the controller to stop the walk or the hashing early
+
+    def _iter_projects(self):
+        sections = [key for key, value in initial_project_data_template.items() if isinstance(value, (dict, list))]
+        cursor = utils.get_db_connection(self.db_path).cursor()
+        cursor.row_factory = sqlite3.Row
+        for row in cursor.execute(f"SELECT id, projectFolderPath, {', '.join(sections)} FROM projects"):
+            yield row['id'], row['projectFolderPath'], {key: utils.decode_project_section(key, row[key]) for key in sections}
+
+    def run(self):
+        try:
+            conn = utils.get_db_connection(self.db_path)
+            # First scan of a session: compare against what the metadata table recorded last time.
+            previous = self.previous_index if self.previous_index.files else documents.load_document_baseline(conn)
+            index = documents.scan_documents(self.working_folder, self._iter_projects(), previous, self.cancelled)
+        except documents.IngestionCancelled:
+            index = None
+        except (sqlite3.Error, OSError) as e:
+            print(f"Document scan failed: {e}")
+            index = None
+        # Views get the link statuses now; hashing new files for the metadata table can take much longer.
+        self.scanned.emit(index)
+        try:
+            if index is not None: documents.refresh_document_rows(conn, index, self.cancelled)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Could not update the documents table: {e}")
+        finally:
+            utils.release_thread_db_connections()
+            self.finished.emit()
+
+class ProjectImportWorker(QObject):
+    """ Reads and validates a project spreadsheet on a background thread. Nothing is written. """
+    finished = pyqtSignal(object)   # importer.ImportPlan
+    error = pyqtSignal(str)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def run(self):
+        try:
+            self.finished.emit(importer.read_projects(self.path))
+        except importer.ImportFormatError as e:
+            self.error.emit(str(e))
+        except Exception as e:
+            self.error.emit(f"Could not read '{Path(self.path).name}': {e}")
+
 class BackupWorker(QObject):
     finished = pyqtSignal(bool)
     progress = pyqtSignal(int)
     error = pyqtSignal(str)
+    completed = pyqtSignal(str)   # change fingerprint of the data that was backed up
+    skipped = pyqtSignal()        # scheduled backup found nothing new since the last one
     
-    def __init__(self, working_folder, db_path, departments_db_path, is_manual=False):
+    def __init__(self, working_folder, db_path, departments_db_path, is_manual=False, incremental=False, previous_fingerprint=None):
         super().__init__()
         self.working_folder = working_folder; self.db_path = db_path
         self.departments_db_path = departments_db_path; self.is_manual = is_manual
+        # A scheduled run writing full ZIPs would copy the whole working folder every time.
+        self.incremental = incremental or not is_manual
+        self.previous_fingerprint = previous_fingerprint
+        # Scheduled backups are rate-limited and single-threaded; manual ones run flat out,
+        # but still carry a throttle so they can be cancelled.
+        self.throttle = backup.IOThrottle(None if is_manual else backup.AUTO_BACKUP_BYTES_PER_SECOND)
+
+    def cancel(self):
+        """ Stops the backup at its next chunk (next file for snapshots); its partial output is removed. """
+        self.throttle.cancel()
+
+    def _change_fingerprint(self, files_to_backup):
+        """
+        Cheap summary of everything a backup would contain: row counts and latest
+        update times from the databases, plus size and mtime of every document.
+        """
+        digest = hashlib.sha256()
+        for db_path, table in ((self.db_path, "projects"), (self.departments_db_path, "departments")):
+            if Path(db_path).exists():
+                digest.update(repr(utils.get_db_connection(db_path).execute(f"SELECT COUNT(*), MAX(updatedAt) FROM {table}").fetchone()).encode())
+        live_databases = {Path(self.db_path), Path(self.departments_db_path)}
+        for file_path, arcname in files_to_backup:
+            if Path(file_path) in live_databases: continue
+            stat = os.stat(file_path)
+            digest.update(f"{arcname}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
 
     def run(self):
         try:
@@ -80,6 +286,7 @@ class BackupWorker(QObject):
             if Path(self.departments_db_path).exists(): files_to_backup.append((Path(self.departments_db_path), Path(self.departments_db_path).name))
             
             for item in Path(self.working_folder).iterdir():
+                # The blob store is backed up too, so restored documents keep the blobs their sha256 names.
                 if item.is_dir() and item.name != "backups":
                     for root, _, files in os.walk(item):
                         for file in files:
@@ -88,17 +295,45 @@ class BackupWorker(QObject):
             
             if not files_to_backup: self.finished.emit(True); return
 
-            with zipfile.ZipFile(backup_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                total_files = len(files_to_backup)
-                for i, (file_path, arcname) in enumerate(files_to_backup):
-                    zipf.write(file_path, arcname); self.progress.emit(int(((i + 1) / total_files) * 100))
-            
-            all_backups = sorted(backup_dir.glob(f"Backup_{working_folder_name}_*.zip"), key=os.path.getmtime, reverse=True)
-            for old_backup in all_backups[7:]: old_backup.unlink()
+            fingerprint = self._change_fingerprint(files_to_backup)
+            if not self.is_manual and fingerprint == self.previous_fingerprint:
+                self.skipped.emit(); self.finished.emit(True); return
+
+            with tempfile.TemporaryDirectory() as snapshot_dir:
+                # The databases are copied with the online backup API rather than read as live files,
+                # so a save that lands mid-backup cannot leave a torn copy in the archive.
+                live_databases = [Path(self.db_path), Path(self.departments_db_path)]
+                for index, (file_path, arcname) in enumerate(files_to_backup):
+                    if Path(file_path) in live_databases:
+                        snapshot_path = Path(snapshot_dir) / f"{index}_{Path(file_path).name}"
+                        utils.snapshot_database(file_path, snapshot_path, progress=lambda v: self.progress.emit(v // 10))
+                        files_to_backup[index] = (snapshot_path, arcname)
+                self._write_backup(backup_dir, backup_filename, working_folder_name, files_to_backup)
             
-            utils.log_activity(f"Backup created for '{working_folder_name}'."); self.finished.emit(True)
+            backup_kind = "Backup" if self.is_manual else "Scheduled backup"
+            utils.log_activity(f"{backup_kind} created for '{working_folder_name}'."); self.completed.emit(fingerprint); self.finished.emit(True)
+        except backup.BackupCancelled:
+            self.finished.emit(False)
         except Exception as e:
             self.error.emit(f"Could not create backup: {e}"); self.finished.emit(False)
+        finally:
+            utils.release_thread_db_connections()
+
+    def _write_backup(self, backup_dir, backup_filename, working_folder_name, files_to_backup):
+        # Database snapshots report the first 10%, files the rest.
+        file_progress = lambda v: self.progress.emit(10 + (v * 9) // 10)
+        if self.incremental:
+            # --- NEW: Content-addressed snapshot; unchanged files are neither re-read nor re-stored ---
+            store = backup.IncrementalBackupStore(backup_dir / f"Incremental_{working_folder_name}")
+            label = working_folder_name if self.is_manual else f"{backup.AUTO_BACKUP_PREFIX}_{working_folder_name}"
+            store.create_snapshot(files_to_backup, label, progress=file_progress,
+                                  max_workers=None if self.is_manual else 1, throttle=self.throttle)
+            store.prune(backup.SNAPSHOT_RETENTION if self.is_manual else backup.AUTO_BACKUP_RETENTION, label=label)
+        else:
+            backup.write_zip_backup(files_to_backup, backup_filename, progress=file_progress, throttle=self.throttle)
+            
+            all_backups = sorted(backup_dir.glob(f"Backup_{working_folder_name}_*.zip"), key=os.path.getmtime, reverse=True)
+            for old_backup in all_backups[backup.ZIP_BACKUP_RETENTION:]: old_backup.unlink()
 
 class AboutDialog(QDialog):
     def __init__(self, parent=None):
@@ -154,6 +389,10 @@ class AboutDialog(QDialog):
 # --- END OF NEW CLASS ---
 
 class WorkflowApp(QMainWindow):
+    # Emitted with a project id whenever that project is inserted or updated,
+    # so views can patch a single row instead of reloading everything.
+    project_changed = pyqtSignal(int)
+
     def __init__(self, user_data=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.setWindowTitle(f"WORKFLOW")
@@ -165,11 +404,16 @@ class WorkflowApp(QMainWindow):
         self.config_data = {}
         self.current_project_data = None
         self.all_projects_data = []
+        self.projects_by_id = {}
+        self.projects_loaded = False
         self.working_folder = ""
         self.db_path = None
         self.departments_db_path = utils.get_departments_database_path()
+        self.department_cache = utils.DepartmentCache(self.departments_db_path)
+        self.department_cache.subscribe(self._reindex_department_search)
         self.users_db_path = utils.get_users_database_path()
         self.app_ready = False
+        self.fts_available = False
         self.themes_path = BASE_PATH / "themes"
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
@@ -187,6 +431,45 @@ class WorkflowApp(QMainWindow):
         }
         self.current_user_data = user_data
         
+        # --- NEW: Write-behind persistence for project updates ---
+        self.persistence_thread = QThread()
+        self.persistence_worker = PersistenceWorker()
+        self.persistence_worker.moveToThread(self.persistence_thread)
+        self.persistence_thread.started.connect(self.persistence_worker.run)
+        self.persistence_worker.saved.connect(self._on_projects_persisted)
+        self.persistence_worker.error.connect(self._on_persistence_error)
+        self.failed_saves = {}   # project id -> job whose write failed; its edits stay in the in-memory index
+        self.persistence_thread.start()
+
+        # --- NEW: Attachments are copied on a shared worker pool ---
+        self.document_service = documents.DocumentIngestionService(parent=self)
+        self.document_service.set_recorder(self._record_ingested_document)
+        # --- NEW: Inline previews of attachments, rendered in the background and cached on disk ---
+        self.thumbnail_cache = documents.ThumbnailCache(utils.get_app_config_base_path() / "thumbnails", parent=self)
+
+        # --- NEW: Background document integrity scan; views read link status from its index ---
+        self.document_index = documents.DocumentIndex()
+        self.document_scan_thread = None
+        self.document_scan_pending = False
+        self.document_scan_report = False
+        self.import_thread = None
+        self.document_scan_timer = QTimer(self)
+        self.document_scan_timer.setSingleShot(True)
+        self.document_scan_timer.setInterval(DOCUMENT_RESCAN_DELAY_MS)
+        self.document_scan_timer.timeout.connect(self.start_document_scan)
+
+        # --- NEW: Scheduled backups, reported in the status bar ---
+        self.backup_thread = None
+        self.backup_worker = None
+        self.auto_backup_timer = QTimer(self)
+        self.auto_backup_timer.timeout.connect(self.run_scheduled_backup)
+        self.backup_progress_bar = QProgressBar()
+        self.backup_progress_bar.setRange(0, 100)
+        self.backup_progress_bar.setMaximumWidth(180)
+        self.backup_progress_bar.setFormat("Backup %p%")
+        self.backup_progress_bar.hide()
+        self.statusBar().addPermanentWidget(self.backup_progress_bar)
+        
         self.load_config()
         self.create_menu_bar()
         
@@ -202,22 +485,28 @@ class WorkflowApp(QMainWindow):
 
         # Check project milestones in order of progression.
         # The first one that is missing determines the current pending stage.
-        if project_data.get('isTenderProject') and not project_data.get('tenderDetails', {}).get('qualifiedBidder'):
+        # Cached records answer from their summary so the list never forces a section load.
+        if isinstance(project_data, utils.ProjectRecord):
+            peek = project_data.peek
+        else:
+            peek = lambda section, field: project_data.get(section, {}).get(field)
+
+        if project_data.get('isTenderProject') and not peek('tenderDetails', 'qualifiedBidder'):
             return "Pending: Awaiting Bidder Selection"
         
-        if project_data.get('isLimitedTenderProject') and not project_data.get('limitedTenderDetails', {}).get('winner'):
+        if project_data.get('isLimitedTenderProject') and not peek('limitedTenderDetails', 'winner'):
             return "Pending: Awaiting Bidder Selection"
 
-        if not project_data.get('oemVendorDetails', {}).get('price'):
+        if not peek('oemVendorDetails', 'price'):
             return "Pending: Awaiting Vendor Price"
         
-        if not project_data.get('proposalOrderDetails', {}).get('officeProposalId'):
+        if not peek('proposalOrderDetails', 'officeProposalId'):
             return "Pending: Awaiting Office Proposal"
         
-        if not project_data.get('proposalOrderDetails', {}).get('departmentWorkOrderId'):
+        if not peek('proposalOrderDetails', 'departmentWorkOrderId'):
             return "Pending: Awaiting Dept. Work Order"
 
-        if not project_data.get('billOfMaterials', {}).get('items'):
+        if not peek('billOfMaterials', 'items'):
             return "Pending: Awaiting Bill of Materials"
 
         return "Pending: Ready for Fulfillment"    
@@ -230,12 +519,37 @@ class WorkflowApp(QMainWindow):
             ("Select/Change Working Folder", self.select_working_folder_menu_action),
             ("Backup Current Folder...", self.handle_manual_backup),
             ("Restore from Backup...", self.restore_from_backup),
+            ("Check Document Links...", lambda: self.start_document_scan(report=True)),
+            ("Storage Report...", self.show_storage_report),
+            ("Import Projects from Spreadsheet...", self.import_projects_from_file),
             ("Restart", self.restart_application),
             ("Home", self.handle_save_and_go_home),
         ]
         for text, callback in actions:
             file_menu.addAction(QAction(text, self, triggered=callback))
 
+        self.incremental_backup_action = QAction("Use Incremental Backups", self, checkable=True)
+        self.incremental_backup_action.setChecked(self.config_data.get('incremental_backups', False))
+        self.incremental_backup_action.toggled.connect(self.set_incremental_backups)
+        self.incremental_backup_action.setToolTip("Manual backups become snapshots too. Scheduled backups are always incremental.")
+        file_menu.addAction(self.incremental_backup_action)
+
+        self.deduplicate_documents_action = QAction("Deduplicate Attachments", self, checkable=True)
+        self.deduplicate_documents_action.setToolTip("Store identical attachments once per working folder and link them into project folders.")
+        self.deduplicate_documents_action.setChecked(self.config_data.get('deduplicate_documents', False))
+        self.deduplicate_documents_action.toggled.connect(self.set_deduplicate_documents)
+        file_menu.addAction(self.deduplicate_documents_action)
+
+        auto_backup_menu = file_menu.addMenu("Automatic Backups")
+        auto_backup_group = QActionGroup(self)
+        current_interval = self.config_data.get('auto_backup_minutes', AUTO_BACKUP_INTERVALS["Every Hour"])
+        for label, minutes in AUTO_BACKUP_INTERVALS.items():
+            action = QAction(label, self, checkable=True)
+            action.setChecked(minutes == current_interval)
+            action.triggered.connect(lambda checked, m=minutes: self.set_auto_backup_interval(m))
+            auto_backup_group.addAction(action)
+            auto_backup_menu.addAction(action)
+
         file_menu.addSeparator()
         file_menu.addAction(QAction("Exit", self, triggered=self.close))
 
@@ -446,8 +760,25 @@ class WorkflowApp(QMainWindow):
             login_prefs.pop('username', None)
             login_prefs['remember_me'] = False
             self.config_data['login'] = login_prefs
-        if QMessageBox.question(self, 'Exit', 'Are you sure?', QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes:
+        exit_question = 'Are you sure?'
+        if self.failed_saves:
+            reply = QMessageBox.warning(self, 'Exit', f"{len(self.failed_saves)} project(s) have changes that could not be saved.\nRetry saving them before exiting?",
+                                        QMessageBox.StandardButton.Retry | QMessageBox.StandardButton.Discard | QMessageBox.StandardButton.Cancel)
+            if reply != QMessageBox.StandardButton.Discard:
+                if reply == QMessageBox.StandardButton.Retry: self.retry_failed_saves()
+                event.ignore()
+                return
+            exit_question = 'Exit and lose the unsaved changes?'
+        if QMessageBox.question(self, 'Exit', exit_question, QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No) == QMessageBox.StandardButton.Yes:
+            self.stop_backup()
+            self.stop_document_scan()
+            self.stop_project_import()
+            self.document_service.shutdown()
+            self.thumbnail_cache.shutdown()
             self.save_config()
+            self.stop_persistence_worker()
+            utils.shutdown_activity_log()
+            utils.close_db_connections()
             event.accept()
         else:
             event.ignore()
@@ -455,7 +786,7 @@ class WorkflowApp(QMainWindow):
     def init_db(self):
         if not self.db_path: return
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with utils.get_db_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('CREATE TABLE IF NOT EXISTS projects (id INTEGER PRIMARY KEY, projectName TEXT NOT NULL)')
                 cursor.execute("PRAGMA table_info(projects)")
@@ -472,18 +803,117 @@ class WorkflowApp(QMainWindow):
                     "vendorPayments": "TEXT", "projectFolderPath": "TEXT", "createdAt": "TEXT", "updatedAt": "TEXT", 
                     "departmentId": "INTEGER"
                 }
+                all_columns_schema.update({col: col_type for col, (_, col_type, _) in DERIVED_PROJECT_COLUMNS.items()})
                 for col_name, col_type in all_columns_schema.items():
                     if col_name not in existing_columns:
                         try:
                             cursor.execute(f"ALTER TABLE projects ADD COLUMN {col_name} {col_type}")
                         except sqlite3.OperationalError as e:
                             if "duplicate column name" not in str(e): raise e
+                # --- NEW: Backfill derived search columns once, when they are first added ---
+                if any(col not in existing_columns for col in DERIVED_PROJECT_COLUMNS):
+                    refresh_derived_columns(cursor)
+                for col_name in INDEXED_PROJECT_COLUMNS:
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_projects_{col_name} ON projects ({col_name})")
+                # --- NEW: Full-text index over names, references, BOM text, bidders, transactions and file names ---
+                self.fts_available = self._init_project_fts(cursor)
+                # --- NEW: Per-attachment metadata (size, hash, mtime, MIME), kept current by the document scan ---
+                documents.init_documents_table(cursor)
                 conn.commit()
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Database Error", f"Could not initialize or upgrade the database: {e}")
             self.close()
         utils.init_departments_db(self.departments_db_path)
 
+    def _init_project_fts(self, cursor):
+        """Creates the projects_fts table (backfilling it on first creation). Returns False if FTS5 is unavailable."""
+        try:
+            already_exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'projects_fts'").fetchone()
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5({', '.join(utils.PROJECT_FTS_COLUMNS)}, tokenize='unicode61', prefix='2 3')")
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search is unavailable: {e}")
+            return False
+        if already_exists: return True
+
+        sections = sorted(utils.PROJECT_FTS_SOURCE_SECTIONS)
+        read_cursor = cursor.connection.cursor()
+        read_cursor.row_factory = sqlite3.Row
+        read_cursor.execute(f"SELECT id, {', '.join(sections)} FROM projects")
+        fts_rows = []
+        for row in read_cursor:
+            project = {}
+            for key in sections:
+                value = row[key]
+                if isinstance(initial_project_data_template.get(key), (dict, list)) and isinstance(value, str):
+                    try: value = json.loads(value)
+                    except json.JSONDecodeError: value = None
+                project[key] = value
+            fts_rows.append((row['id'], *utils.build_project_search_row(project)))
+        placeholders = ", ".join(["?"] * (len(utils.PROJECT_FTS_COLUMNS) + 1))
+        cursor.executemany(f"INSERT INTO projects_fts (rowid, {', '.join(utils.PROJECT_FTS_COLUMNS)}) VALUES ({placeholders})", fts_rows)
+        return True
+
+    def full_text_search(self, text, limit=utils.PROJECT_FTS_PAGE_SIZE):
+        """
+        Returns (project ids, truncated): ids matching text, best match first (bm25-ranked,
+        prefix matching on every word), at most limit of them; truncated is True if more matched.
+        """
+        match_query = utils.build_fts_query(text)
+        if not self.db_path or not match_query: return [], False
+        if not self.fts_available:
+            return list(self.search_project_ids(text=text.strip())), False
+        weights = ", ".join(str(w) for w in utils.PROJECT_FTS_WEIGHTS)
+        try:
+            with utils.get_db_connection(self.db_path) as conn:
+                rows = conn.execute(f"SELECT rowid FROM projects_fts WHERE projects_fts MATCH ? ORDER BY bm25(projects_fts, {weights}) LIMIT ?",
+                                    (match_query, limit + 1))
+                ids = [row[0] for row in rows]
+                return ids[:limit], len(ids) > limit
+        except sqlite3.Error as e:
+            print(f"Error running full-text search: {e}")
+            return [], False
+
+    def _reindex_department_search(self):
+        """
+        The search index holds each project's department name and address. After a department
+        is added, renamed or restored, rewrite that column for the projects whose text is stale.
+        """
+        if not self.db_path or not self.fts_available or not Path(self.db_path).exists(): return
+        try:
+            with utils.get_db_connection(self.db_path) as conn:
+                for dept in self.department_cache.get_all():
+                    text = utils.department_search_text(dept['name'], dept['address'])
+                    conn.execute("UPDATE projects_fts SET department = ? WHERE department IS NOT ? AND rowid IN (SELECT id FROM projects WHERE departmentId = ?)",
+                                 (text, text, dept['id']))
+        except sqlite3.Error as e:
+            print(f"Error re-indexing departments: {e}")
+
+    def _sync_department_copy(self, project_data):
+        """Keeps a project's copy of its department's name and address in line with the departments table."""
+        dept = self.department_cache.get_by_id(project_data.get('departmentId'))
+        details = project_data.get('departmentDetails') if dept else None
+        if isinstance(details, dict) and (details.get('name'), details.get('address')) != (dept['name'], dept['address']):
+            details['name'] = dept['name']; details['address'] = dept['address']
+
+    def search_project_ids(self, text="", lead=None, department_id=None, status=None):
+        """Runs the home page filters as an indexed SQL query and returns the matching project ids."""
+        if not self.db_path: return set()
+        clauses, params = [], []
+        if text:
+            like = f"%{text}%"
+            clauses.append("(projectName LIKE ? OR workOrderId LIKE ? OR proposalId LIKE ? OR vendorName LIKE ?)")
+            params += [like] * 4
+        if lead is not None: clauses.append("projectLead = ?"); params.append(lead)
+        if department_id is not None: clauses.append("departmentId = ?"); params.append(department_id)
+        if status is not None: clauses.append("status = ?"); params.append(status)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        try:
+            with utils.get_db_connection(self.db_path) as conn:
+                return {row[0] for row in conn.execute(f"SELECT id FROM projects{where}", params)}
+        except sqlite3.Error as e:
+            print(f"Error searching projects: {e}")
+            return set()
+
     def update_project_status(self, project_data):
         bom_items = project_data.get('billOfMaterials', {}).get('items', [])
         if not bom_items:
@@ -514,42 +944,69 @@ class WorkflowApp(QMainWindow):
         else:
             project_data['status'] = "PENDING"
             
-    def create_project_specific_folder(self, project_data):
+    def project_folder_path(self, project_data):
         """
-        Creates a project-specific folder, now nested inside a department folder.
-        The path will be .../Working_Folder/Department_Name/Project_Name/
+        Where a project's folder belongs: .../Working_Folder/Department_Name/Project_Name/.
+        Nothing is created on disk.
         """
-        if not self.working_folder: return None
-        
-        project_name = project_data.get('projectName', '')
-        safe_project_name = "".join(c for c in project_name if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ", "_")
+        safe_project_name = utils.sanitize_folder_name(project_data.get('projectName', ''))
         if not safe_project_name:
             safe_project_name = f"project_{uuid.uuid4().hex[:8]}"
 
-        # --- MODIFIED: Logic to create department sub-folder ---
         base_path = Path(self.working_folder)
         department_id = project_data.get('departmentId')
-        
-        # Get department name from the database
         if department_id:
-            dept_info = utils.get_department_by_id(self.departments_db_path, department_id)
-            if dept_info and dept_info.get('name'):
-                safe_dept_name = "".join(c for c in dept_info['name'] if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ", "_")
+            dept_name = self.department_cache.get_name(department_id)
+            safe_dept_name = utils.sanitize_folder_name(dept_name) if dept_name else ""
+            if safe_dept_name:
                 base_path = base_path / safe_dept_name
-        
-        # The final project path is now nested
-        project_path = base_path / safe_project_name
-        # --- END MODIFICATION ---
+        return base_path / safe_project_name
 
+    def create_project_specific_folder(self, project_data):
+        """
+        Creates a project-specific folder, nested inside a department folder.
+        Only the project folder itself is made; the document subfolders (SUBFOLDER_NAMES)
+        are created when the first document is copied into each of them.
+        """
+        if not self.working_folder: return None
+        project_path = self.project_folder_path(project_data)
         try:
             project_path.mkdir(parents=True, exist_ok=True)
-            for sub_val in SUBFOLDER_NAMES.values():
-                (project_path / sub_val).mkdir(parents=True, exist_ok=True)
             return str(project_path)
         except OSError as e:
             QMessageBox.critical(self, "Folder Creation Error", f"Could not create folder '{project_path}':\n{e}")
             return None
 
+    def provision_project_folders(self, projects):
+        """
+        Bulk form of create_project_specific_folder for imports. Each distinct department
+        folder is created once, then each project gets a folder of its own: one that
+        already exists gets a numbered sibling instead, so an import never shares a
+        folder with another project. Returns (paths, errors, new_folders): paths[i] is the
+        folder of projects[i] or None if it could not be created, errors lists "path: reason"
+        lines, new_folders the folders this call created, parents first. No dialogs are shown.
+        """
+        if not self.working_folder: return [None] * len(projects), ["No working folder is selected."], []
+        paths, errors, new_folders, seen_parents = [], [], [], set()
+        for project_data in projects:
+            project_path = self.project_folder_path(project_data)
+            try:
+                if project_path.parent not in seen_parents:
+                    if not project_path.parent.exists():
+                        project_path.parent.mkdir(parents=True)
+                        new_folders.append(project_path.parent)
+                    seen_parents.add(project_path.parent)
+                base_path, suffix = project_path, 2
+                while project_path.exists():
+                    project_path = base_path.with_name(f"{base_path.name} ({suffix})"); suffix += 1
+                project_path.mkdir()
+                new_folders.append(project_path)
+                paths.append(str(project_path))
+            except OSError as e:
+                paths.append(None)
+                errors.append(f"{project_path}: {e}")
+        return paths, errors, new_folders
+
     def handle_save_and_go_home(self):
         current_frame = self.stacked_widget.currentWidget()
         if isinstance(current_frame, PageFrame) and not isinstance(current_frame, HomeView):
@@ -562,55 +1019,288 @@ class WorkflowApp(QMainWindow):
         if not self.app_ready:
             QMessageBox.warning(self, "Not Ready", "Please select a working folder before backing up.")
             return
-        if QMessageBox.information(self, "Manual Backup", "This will create a full backup of the current working folder.", QMessageBox.StandardButton.Ok | QMessageBox.StandardButton.Cancel) == QMessageBox.StandardButton.Ok:
-            self.progress_dialog = QProgressDialog("Backing up data...", "Cancel", 0, 100, self)
-            self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
-            self.backup_thread = QThread()
-            self.backup_worker = BackupWorker(self.working_folder, self.db_path, self.departments_db_path, is_manual=True)
-            self.backup_worker.moveToThread(self.backup_thread)
-            self.backup_thread.started.connect(self.backup_worker.run)
-            self.backup_worker.finished.connect(lambda s: (self.progress_dialog.setValue(100), QMessageBox.information(self, "Success", "Manual backup completed successfully.") if s else None))
-            self.backup_worker.error.connect(lambda e: (self.progress_dialog.close(), QMessageBox.critical(self, "Backup Error", e)))
-            self.backup_worker.progress.connect(self.progress_dialog.setValue)
-            self.backup_worker.finished.connect(self.backup_thread.quit)
-            self.backup_worker.finished.connect(self.backup_worker.deleteLater)
-            self.backup_thread.finished.connect(self.backup_thread.deleteLater)
-            self.backup_thread.start()
+        if self.backup_thread is not None:
+            QMessageBox.information(self, "Backup Running", "A backup is already in progress. Its progress is shown in the status bar.")
+            return
+        incremental = self.config_data.get('incremental_backups', False)
+        backup_kind = "an incremental snapshot" if incremental else "a full backup"
+        estimate = self.estimate_backup_size()
+        estimate_note = f"\n\nData to back up: about {documents.format_size(estimate)} (before compression)." if estimate else ""
+        if QMessageBox.information(self, "Manual Backup", f"This will create {backup_kind} of the current working folder.{estimate_note}", QMessageBox.StandardButton.Ok | QMessageBox.StandardButton.Cancel) == QMessageBox.StandardButton.Ok:
+            self.flush_pending_saves()
+            self.start_backup(is_manual=True)
+
+    def start_backup(self, is_manual):
+        """
+        Runs a BackupWorker on its own thread with progress in the status bar.
+        Scheduled backups run at the lowest thread priority, throttled, and are
+        skipped when nothing changed since the last completed backup.
+        """
+        self.backup_thread = QThread()
+        self.backup_worker = BackupWorker(self.working_folder, self.db_path, self.departments_db_path, is_manual=is_manual,
+                                          incremental=self.config_data.get('incremental_backups', False),
+                                          previous_fingerprint=self.config_data.get('last_backup_fingerprints', {}).get(self._backup_fingerprint_key()))
+        self.backup_worker.moveToThread(self.backup_thread)
+        self.backup_thread.started.connect(self.backup_worker.run)
+        self.backup_worker.progress.connect(self.backup_progress_bar.setValue)
+        self.backup_worker.completed.connect(lambda fingerprint: self._on_backup_completed(fingerprint, is_manual))
+        self.backup_worker.skipped.connect(lambda: self.statusBar().showMessage("Scheduled backup skipped: nothing changed since the last backup.", 5000))
+        if is_manual:
+            self.backup_worker.error.connect(lambda e: QMessageBox.critical(self, "Backup Error", e))
+        else:
+            self.backup_worker.error.connect(lambda e: self.statusBar().showMessage(f"Scheduled backup failed: {e}", 10000))
+        self.backup_worker.finished.connect(self.backup_thread.quit)
+        self.backup_worker.finished.connect(self.backup_worker.deleteLater)
+        self.backup_thread.finished.connect(self._on_backup_thread_finished)
+        self.backup_progress_bar.setValue(0)
+        self.backup_progress_bar.show()
+        self.backup_thread.start(QThread.Priority.InheritPriority if is_manual else QThread.Priority.LowestPriority)
+
+    def _backup_fingerprint_key(self):
+        return os.path.normcase(os.path.abspath(self.working_folder))
+
+    def _on_backup_completed(self, fingerprint, is_manual):
+        # One fingerprint per working folder; the old single value cannot be attributed to one, so it is dropped.
+        self.config_data.pop('last_backup_fingerprint', None)
+        self.config_data.setdefault('last_backup_fingerprints', {})[self._backup_fingerprint_key()] = fingerprint
+        self.save_config()
+        if is_manual:
+            QMessageBox.information(self, "Success", "Manual backup completed successfully.")
+        else:
+            self.statusBar().showMessage("Scheduled backup completed.", 5000)
+
+    def _on_backup_thread_finished(self):
+        self.backup_progress_bar.hide()
+        self.backup_thread.deleteLater()
+        self.backup_thread = None
+        self.backup_worker = None
+
+    def stop_backup(self):
+        """
+        Cancels a running backup and waits for its thread. If it does not stop within
+        BACKUP_STOP_GRACE_MS, a busy dialog is shown and the event loop keeps running,
+        so the window does not freeze while the current file is finished off.
+        """
+        self.auto_backup_timer.stop()
+        thread = self.backup_thread
+        if thread is None: return
+        self.backup_worker.cancel()
+        if thread.wait(BACKUP_STOP_GRACE_MS): return
+        dialog = QProgressDialog("Stopping the running backup...", None, 0, 0, self)
+        dialog.setWindowTitle("Backup")
+        dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
+        dialog.setMinimumDuration(0)
+        dialog.show()
+        loop = QEventLoop()
+        thread.finished.connect(loop.quit)   # queued from the backup thread, so it cannot fire before exec()
+        if thread.isRunning(): loop.exec()
+        dialog.close()
+
+    def schedule_auto_backups(self):
+        minutes = self.config_data.get('auto_backup_minutes', AUTO_BACKUP_INTERVALS["Every Hour"])
+        if minutes: self.auto_backup_timer.start(minutes * 60 * 1000)
+        else: self.auto_backup_timer.stop()
+
+    def set_auto_backup_interval(self, minutes):
+        self.config_data['auto_backup_minutes'] = minutes
+        self.save_config()
+        if self.app_ready: self.schedule_auto_backups()
+
+    def run_scheduled_backup(self):
+        # Only start at a quiet moment: no backup running and no edits waiting to be written.
+        # Otherwise try again shortly instead of waiting a whole interval.
+        if not self.app_ready or self.backup_thread is not None or not self.persistence_worker.is_idle():
+            self.auto_backup_timer.start(AUTO_BACKUP_RETRY_MS)
+            return
+        self.schedule_auto_backups()
+        self.start_backup(is_manual=False)
+
+    def set_incremental_backups(self, enabled):
+        self.config_data['incremental_backups'] = enabled
+        self.save_config()
+
+    def set_deduplicate_documents(self, enabled):
+        self.config_data['deduplicate_documents'] = enabled
+        self.save_config()
+        self.apply_document_store_setting()
+
+    def apply_document_store_setting(self):
+        """ Points the ingestion service at this working folder's blob store, or detaches it. """
+        if self.working_folder and self.config_data.get('deduplicate_documents', False):
+            self.document_service.set_blob_store(documents.DocumentBlobStore(Path(self.working_folder) / documents.BLOB_STORE_DIR))
+        else:
+            self.document_service.set_blob_store(None)
+
+    def _record_ingested_document(self, project_id, section, source, destination, sha256):
+        """ Writes the documents row of an attachment as soon as its copy completes. """
+        try:
+            documents.record_document_row(utils.get_db_connection(self.db_path), project_id, section, Path(source).name, destination, sha256)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Could not record document '{Path(destination).name}': {e}")
 
     def restore_from_backup(self):
-        if QMessageBox.warning(self, "Restore from Backup", "This will overwrite all current project data in this working folder.\n\nAre you absolutely sure you want to proceed?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No) != QMessageBox.StandardButton.Yes: return
-            
+        if self.backup_thread is not None:
+            QMessageBox.information(self, "Backup Running", "Please wait for the current backup to finish before restoring.")
+            return
         backup_dir = utils.get_app_config_base_path() / "Global_Backups"
-        backup_file, _ = QFileDialog.getOpenFileName(self, "Select Backup File", str(backup_dir), "ZIP Files (*.zip)")
+        backup_file, _ = QFileDialog.getOpenFileName(self, "Select Backup File", str(backup_dir), "All Backups (*.zip *.json);;ZIP Files (*.zip);;Incremental Snapshots (*.json)")
         if not backup_file: return
             
+        # No scheduled backup or document scan may start while files are being replaced; restarting re-arms them.
+        self.auto_backup_timer.stop()
+        self.stop_document_scan()
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                with zipfile.ZipFile(backup_file, 'r') as zipf:
-                    zipf.extractall(temp_dir)
-                temp_path = Path(temp_dir)
-                db_path_in_zip = next(temp_path.glob('*/workflow_app.db'), None)
-                if not db_path_in_zip: raise FileNotFoundError("Backup is invalid: workflow_app.db not found.")
-                
-                working_folder_name_in_zip = db_path_in_zip.parent.name
-                for item in Path(self.working_folder).iterdir():
-                    if item.name != "backups":
-                        if item.is_dir(): shutil.rmtree(item)
-                        else: item.unlink()
-                
-                if (temp_path / 'departments.db').exists():
-                    shutil.copy2(temp_path / 'departments.db', self.departments_db_path)
-                
-                source_wf = temp_path / working_folder_name_in_zip
-                for item in source_wf.iterdir():
-                    if item.is_dir(): shutil.copytree(item, Path(self.working_folder) / item.name)
-                    else: shutil.copy2(item, self.working_folder)
+            with backup.open_backup_source(backup_file) as source, tempfile.TemporaryDirectory() as temp_dir:
+                arcnames = set(source.arcnames())
+                db_arcname = next((name for name in arcnames if name.count('/') == 1 and name.endswith('/workflow_app.db')), None)
+                if not db_arcname: raise FileNotFoundError("Backup is invalid: workflow_app.db not found.")
+                folder_in_backup = db_arcname.split('/')[0]
+
+                # Only the databases are unpacked up front, to offer a project or department as the restore scope.
+                staged_db = Path(temp_dir) / "workflow_app.db"
+                staged_departments_db = Path(temp_dir) / "departments.db" if "departments.db" in arcnames else None
+                staged = {db_arcname: staged_db}
+                if staged_departments_db: staged["departments.db"] = staged_departments_db
+                backup.restore_members(source, staged)
+
+                scope = self._choose_restore_scope(staged_db, staged_departments_db)
+                if scope is None: return
+                label, projects = scope
+                warning = ("This will overwrite all current project data in this working folder." if projects is None
+                           else f"This will overwrite the current data and files of {label}.")
+                if QMessageBox.warning(self, "Restore from Backup", f"{warning}\n\nAre you absolutely sure you want to proceed?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No) != QMessageBox.StandardButton.Yes: return
+
+                if projects is None:
+                    written, skipped = self._restore_working_folder(source, folder_in_backup)
+                else:
+                    written, skipped = self._restore_projects(source, folder_in_backup, staged_db, staged_departments_db, projects)
             
-            utils.log_activity(f"System restored from backup: {Path(backup_file).name}")
+            utils.log_activity(f"Restored {label} from backup: {Path(backup_file).name} ({len(written)} files written, {len(skipped)} unchanged)")
             QMessageBox.information(self, "Restore Complete", "Restore successful. The application will now restart.")
             self.restart_application()
         except Exception as e:
             QMessageBox.critical(self, "Restore Failed", f"An error occurred during restore: {e}")
+        finally:
+            self.schedule_auto_backups()
+
+    def _choose_restore_scope(self, staged_db, staged_departments_db):
+        """
+        Asks whether to restore everything, one department or one project.
+        Returns None if cancelled, otherwise (label, projects) where projects is None
+        for the whole working folder or the list of backed-up project rows to restore.
+        """
+        conn = sqlite3.connect(staged_db)
+        try:
+            conn.row_factory = sqlite3.Row
+            projects = [dict(row) for row in conn.execute("SELECT id, projectName, departmentId, projectFolderPath FROM projects ORDER BY projectName COLLATE NOCASE")]
+        finally:
+            conn.close()
+        department_names = {}
+        if staged_departments_db:
+            conn = sqlite3.connect(staged_departments_db)
+            try: department_names = dict(conn.execute("SELECT id, name FROM departments"))
+            finally: conn.close()
+
+        choices = {"Entire working folder": ("the entire working folder", None)}
+        for department_id, name in sorted(department_names.items(), key=lambda item: item[1].lower()):
+            members = [p for p in projects if p['departmentId'] == department_id]
+            if members: choices[f"Department: {name}"] = (f"department '{name}'", members)
+        for project in projects:
+            choices[f"Project: {project['projectName']} (#{project['id']})"] = (f"project '{project['projectName']}'", [project])
+
+        item, ok = QInputDialog.getItem(self, "Restore from Backup", "What should be restored?", list(choices), 0, False)
+        return choices[item] if ok else None
+
+    def _restore_working_folder(self, source, folder_in_backup):
+        targets = {}
+        for arcname in source.arcnames():
+            if arcname == "departments.db":
+                targets[arcname] = Path(self.departments_db_path)
+            elif arcname.startswith(f"{folder_in_backup}/"):
+                targets[arcname] = Path(self.working_folder) / arcname[len(folder_in_backup) + 1:]
+
+        # Finish queued writes, then release open handles before the databases are replaced.
+        # Closing the last connection checkpoints the WAL, so the leftover -wal/-shm files hold nothing.
+        self.persistence_worker.release_connections()
+        utils.close_db_connections()
+        for db_path in (self.db_path, self.departments_db_path):
+            for suffix in ("-wal", "-shm"):
+                Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+
+        written, skipped = backup.restore_members(source, targets)
+        self._remove_files_not_restored(Path(self.working_folder), targets.values())
+        return written, skipped
+
+    def _restore_projects(self, source, folder_in_backup, staged_db, staged_departments_db, projects):
+        """ Restores the folders and database rows of the given backed-up projects, leaving everything else as it is. """
+        self.flush_pending_saves()
+        targets, folders = {}, []
+        for project in projects:
+            try: relative = Path(project['projectFolderPath']).relative_to(self.working_folder)
+            except (TypeError, ValueError): continue  # Folder outside this working folder: only the project data is restored.
+            if not relative.parts: continue
+            prefix = f"{folder_in_backup}/{relative.as_posix()}/"
+            folders.append(Path(self.working_folder) / relative)
+            for arcname in source.arcnames():
+                if arcname.startswith(prefix):
+                    targets[arcname] = Path(self.working_folder) / arcname[len(folder_in_backup) + 1:]
+
+        written, skipped = backup.restore_members(source, targets)
+        for folder in folders:
+            if folder.is_dir(): self._remove_files_not_restored(folder, targets.values())
+        self._merge_projects_from_backup(staged_db, staged_departments_db, projects)
+        return written, skipped
+
+    def _remove_files_not_restored(self, root, restored_paths):
+        """
+        Deletes files under root that are not part of the restore, so the folder matches the backup.
+        The backups folder is kept, and so is the blob store: a backup from before it was backed up
+        has none of its blobs, and the store's own add() check keeps any stale blob from being reused.
+        """
+        keep = {Path(p) for p in restored_paths} | {Path(self.departments_db_path)}
+        for dirpath, dirnames, filenames in os.walk(root):
+            if Path(dirpath) == Path(self.working_folder):
+                dirnames[:] = [d for d in dirnames if d not in ("backups", documents.BLOB_STORE_DIR)]
+            for name in filenames:
+                file_path = Path(dirpath) / name
+                if file_path not in keep: documents.remove_document(file_path)
+
+    def _merge_projects_from_backup(self, staged_db, staged_departments_db, projects):
+        """ Copies project rows from a backup database into the live one, plus any of their departments that no longer exist. """
+        project_ids = [p['id'] for p in projects]
+        placeholders = ", ".join(["?"] * len(project_ids))
+        with utils.get_db_connection(self.db_path) as conn:
+            conn.execute("ATTACH DATABASE ? AS restore_src", (str(staged_db),))
+            try:
+                cursor = conn.cursor()
+                backup_columns = {row[1] for row in cursor.execute("PRAGMA restore_src.table_info(projects)")}
+                columns = ", ".join(row[1] for row in cursor.execute("PRAGMA main.table_info(projects)").fetchall() if row[1] in backup_columns)
+                cursor.execute(f"INSERT OR REPLACE INTO projects ({columns}) SELECT {columns} FROM restore_src.projects WHERE id IN ({placeholders})", project_ids)
+                for project_id in project_ids:
+                    refresh_derived_columns(cursor, project_id)
+                if self.fts_available:
+                    sections = sorted(utils.PROJECT_FTS_SOURCE_SECTIONS)
+                    for row in cursor.execute(f"SELECT id, {', '.join(sections)} FROM projects WHERE id IN ({placeholders})", project_ids).fetchall():
+                        project = {'id': row[0]}
+                        for key, value in zip(sections, row[1:]):
+                            project[key] = utils.decode_project_section(key, value) if isinstance(initial_project_data_template.get(key), (dict, list)) else value
+                        sync_project_fts(cursor, project, utils.PROJECT_FTS_SOURCE_SECTIONS)
+                conn.commit()
+            except Exception:
+                conn.rollback(); raise
+            finally:
+                conn.execute("DETACH DATABASE restore_src")
+
+        department_ids = sorted({p['departmentId'] for p in projects if p['departmentId']})
+        if staged_departments_db and department_ids:
+            with utils.get_db_connection(self.departments_db_path) as conn:
+                conn.execute("ATTACH DATABASE ? AS restore_src", (str(staged_departments_db),))
+                try:
+                    conn.execute(f"INSERT OR IGNORE INTO departments (id, name, address, createdAt, updatedAt) SELECT id, name, address, createdAt, updatedAt FROM restore_src.departments WHERE id IN ({', '.join(['?'] * len(department_ids))})", department_ids)
+                    conn.commit()
+                finally:
+                    conn.execute("DETACH DATABASE restore_src")
+            self.department_cache.invalidate()
 
     def navigate_to_project_details(self, project_id):
         if project_id is not None:
@@ -622,6 +1312,7 @@ class WorkflowApp(QMainWindow):
         is_new_project = project_data.get('id') is None
         if not project_data.get('projectName', '').strip() and is_new_project: return False
         
+        self._sync_department_copy(project_data)
         project_data['updatedAt'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
         if is_new_project:
             project_data['createdAt'] = project_data['updatedAt']
@@ -629,27 +1320,37 @@ class WorkflowApp(QMainWindow):
                 # --- MODIFIED: Pass the whole project_data dict ---
                 project_data['projectFolderPath'] = self.create_project_specific_folder(project_data)
         
-        data_for_sql = {k: json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in project_data.items() if k != 'id'}
+        persisted = None if is_new_project else self.projects_by_id.get(project_data['id'])
+        changed_keys = self._get_changed_sections(project_data, persisted)
+        
+        if not is_new_project:
+            # Updates are written behind on the persistence thread; the in-memory index is patched right away.
+            self.current_project_data = project_data
+            # Sections whose earlier save failed are written again with this one.
+            failed = self.failed_saves.pop(project_data['id'], None)
+            if failed: changed_keys |= failed[2]
+            snapshot = self._update_project_cache(project_data, changed_keys)
+            self.persistence_worker.submit(self.db_path, snapshot, changed_keys, self.fts_available)
+            if is_final_step: self.set_current_project_for_editing(None)
+            return True
         
+        # Inserts stay synchronous: the caller needs the new id straight away.
+        data_for_sql = {k: json.dumps(v) if isinstance(v, (dict, list)) else v for k, v in project_data.items() if k in changed_keys}
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with utils.get_db_connection(self.db_path) as conn:
                 cursor = conn.cursor()
-                if not is_new_project:
-                    update_fields = ", ".join([f"{key} = ?" for key in data_for_sql])
-                    values = list(data_for_sql.values()) + [project_data['id']]
-                    cursor.execute(f"UPDATE projects SET {update_fields} WHERE id = ?", tuple(values))
-                else:
-                    columns = ", ".join(data_for_sql.keys())
-                    placeholders = ", ".join(["?"] * len(data_for_sql))
-                    cursor.execute(f"INSERT INTO projects ({columns}) VALUES ({placeholders})", tuple(data_for_sql.values()))
-                    project_data['id'] = cursor.lastrowid
+                columns = ", ".join(data_for_sql.keys())
+                placeholders = ", ".join(["?"] * len(data_for_sql))
+                cursor.execute(f"INSERT INTO projects ({columns}) VALUES ({placeholders})", tuple(data_for_sql.values()))
+                project_data['id'] = cursor.lastrowid
+                refresh_derived_columns(cursor, project_data['id'], changed_keys)
+                if self.fts_available: sync_project_fts(cursor, project_data, changed_keys)
                 conn.commit()
 
-            log_msg = f"New project '{project_data['projectName']}' created." if is_new_project else f"Project '{project_data['projectName']}' updated."
-            utils.log_activity(log_msg, project_id=project_data['id'])
+            utils.log_activity(f"New project '{project_data['projectName']}' created.", project_id=project_data['id'])
             
             self.current_project_data = project_data
-            self.load_projects_from_sqlite() 
+            self._update_project_cache(project_data)
             if is_final_step: self.set_current_project_for_editing(None) 
             return True
         except (sqlite3.Error, json.JSONDecodeError) as e:
@@ -765,8 +1466,12 @@ class WorkflowApp(QMainWindow):
         # This block MUST be "dedented" to the same level as the 'if' statement
         self.db_path = Path(self.working_folder) / 'workflow_app.db'
         self.init_db()
+        utils.set_activity_log_scope(self.db_path)
         utils.log_activity("Application started.")
         self.app_ready = True
+        self.apply_document_store_setting()
+        self.schedule_auto_backups()
+        self.start_document_scan()
         self.show_frame("HomeView")
         self.statusBar().showMessage(f"Ready. Logged in as: {self.current_user_data.get('username', 'Guest')}", 3000)
         
@@ -805,7 +1510,15 @@ class WorkflowApp(QMainWindow):
         except Exception as e: print(f"Error saving config: {e}")
 
     def restart_application(self):
+        self.stop_backup()
+        self.stop_document_scan()
+        self.stop_project_import()
+        self.document_service.shutdown()
+        self.thumbnail_cache.shutdown()
         self.save_config()
+        self.stop_persistence_worker()
+        utils.shutdown_activity_log()
+        utils.close_db_connections()
         os.execl(sys.executable, sys.executable, *sys.argv)
     
     def select_working_folder_menu_action(self):
@@ -829,44 +1542,324 @@ class WorkflowApp(QMainWindow):
     
     
 
+    def _get_changed_sections(self, project_data, persisted):
+        """
+        Returns the top-level keys of project_data that differ from the last
+        persisted copy held in the project index. Unchanged sections compare
+        equal without being serialized, so they are skipped on UPDATE.
+        """
+        if persisted is None:
+            return {k for k in project_data if k != 'id'}
+        changed = set()
+        # raw_items() does not copy, so sections still shared copy-on-write are skipped by identity.
+        items = project_data.raw_items() if isinstance(project_data, utils.CopyOnWriteProject) else project_data.items()
+        for k, v in items:
+            if k == 'id': continue
+            if k not in persisted: changed.add(k); continue
+            previous = persisted[k]
+            if previous is v: continue  # still the snapshot's own object: never opened for editing
+            if previous != v: changed.add(k)
+        return changed
+
+    def _update_project_cache(self, project_data, changed_keys=None):
+        """Patches the in-memory project index after a single insert/update."""
+        project_id = project_data['id']
+        previous = self.projects_by_id.get(project_id)
+        if previous is None or changed_keys is None:
+            snapshot = utils.ProjectRecord(self.db_path, copy.deepcopy(project_data))
+        else:
+            # Unchanged sections are already identical (or still unloaded) in the previous snapshot.
+            snapshot = previous.updated({key: copy.deepcopy(project_data[key]) for key in changed_keys})
+        if previous is not None:
+            self.all_projects_data.remove(previous)
+        # The list mirrors 'ORDER BY updatedAt DESC', so a saved project moves to the top.
+        self.all_projects_data.insert(0, snapshot)
+        self.projects_by_id[project_id] = snapshot
+        self.project_changed.emit(project_id)
+        return snapshot
+
+    def _on_projects_persisted(self, project_ids):
+        # SQL searches may have run before these rows hit the disk.
+        home_view = self.frames.get("HomeView")
+        if home_view and home_view.project_proxy.is_filtering(): home_view.apply_project_search()
+        # Saved doc lists may reference new or removed files; rescan once the edits settle.
+        self.document_scan_timer.start()
+
+    def start_document_scan(self, report=False):
+        """ Scans every project's documents in the background. With report=True the result is shown when it is ready. """
+        if not self.app_ready: return
+        self.document_scan_report = self.document_scan_report or report
+        if self.document_scan_thread is not None:
+            self.document_scan_pending = True
+            return
+        self.document_scan_thread = QThread()
+        self.document_scan_worker = DocumentScanWorker(self.working_folder, self.db_path, self.document_index)
+        self.document_scan_cancel = self.document_scan_worker.cancelled  # outlives the worker's deleteLater()
+        self.document_scan_worker.moveToThread(self.document_scan_thread)
+        self.document_scan_thread.started.connect(self.document_scan_worker.run)
+        self.document_scan_worker.scanned.connect(self._on_document_scan_finished)
+        self.document_scan_worker.finished.connect(self.document_scan_thread.quit)
+        self.document_scan_worker.finished.connect(self.document_scan_worker.deleteLater)
+        self.document_scan_thread.finished.connect(self._on_document_scan_thread_finished)
+        self.document_scan_thread.start(QThread.Priority.LowPriority)
+
+    def _on_document_scan_finished(self, index):
+        report, self.document_scan_report = self.document_scan_report, False
+        if index is None:
+            if report: QMessageBox.warning(self, "Document Check", "The document check could not be completed.")
+            return
+        self.document_index = index
+        if report:
+            self.show_document_scan_report(index)
+        elif index.missing:
+            self.statusBar().showMessage(f"{len(index.missing)} document link(s) point to missing files. See File > Check Document Links.", 8000)
+
+    def _on_document_scan_thread_finished(self):
+        self.document_scan_thread.deleteLater()
+        self.document_scan_thread = None
+        if self.document_scan_pending:
+            self.document_scan_pending = False
+            self.start_document_scan()
+
+    def stop_document_scan(self):
+        self.document_scan_timer.stop()
+        self.document_scan_pending = False
+        if self.document_scan_thread is not None:
+            self.document_scan_cancel.set()
+            self.document_scan_thread.quit()
+            self.document_scan_thread.wait()
+
+    def import_projects_from_file(self):
+        """ Bulk-creates projects from a CSV/XLSX sheet: validated in the background, then inserted in one transaction. """
+        if not self.app_ready: return
+        if self.import_thread is not None:
+            QMessageBox.information(self, "Import Projects", "An import is already being prepared.")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Import Projects", str(Path.home()), "Spreadsheets (*.csv *.xlsx);;CSV Files (*.csv);;Excel Files (*.xlsx)")
+        if not path: return
+        self.import_thread = QThread()
+        self.import_worker = ProjectImportWorker(path)
+        self.import_worker.moveToThread(self.import_thread)
+        self.import_thread.started.connect(self.import_worker.run)
+        self.import_worker.finished.connect(self._on_import_validated)
+        self.import_worker.error.connect(lambda message: QMessageBox.critical(self, "Import Projects", message))
+        for signal in (self.import_worker.finished, self.import_worker.error):
+            signal.connect(self.import_thread.quit)
+            signal.connect(self.import_worker.deleteLater)
+        self.import_thread.finished.connect(self._on_import_thread_finished)
+        self.statusBar().showMessage(f"Checking {Path(path).name}...")
+        self.import_thread.start()
+
+    def _on_import_thread_finished(self):
+        self.import_thread.deleteLater()
+        self.import_thread = None
+        self.statusBar().clearMessage()
+
+    def stop_project_import(self):
+        if self.import_thread is not None:
+            self.import_thread.quit()
+            self.import_thread.wait()
+
+    def _on_import_validated(self, plan):
+        if not plan.projects:
+            box = QMessageBox(QMessageBox.Icon.Warning, "Import Projects", f"No projects could be imported from {Path(plan.source).name}.", QMessageBox.StandardButton.Ok, self)
+            if plan.errors: box.setDetailedText("\n".join(f"Row {row}: {message}" for row, message in plan.errors))
+            box.exec()
+            return
+        try:
+            clashes = importer.find_clashes(utils.get_db_connection(self.db_path), plan.projects)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Import Projects", f"Could not check for existing projects: {e}")
+            return
+        new_departments = [name for name in plan.department_names() if self.department_cache.get_by_name(name) is None]
+        summary = (f"Ready to import {len(plan.projects)} project(s) from {Path(plan.source).name}, "
+                   f"with {plan.bom_lines} BOM line(s) and {plan.transactions} transaction(s).")
+        notes = []
+        if clashes: notes.append(f"{len(clashes)} project(s) match existing projects by name or work order ID; they can be skipped.")
+        if plan.errors: notes.append(f"{len(plan.errors)} row(s) have errors; their projects will be skipped.")
+        if new_departments: notes.append(f"{len(new_departments)} new department(s) will be created: {', '.join(new_departments[:5])}{'...' if len(new_departments) > 5 else ''}")
+        if plan.ignored_columns: notes.append(f"Ignored columns: {', '.join(plan.ignored_columns)}")
+        box = QMessageBox(QMessageBox.Icon.Question, "Import Projects", summary, QMessageBox.StandardButton.Cancel, self)
+        import_button = box.addButton("Import All" if clashes else "Import", QMessageBox.ButtonRole.AcceptRole)
+        skip_button = box.addButton("Skip Existing", QMessageBox.ButtonRole.AcceptRole) if clashes else None
+        box.setDefaultButton(skip_button or import_button)
+        if notes: box.setInformativeText("\n".join(notes))
+        details = [f"Exists: {reason}" for reason in clashes.values()] + [f"Row {row}: {message}" for row, message in plan.errors]
+        if details: box.setDetailedText("\n".join(details))
+        box.exec()
+        clicked = box.clickedButton()
+        if clicked is None or clicked not in (import_button, skip_button): return
+        if clicked is skip_button:
+            plan.projects = [project for index, project in enumerate(plan.projects) if index not in clashes]
+            if not plan.projects:
+                QMessageBox.information(self, "Import Projects", "Every project in the file already exists; nothing was imported.")
+                return
+            new_departments = [name for name in plan.department_names() if self.department_cache.get_by_name(name) is None]
+        self._apply_import(plan, new_departments)
+
+    def _apply_import(self, plan, new_departments):
+        self.flush_pending_saves()
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        folder_errors, new_folders = [], []
+        try:
+            addresses = plan.department_names()
+            for name in new_departments:
+                utils.add_department_to_db(self.departments_db_path, name, addresses[name])
+            self.department_cache.invalidate()
+            for project in plan.projects:
+                dept = self.department_cache.get_by_name(project['departmentDetails']['name']) if project['departmentDetails']['name'] else None
+                if dept:
+                    project['departmentId'] = dept['id']
+                    project['departmentDetails'].update(name=dept['name'], address=dept['address'])
+            if self.working_folder:
+                paths, folder_errors, new_folders = self.provision_project_folders(plan.projects)
+                for project, folder in zip(plan.projects, paths): project['projectFolderPath'] = folder or ''
+            ids = importer.insert_projects(utils.get_db_connection(self.db_path), plan.projects, self.fts_available)
+        except sqlite3.Error as e:
+            # The rows were rolled back; take the folders made for them away too (they are still empty).
+            for folder in reversed(new_folders):
+                try: folder.rmdir()
+                except OSError: pass
+            QApplication.restoreOverrideCursor()
+            QMessageBox.critical(self, "Import Projects", f"The import was rolled back: {e}")
+            return
+        QApplication.restoreOverrideCursor()
+        utils.log_activity(f"Imported {len(ids)} project(s) from '{Path(plan.source).name}'.")
+        self.load_projects_from_sqlite()
+        self.statusBar().showMessage(f"Imported {len(ids)} project(s).", 8000)
+        if folder_errors:
+            QMessageBox.warning(self, "Import Projects", f"The projects were imported, but {len(folder_errors)} project folder(s) could not be created:\n" + "\n".join(folder_errors[:10]))
+
+    def show_storage_report(self):
+        """ Disk use per project and duplicated attachments, answered from the documents table. """
+        if not self.app_ready: return
+        try:
+            conn = utils.get_db_connection(self.db_path)
+            storage = documents.project_storage(conn)
+            duplicates = documents.duplicate_documents(conn)
+            total = documents.referenced_bytes(conn)
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Storage Report", f"Could not read document metadata: {e}")
+            return
+        project_names = {p.get('id'): p.get('projectName', 'N/A') for p in self.all_projects_data}
+        wasted = sum((copies - 1) * size for _, copies, size, _ in duplicates)
+        summary = (f"Attachments: {documents.format_size(total)} across {len(storage)} project(s)\n"
+                   f"Duplicated content: {len(duplicates)} file(s), {documents.format_size(wasted)} reclaimable")
+        lines = [f"{project_names.get(project_id, project_id)}: {count} file(s), {documents.format_size(size)}" for project_id, count, size in storage]
+        if duplicates:
+            lines.append("")
+            lines += [f"DUPLICATE x{copies} ({documents.format_size(size)} each): {names}" for _, copies, size, names in duplicates]
+        box = QMessageBox(QMessageBox.Icon.Information, "Storage Report", summary, QMessageBox.StandardButton.Ok, self)
+        box.setInformativeText("Figures come from the last document check.")
+        if lines: box.setDetailedText("\n".join(lines))
+        box.exec()
+
+    def estimate_backup_size(self):
+        """ Uncompressed size of a full backup: referenced attachments, the blob store and both databases. 0 if unknown. """
+        try:
+            total = documents.referenced_bytes(utils.get_db_connection(self.db_path))
+        except sqlite3.Error:
+            return 0
+        blob_store = Path(self.working_folder) / documents.BLOB_STORE_DIR
+        if blob_store.is_dir():
+            total += sum(f.stat().st_size for f in blob_store.rglob("*") if f.is_file())
+        for db_path in (self.db_path, Path(self.departments_db_path)):
+            if Path(db_path).exists(): total += Path(db_path).stat().st_size
+        return total
+
+    def show_document_scan_report(self, index):
+        project_names = {p.get('id'): p.get('projectName', 'N/A') for p in self.all_projects_data}
+        summary = (f"Missing files: {len(index.missing)}\n"
+                   f"Changed since the previous check: {len(index.changed)}\n"
+                   f"Files in project folders not linked to any project: {len(index.orphans)}")
+        lines = []
+        for title, entries in (("MISSING", index.missing), ("CHANGED", index.changed)):
+            for project_id, name, path in entries:
+                lines.append(f"{title}: {project_names.get(project_id, project_id)} - {name} ({path})")
+        lines += [f"UNLINKED: {path}" for path in index.orphans]
+        box = QMessageBox(QMessageBox.Icon.Information if not lines else QMessageBox.Icon.Warning, "Document Check", summary, QMessageBox.StandardButton.Ok, self)
+        if lines: box.setDetailedText("\n".join(lines))
+        box.exec()
+
+    def _on_persistence_error(self, message, jobs):
+        # The in-memory index still holds the edits; keep them as unsaved rather than reloading over them.
+        for db_path, snapshot, changed_keys, fts_available in jobs:
+            if db_path != self.db_path or snapshot.get('id') is None: continue
+            previous = self.failed_saves.get(snapshot['id'])
+            if previous: changed_keys = previous[2] | changed_keys
+            self.failed_saves[snapshot['id']] = (db_path, snapshot, changed_keys, fts_available)
+        if not self.failed_saves: return
+        self.statusBar().showMessage(f"{len(self.failed_saves)} project(s) have unsaved changes.")
+        box = QMessageBox(QMessageBox.Icon.Critical, "Save Error", f"{message}\n\nThe changes are kept in memory and have not been saved.", parent=self)
+        retry_button = box.addButton("Retry", QMessageBox.ButtonRole.AcceptRole)
+        discard_button = box.addButton("Discard Changes", QMessageBox.ButtonRole.DestructiveRole)
+        box.addButton("Keep for Later", QMessageBox.ButtonRole.RejectRole)
+        box.exec()
+        if box.clickedButton() is retry_button:
+            self.retry_failed_saves()
+        elif box.clickedButton() is discard_button:
+            self.failed_saves.clear()
+            self.statusBar().clearMessage()
+            self.load_projects_from_sqlite()
+
+    def retry_failed_saves(self):
+        """Queues every failed save again."""
+        jobs, self.failed_saves = list(self.failed_saves.values()), {}
+        self.statusBar().clearMessage()
+        for job in jobs: self.persistence_worker.submit(*job)
+
+    def flush_pending_saves(self):
+        """Blocks until queued project updates are on disk."""
+        self.persistence_worker.wait_until_idle()
+
+    def stop_persistence_worker(self):
+        if self.persistence_thread.isRunning():
+            self.persistence_worker.stop()
+            self.persistence_thread.quit()
+            self.persistence_thread.wait()
+
     def load_projects_from_sqlite(self):
+        self.flush_pending_saves()
         if not self.db_path or not Path(self.db_path).exists():
             self.all_projects_data = []
+            self.projects_by_id = {}
             if self.app_ready:
                 home_view = self.frames.get("HomeView")
                 if home_view: home_view.refresh_project_list()
             return
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with utils.get_db_connection(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute("SELECT * FROM projects ORDER BY updatedAt DESC, id DESC")
-                self.all_projects_data = []
-                for row in cursor.fetchall():
-                    project = dict(row)
-                    for key, template_val in initial_project_data_template.items():
-                        if isinstance(template_val, (dict, list)):
-                            if project.get(key) and isinstance(project[key], str):
-                                try: project[key] = json.loads(project[key])
-                                except json.JSONDecodeError: project[key] = copy.deepcopy(template_val)
-                            elif project.get(key) is None: project[key] = copy.deepcopy(template_val)
-                    self.all_projects_data.append(project)
+                cursor.row_factory = sqlite3.Row
+                # Summary projection only: JSON sections are fetched per section when first read.
+                cursor.execute(f"SELECT {utils.ProjectRecord.summary_select_sql()} FROM projects ORDER BY updatedAt DESC, id DESC")
+                self.all_projects_data = [utils.ProjectRecord.from_summary_row(self.db_path, row) for row in cursor.fetchall()]
+            # Projects whose last save failed keep their unsaved in-memory version.
+            self.all_projects_data = [self.failed_saves[p['id']][1] if p['id'] in self.failed_saves else p for p in self.all_projects_data]
+            self.projects_by_id = {p['id']: p for p in self.all_projects_data}
+            self.projects_loaded = True
         except sqlite3.Error as e:
             QMessageBox.critical(self, "Database Error", f"Error loading projects: {e}")
             self.all_projects_data = []
+            self.projects_by_id = {}
         if self.app_ready:
             home_view = self.frames.get("HomeView")
             if home_view: home_view.refresh_project_list()
         
     def set_current_project_for_editing(self, project_id=None):
         if project_id is not None:
-            project_from_list = next((p for p in self.all_projects_data if p.get('id') == project_id), None)
+            project_from_list = self.projects_by_id.get(project_id)
             if project_from_list:
-                self.current_project_data = copy.deepcopy(project_from_list)
+                try:
+                    # Shares sections with the cached snapshot; each is copied only when a page opens it.
+                    self.current_project_data = utils.CopyOnWriteProject(project_from_list.hydrate())
+                except sqlite3.Error as e:
+                    QMessageBox.critical(self, "Database Error", f"Error loading project: {e}")
+                    self.current_project_data = utils.CopyOnWriteProject(initial_project_data_template)
             else:
-                self.current_project_data = copy.deepcopy(initial_project_data_template)
+                self.current_project_data = utils.CopyOnWriteProject(initial_project_data_template)
         else:
-            self.current_project_data = copy.deepcopy(initial_project_data_template)
+            self.current_project_data = utils.CopyOnWriteProject(initial_project_data_template)
 
     def get_project_bom_total(self):
         if not self.current_project_data: return 0.0
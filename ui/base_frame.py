@@ -15,7 +15,6 @@
 
 
 import sys
-import shutil
 from pathlib import Path
 import copy # <-- IMPORT COPY
 from PyQt6.QtWidgets import (
@@ -23,9 +22,11 @@ from PyQt6.QtWidgets import (
     QLabel, QSizePolicy
 )
 from PyQt6.QtCore import pyqtSignal, Qt
-from PyQt6.QtGui import QFont
+from PyQt6.QtGui import QFont, QBrush, QColor
 
 from config import initial_project_data_template, SUBFOLDER_NAMES
+import utils
+import documents
 
 class PageFrame(QWidget):
     """Base class for all page frames in the application using PyQt."""
@@ -50,12 +51,26 @@ class PageFrame(QWidget):
             return
             
         if self.controller.current_project_data is None:
-            self.controller.current_project_data = copy.deepcopy(initial_project_data_template)
+            self.controller.current_project_data = utils.CopyOnWriteProject(initial_project_data_template)
 
         if self.project_name_header_label:
             project_name = self.controller.current_project_data.get('projectName', '<NEW PROJECT>')
             self.project_name_header_label.setText(project_name if project_name else "<NEW PROJECT NAME>")
 
+    def mark_document_status(self, item, doc_data, column=0):
+        """
+        Flags a document tree item whose file the last integrity scan found missing or
+        changed. Reads the controller's scan index only; nothing is checked on disk.
+        """
+        if not isinstance(doc_data, dict): return
+        project_folder = self.controller.current_project_data.get('projectFolderPath') if self.controller.current_project_data else None
+        status = self.controller.document_index.status_of(project_folder, doc_data)
+        if status == documents.MISSING:
+            item.setForeground(column, QBrush(QColor("#CF222E")))
+            item.setToolTip(column, "File missing: it was not found in the last document check.")
+        elif status == documents.CHANGED:
+            item.setToolTip(column, "File changed on disk since the previous document check.")
+
     def _get_section_data(self):
         if self.controller.current_project_data is None or self.page_data_key is None:
             return None
@@ -63,7 +78,7 @@ class PageFrame(QWidget):
         if self.page_data_key not in self.controller.current_project_data or \
            not isinstance(self.controller.current_project_data[self.page_data_key], dict):
             template_section = initial_project_data_template.get(self.page_data_key, {})
-            self.controller.current_project_data[self.page_data_key] = template_section.copy()
+            self.controller.current_project_data[self.page_data_key] = copy.deepcopy(template_section)
             
         return self.controller.current_project_data[self.page_data_key]
 
@@ -139,7 +154,12 @@ class PageFrame(QWidget):
     def handle_exit(self):
         self.quit_request.emit()
     
-    def _handle_document_selection(self, doc_key_name, display_label, target_subfolder_name, allow_multiple=False, target_dict=None, target_list=None):
+    def _handle_document_selection(self, doc_key_name, display_label, target_subfolder_name, allow_multiple=False, target_dict=None, target_list=None, on_added=None):
+        """
+        Lets the user pick documents and copies them into the project folder on the
+        ingestion pool. on_added(), if given, runs each time a document joins the
+        section, so a view can refresh its tree as copies complete.
+        """
         section_data = None
         if target_dict is not None:
             section_data = target_dict
@@ -174,40 +194,53 @@ class PageFrame(QWidget):
             target_full_subfolder_path = Path(project_main_folder_str) / target_subfolder_name
             target_full_subfolder_path.mkdir(parents=True, exist_ok=True)
             
-        if not allow_multiple and target_list is None: section_data.setdefault(doc_key_name, []).clear()
-            
-        files_processed_count = 0
-        for original_filepath_str in filepaths:
-            original_file = Path(original_filepath_str)
-            new_doc_data = {}
-            if target_full_subfolder_path:
-                destination_path = target_full_subfolder_path / original_file.name
-                if destination_path.exists():
-                    reply = QMessageBox.question(self, "File Exists", f"The file '{original_file.name}' already exists. Overwrite?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
-                    if reply == QMessageBox.StandardButton.No: continue
-                try:
-                    shutil.copy2(original_file, destination_path)
-                    new_doc_data = {'name': original_file.name, 'path': str(destination_path.relative_to(project_main_folder_str)), 'type': 'project_file'}
-                except Exception as e:
-                    QMessageBox.critical(self, "File Copy Error", f"Could not copy file: {e}\nLinking to original location.")
-                    new_doc_data = {'name': original_file.name, 'path': str(original_file), 'type': 'local_file_link_copy_failed'}
-            else: new_doc_data = {'name': original_file.name, 'path': str(original_file), 'type': 'local_file_link'}
-
+        def add_doc(new_doc_data):
             if target_list is not None:
                 target_list.append(new_doc_data)
             else:
+                if not allow_multiple: section_data.setdefault(doc_key_name, []).clear()
                 section_data.setdefault(doc_key_name, []).append(new_doc_data)
-            files_processed_count += 1
-            
-        if files_processed_count > 0:
-            if allow_multiple:
-                if display_label:
-                    display_label.setText(f"{len(target_list if target_list is not None else section_data[doc_key_name])} file(s) staged.")
-                if hasattr(self, 'refresh_doc_tree'): self.refresh_doc_tree(doc_key_name)
-                QMessageBox.information(self, "Documents Added", f"{files_processed_count} document(s) processed.")
-            elif display_label:
-                if target_list is not None:
-                    last_doc_name = target_list[-1]['name']
-                else:
-                    last_doc_name = section_data[doc_key_name][-1]['name']
-                display_label.setText(last_doc_name)
+            if on_added: on_added()
+
+        def show_result(files_processed_count):
+            if files_processed_count > 0:
+                if allow_multiple:
+                    if display_label:
+                        display_label.setText(f"{len(target_list if target_list is not None else section_data[doc_key_name])} file(s) staged.")
+                    if hasattr(self, 'refresh_doc_tree'): self.refresh_doc_tree(doc_key_name)
+                    QMessageBox.information(self, "Documents Added", f"{files_processed_count} document(s) processed.")
+                elif display_label:
+                    if target_list is not None:
+                        last_doc_name = target_list[-1]['name']
+                    else:
+                        last_doc_name = section_data[doc_key_name][-1]['name']
+                    display_label.setText(last_doc_name)
+
+        if not target_full_subfolder_path:
+            for original_filepath_str in filepaths:
+                original_file = Path(original_filepath_str)
+                add_doc({'name': original_file.name, 'path': str(original_file), 'type': 'local_file_link'})
+            show_result(len(filepaths))
+            return
+
+        copies = []
+        for original_filepath_str in filepaths:
+            original_file = Path(original_filepath_str)
+            destination_path = target_full_subfolder_path / original_file.name
+            if destination_path.exists():
+                reply = QMessageBox.question(self, "File Exists", f"The file '{original_file.name}' already exists. Overwrite?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.No)
+                if reply == QMessageBox.StandardButton.No: continue
+            copies.append((original_file, destination_path))
+
+        # Files are copied on the ingestion pool; each one joins the project's lists when its copy completes.
+        def on_file_done(original_file, destination_path, error, sha256):
+            if error is None:
+                add_doc(documents.project_file_entry(original_file, destination_path, project_main_folder_str, sha256))
+            else:
+                add_doc({'name': original_file.name, 'path': str(original_file), 'type': 'local_file_link_copy_failed'})
+
+        self.controller.document_service.ingest_with_progress(
+            self, copies, on_file_done,
+            on_finished=lambda job: show_result(job.processed),
+            failure_note="\nLinking to original location.",
+            record_as=(project_data.get('id'), self.page_data_key) if self.page_data_key else None)
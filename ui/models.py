@@ -0,0 +1,176 @@
+# Copyright (C) 2025 Protik Das
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex
+from PyQt6.QtGui import QBrush, QColor
+
+# Role used by the proxy for sorting; column 0 sorts by the source order (most recently updated first).
+SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+
+STATUS_COLORS = {
+    "FULFILLED": QColor("darkgreen"),
+    "PARTIALLY_FULFILLED": QColor("darkorange"),
+}
+
+# ========================================================================
+# Class: ProjectTableModel
+# ========================================================================
+class ProjectTableModel(QAbstractTableModel):
+    """
+    Table model over the controller's cached project records.
+    Display strings are built lazily when a row is first painted and kept until
+    that project changes, so only visible rows cost anything.
+    """
+    HEADERS = ["SL. No.", "Projects", "Department", "Project Lead", "Status"]
+    STATUS_COLUMN = 4
+
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self._projects = []
+        self._row_by_id = {}
+        self._display_cache = {}
+        # Department names are looked up when a row is built; rebuild rows when departments change.
+        controller.department_cache.subscribe(self.refresh_department_names)
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._projects)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._projects)): return None
+        project = self._projects[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0: return str(index.row() + 1)
+            return self._display_row(project)[column]
+        if role == Qt.ItemDataRole.UserRole:
+            return project.get('id')
+        if role == SORT_ROLE:
+            if column == 0: return index.row()
+            return self._display_row(project)[column].lower()
+        if role == Qt.ItemDataRole.ForegroundRole and column == self.STATUS_COLUMN:
+            color = STATUS_COLORS.get(project.get('status', 'PENDING'))
+            return QBrush(color) if color else None
+        return None
+
+    # --- Data management ---
+    def _display_row(self, project):
+        project_id = project.get('id')
+        row = self._display_cache.get(project_id)
+        if row is None:
+            row = (
+                "",
+                project.get('projectName', 'N/A'),
+                self.controller.department_cache.get_name(project.get('departmentId'), "N/A"),
+                project.get('projectLead', 'N/A'),
+                self.controller.get_detailed_status(project),
+            )
+            self._display_cache[project_id] = row
+        return row
+
+    def set_projects(self, projects):
+        """Replaces all rows. Cheap: no per-row widgets are created."""
+        self.beginResetModel()
+        self._projects = list(projects)
+        self._row_by_id = {p.get('id'): i for i, p in enumerate(self._projects)}
+        self._display_cache = {}
+        self.endResetModel()
+
+    def refresh_department_names(self):
+        """Drops the cached display strings so renamed departments show up; repaints every row."""
+        self._display_cache = {}
+        if self._projects:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._projects) - 1, len(self.HEADERS) - 1))
+
+    def project_at(self, row):
+        return self._projects[row] if 0 <= row < len(self._projects) else None
+
+    def upsert_project(self, project):
+        """Inserts or updates a single project in place and moves it to the top (updatedAt DESC)."""
+        project_id = project.get('id')
+        self._display_cache.pop(project_id, None)
+        row = self._row_by_id.get(project_id)
+
+        if row is None:
+            self.beginInsertRows(QModelIndex(), 0, 0)
+            self._projects.insert(0, project)
+            self._reindex()
+            self.endInsertRows()
+        else:
+            if row > 0:
+                self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), 0)
+                del self._projects[row]
+                self._projects.insert(0, project)
+                self._reindex()
+                self.endMoveRows()
+            else:
+                self._projects[0] = project
+            # SL numbers of the shifted rows change as well as the moved row's contents.
+            self.dataChanged.emit(self.index(0, 0), self.index(max(row, 0), len(self.HEADERS) - 1))
+
+    def _reindex(self):
+        self._row_by_id = {p.get('id'): i for i, p in enumerate(self._projects)}
+
+# ========================================================================
+# Class: ProjectFilterProxyModel
+# ========================================================================
+class ProjectFilterProxyModel(QSortFilterProxyModel):
+    """Shows only the projects matched by the home page search; the search itself runs in SQL."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self._allowed_ids = None  # None means no filter is active
+        self._rank = {}           # project id -> position in a ranked (full-text) result
+
+    def is_filtering(self):
+        return self._allowed_ids is not None
+
+    def set_allowed_ids(self, project_ids, ranked=False):
+        """Filters to project_ids. With ranked=True the ids are in relevance order and the list keeps that order."""
+        self._allowed_ids = set(project_ids) if project_ids is not None else None
+        self._rank = {pid: i for i, pid in enumerate(project_ids)} if ranked and project_ids is not None else {}
+        self.invalidate()
+
+    def clear_filters(self):
+        self.set_allowed_ids(None)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        project = self.sourceModel().project_at(source_row)
+        if project is None: return False
+        return self._allowed_ids is None or project.get('id') in self._allowed_ids
+
+    def lessThan(self, left, right):
+        # A ranked result keeps relevance order when sorted by the SL. No. column.
+        if self._rank and left.column() == 0:
+            model = self.sourceModel()
+            left_id = model.project_at(left.row()).get('id'); right_id = model.project_at(right.row()).get('id')
+            return self._rank.get(left_id, len(self._rank)) < self._rank.get(right_id, len(self._rank))
+        return super().lessThan(left, right)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        # Serial numbers follow what is visible, not the source position.
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid() and index.column() == 0:
+            return str(index.row() + 1)
+        return super().data(index, role)
@@ -18,9 +18,7 @@ import os
 import subprocess
 import datetime
 import textwrap
-import shutil
 import uuid
-import json
 from pathlib import Path
 
 import fitz  # PyMuPDF
@@ -30,7 +28,8 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QPushButton,QTableWidgetItem,QTableWidget,
     QLineEdit, QTreeWidget, QTreeWidgetItem, QHeaderView, QMessageBox,QStackedWidget,
     QSizePolicy, QFrame, QScrollArea, QTabWidget, QTextEdit, QComboBox,QCheckBox,QSplitter,
-    QDialog, QDialogButtonBox, QDateEdit, QFileDialog, QTextBrowser, QStyledItemDelegate, QStyleOptionViewItem
+    QDialog, QDialogButtonBox, QDateEdit, QFileDialog, QTextBrowser, QStyledItemDelegate, QStyleOptionViewItem,
+    QTreeView, QAbstractItemView
 )
 
 # Add QDesktopServices and QUrl for clickable links
@@ -44,8 +43,10 @@ from PyQt6.QtPrintSupport import QPrintDialog, QPrinter
 
 
 from .base_frame import PageFrame
+from .models import ProjectTableModel, ProjectFilterProxyModel
 from config import SUBFOLDER_NAMES
 import utils
+import documents
 
 # ========================================================================
 # NEW: Text Edit Delegate to allow multi-line text editing in table cells
@@ -73,9 +74,11 @@ class TextEditDelegate(QStyledItemDelegate):
 # =========================================================================
 class EditFulfillmentEventDialog(QDialog):
     """A dialog to edit the details of a fulfillment event (e.g., an invoice or challan)."""
-    def __init__(self, event_data, project_folder_path, parent=None):
+    def __init__(self, event_data, project_folder_path, document_service, parent=None, project_id=None):
         super().__init__(parent)
         self.setWindowTitle("Edit Fulfillment Event")
+        self.document_service = document_service
+        self.project_id = project_id
         self.setMinimumWidth(500)
         self.event_data = event_data
         self.project_folder_path = Path(project_folder_path) if project_folder_path else None
@@ -138,20 +141,14 @@ class EditFulfillmentEventDialog(QDialog):
         target_path = self.project_folder_path / target_subfolder
         target_path.mkdir(parents=True, exist_ok=True)
         
-        for fp_str in filepaths:
-            original_file = Path(fp_str)
-            destination_path = target_path / original_file.name
-            try:
-                shutil.copy2(original_file, destination_path)
-                new_doc = {
-                    'name': original_file.name,
-                    'path': str(destination_path.relative_to(self.project_folder_path)),
-                    'type': 'project_file'
-                }
+        def on_file_done(original_file, destination_path, error, sha256):
+            if error is None:
+                new_doc = documents.project_file_entry(original_file, destination_path, self.project_folder_path, sha256)
                 self.event_data['documents'].append(new_doc)
-            except Exception as e:
-                QMessageBox.critical(self, "File Copy Error", f"Could not copy file: {e}")
-        self._refresh_doc_tree()
+                self._refresh_doc_tree()
+
+        copies = [(Path(fp_str), target_path / Path(fp_str).name) for fp_str in filepaths]
+        self.document_service.ingest_with_progress(self, copies, on_file_done, record_as=(self.project_id, 'fulfillmentDocs'))
 
     def _remove_file(self):
         selected = self.doc_tree.currentItem()
@@ -182,7 +179,7 @@ class EditFulfillmentEventDialog(QDialog):
         # Delete marked files
         for f_path in self.docs_to_delete_on_ok:
             try:
-                f_path.unlink(missing_ok=True)
+                documents.remove_document(f_path, missing_ok=True)
             except Exception as e:
                 print(f"Could not delete file {f_path}: {e}")
         return self.event_data
@@ -244,6 +241,104 @@ class WordWrapDelegate(QStyledItemDelegate):
             return QSize(int(doc.idealWidth()), int(doc.size().height()))
         return super().sizeHint(option, index)
 
+# ========================================================================
+# NEW: Tree view that paints a message when its model is empty
+# ========================================================================
+class PlaceholderTreeView(QTreeView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._placeholder_text = ""
+
+    def setPlaceholderText(self, text):
+        self._placeholder_text = text
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        model = self.model()
+        if self._placeholder_text and (model is None or model.rowCount() == 0):
+            painter = QPainter(self.viewport())
+            painter.setPen(self.palette().placeholderText().color())
+            painter.drawText(self.viewport().rect().adjusted(10, 10, -10, -10), Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter, self._placeholder_text)
+            painter.end()
+
+# ========================================================================
+# NEW: Inline preview of the selected attachment
+# ========================================================================
+class DocumentPreviewPane(QFrame):
+    """
+    Shows a cached thumbnail of a project document (images, PDF first pages) next
+    to a document tree, so bidder documents can be reviewed without launching an
+    external viewer for each one. Thumbnails come from the controller's ThumbnailCache.
+    """
+    def __init__(self, controller, parent=None):
+        super().__init__(parent)
+        self.controller = controller
+        self.setObjectName("CardFrame")
+        self.current_key = None
+        self.current_path = None
+
+        layout = QVBoxLayout(self)
+        self.image_label = QLabel("Select a document to preview it.")
+        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.image_label.setMinimumSize(220, 220)
+        self.image_label.setWordWrap(True)
+        self.image_label.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.name_label = QLabel(""); self.name_label.setWordWrap(True)
+        self.open_button = QPushButton("Open"); self.open_button.setEnabled(False)
+        self.open_button.clicked.connect(self.open_current)
+        layout.addWidget(self.image_label, 1)
+        layout.addWidget(self.name_label)
+        layout.addWidget(self.open_button, 0, Qt.AlignmentFlag.AlignRight)
+
+        self.controller.thumbnail_cache.ready.connect(self._on_thumbnail_ready)
+
+    def show_document(self, doc_data):
+        project_folder = self.controller.current_project_data.get('projectFolderPath') if self.controller.current_project_data else None
+        path = documents.resolve_document_path(project_folder, doc_data) if isinstance(doc_data, dict) else None
+        if path is None:
+            self.clear()
+            return
+        self.current_path = path
+        self.name_label.setText(doc_data.get('name', path.name))
+        self.open_button.setEnabled(True)
+        key, pixmap = self.controller.thumbnail_cache.request(path, doc_data)
+        self.current_key = key
+        if pixmap is not None:
+            self._set_pixmap(pixmap)
+        elif key is None:
+            self.image_label.setPixmap(QPixmap())
+            self.image_label.setText("File not found." if not path.exists() else "No preview for this file type.")
+        elif key in self.controller.thumbnail_cache.failed:
+            self.image_label.setPixmap(QPixmap()); self.image_label.setText("Preview not available.")
+        else:
+            self.image_label.setPixmap(QPixmap()); self.image_label.setText("Loading preview...")
+
+    def clear(self):
+        self.current_key = None; self.current_path = None
+        self.image_label.setPixmap(QPixmap())
+        self.image_label.setText("Select a document to preview it.")
+        self.name_label.setText("")
+        self.open_button.setEnabled(False)
+
+    def open_current(self):
+        if self.current_path is None: return
+        if self.current_path.exists():
+            QDesktopServices.openUrl(QUrl.fromLocalFile(str(self.current_path)))
+        else:
+            QMessageBox.warning(self, "File Not Found", f"Could not find file: {self.current_path}")
+
+    def _set_pixmap(self, pixmap):
+        self.image_label.setText("")
+        self.image_label.setPixmap(pixmap.scaled(self.image_label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+
+    def _on_thumbnail_ready(self, key, pixmap):
+        if key != self.current_key: return
+        if pixmap is None:
+            self.image_label.setText("Preview not available.")
+        else:
+            self._set_pixmap(pixmap)
+
 # ========================================================================
 # Class: HomeView (Corrected Layout)
 # ========================================================================
@@ -262,6 +357,7 @@ class HomeView(PageFrame):
         self.search_dept_combo = QComboBox()
         self.search_status_combo = QComboBox()
         self.search_status_combo.addItems(["All", "PENDING", "PARTIALLY_FULFILLED", "FULFILLED"])
+        self.search_name_entry.setPlaceholderText("Project name, work order, proposal ID or vendor")
         search_grid.addWidget(QLabel("Project Name:"), 0, 0); search_grid.addWidget(self.search_name_entry, 0, 1)
         search_grid.addWidget(QLabel("Project Lead:"), 0, 2); search_grid.addWidget(self.search_lead_combo, 0, 3)
         search_grid.addWidget(QLabel("Department:"), 1, 0); search_grid.addWidget(self.search_dept_combo, 1, 1)
@@ -279,10 +375,40 @@ class HomeView(PageFrame):
         # --- Left Panel (Project List) ---
         left_panel = QWidget()
         left_panel_layout = QVBoxLayout(left_panel)
-        self.project_tree = QTreeWidget()
-        self.project_tree.setHeaderLabels(["SL. No.", "Projects", "Department", "Project Lead", "Status"])
-        self.project_tree.itemDoubleClicked.connect(self.on_project_double_click)
+        # --- NEW: Instant full-text search (debounced, ranked by relevance) ---
+        self.quick_search_entry = QLineEdit()
+        self.quick_search_entry.setPlaceholderText("Quick search: name, department, memo/WO IDs, HSN, items, vendors, bidders, file names...")
+        self.quick_search_entry.setClearButtonEnabled(True)
+        self.quick_search_timer = QTimer(self)
+        self.quick_search_timer.setSingleShot(True)
+        self.quick_search_timer.setInterval(250)
+        self.quick_search_timer.timeout.connect(self.apply_project_search)
+        self.quick_search_entry.textChanged.connect(self.quick_search_timer.start)
+        self.quick_search_entry.textChanged.connect(self._reset_quick_search_pages)
+        left_panel_layout.addWidget(self.quick_search_entry)
+        self.quick_search_pages = 1
+        truncated_layout = QHBoxLayout()
+        self.search_truncated_label = QLabel("")
+        self.show_more_results_button = QPushButton("Show More"); self.show_more_results_button.clicked.connect(self._show_more_search_results)
+        truncated_layout.addWidget(self.search_truncated_label, 1); truncated_layout.addWidget(self.show_more_results_button)
+        self.search_truncated_label.hide(); self.show_more_results_button.hide()
+        left_panel_layout.addLayout(truncated_layout)
+        # Model/View list: rows are rendered on demand and patched in place.
+        self.project_model = ProjectTableModel(self.controller, self)
+        self.project_proxy = ProjectFilterProxyModel(self)
+        self.project_proxy.setSourceModel(self.project_model)
+        self.project_tree = PlaceholderTreeView()
+        self.project_tree.setModel(self.project_proxy)
+        self.project_tree.setRootIsDecorated(False)
+        self.project_tree.setUniformRowHeights(True)
+        self.project_tree.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.project_tree.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.project_tree.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.project_tree.setSortingEnabled(True)
+        self.project_tree.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.project_tree.doubleClicked.connect(self.on_project_double_click)
         left_panel_layout.addWidget(self.project_tree)
+        self.controller.project_changed.connect(self.update_project_row)
         
         project_actions_layout = QHBoxLayout()
         self.refresh_button = QPushButton("Refresh List"); self.refresh_button.clicked.connect(self.controller.load_projects_from_sqlite)
@@ -344,7 +470,8 @@ class HomeView(PageFrame):
         self.update_working_folder_display()
         self.toggle_ui_elements(self.controller.app_ready)
         if self.controller.app_ready:
-            self.controller.load_projects_from_sqlite()
+            if not self.controller.projects_loaded:
+                self.controller.load_projects_from_sqlite()
             self.refresh_project_list()
             self.populate_dept_search()
             self.populate_lead_search()
@@ -354,7 +481,7 @@ class HomeView(PageFrame):
         current_selection = self.search_dept_combo.currentText()
         self.search_dept_combo.clear()
         self.search_dept_combo.addItem("All")
-        departments = utils.get_all_departments_from_db(self.controller.departments_db_path)
+        departments = self.controller.department_cache.get_all()
         self.search_dept_combo.addItems([d['name'] for d in departments])
         self.search_dept_combo.setCurrentText(current_selection)
 
@@ -370,72 +497,69 @@ class HomeView(PageFrame):
         self.search_lead_combo.setCurrentText(current_selection)
 
     def execute_advanced_search(self):
+        self.apply_project_search()
+
+    def apply_project_search(self):
+        """Combines the quick (full-text) search and the advanced filters, both run as SQL queries."""
         if not self.controller.app_ready: return
+        quick_q = self.quick_search_entry.text().strip()
         name_q = self.search_name_entry.text().strip().lower()
         lead_q = self.search_lead_combo.currentText()
         dept_q = self.search_dept_combo.currentText()
         status_q = self.search_status_combo.currentText()
         
-        filtered_projects = self.controller.all_projects_data
-        if name_q: filtered_projects = [p for p in filtered_projects if name_q in p.get('projectName', '').lower()]
-        
-        if lead_q != "All":
-            filtered_projects = [p for p in filtered_projects if p.get('projectLead', '') == lead_q]
-            
-        if dept_q != "All":
-            dept_id = next((d['id'] for d in utils.get_all_departments_from_db(self.controller.departments_db_path) if d['name'] == dept_q), None)
-            if dept_id is not None:
-                filtered_projects = [p for p in filtered_projects if p.get('departmentId') == dept_id]
-        if status_q != "All":
-            filtered_projects = [p for p in filtered_projects if p.get('status', '') == status_q]
-        
-        self.refresh_project_list(projects_to_display=filtered_projects)
+        advanced_ids = None
+        if name_q or lead_q != "All" or dept_q != "All" or status_q != "All":
+            # The query runs against indexed columns; the proxy just hides rows that did not match.
+            advanced_ids = self.controller.search_project_ids(
+                text=name_q,
+                lead=lead_q if lead_q != "All" else None,
+                department_id=self.controller.department_cache.get_id(dept_q) if dept_q != "All" else None,
+                status=status_q if status_q != "All" else None,
+            )
+        truncated = False
+        if quick_q:
+            limit = self.quick_search_pages * utils.PROJECT_FTS_PAGE_SIZE
+            ranked_ids, truncated = self.controller.full_text_search(quick_q, limit)
+            if advanced_ids is not None: ranked_ids = [pid for pid in ranked_ids if pid in advanced_ids]
+            self.project_proxy.set_allowed_ids(ranked_ids, ranked=True)
+            if truncated: self.search_truncated_label.setText(f"Showing the best {limit} matches only. Refine the search or show more.")
+        elif advanced_ids is not None:
+            self.project_proxy.set_allowed_ids(advanced_ids)
+        else:
+            self.project_proxy.clear_filters()
+        self.search_truncated_label.setVisible(truncated)
+        self.show_more_results_button.setVisible(truncated)
+
+    def _reset_quick_search_pages(self):
+        self.quick_search_pages = 1
+
+    def _show_more_search_results(self):
+        self.quick_search_pages += 1
+        self.apply_project_search()
 
     def clear_advanced_search(self):
         self.search_name_entry.clear()
         self.search_lead_combo.setCurrentIndex(0)
         self.search_dept_combo.setCurrentIndex(0)
         self.search_status_combo.setCurrentIndex(0)
-        self.refresh_project_list()
+        self.apply_project_search()
         
-    def refresh_project_list(self, projects_to_display=None):
-        self.project_tree.clear()
+    def refresh_project_list(self):
         if not self.controller.app_ready: 
             self.toggle_ui_elements(False)
             return
-        
-        projects = projects_to_display if projects_to_display is not None else self.controller.all_projects_data
-        
-        if not projects: 
-            self.project_tree.addTopLevelItem(QTreeWidgetItem(["", "No projects found."]))
-            return
-        
-        for i, p in enumerate(projects):
-            dept_info = utils.get_department_by_id(self.controller.departments_db_path, p.get('departmentId'))
-            department_name = dept_info['name'] if dept_info else "N/A"
-            
-            # --- THIS IS THE CHANGE ---
-            # Call the new controller method to get a detailed status
-            status = self.controller.get_detailed_status(p)
-            
-            item = QTreeWidgetItem([
-                str(i + 1), 
-                p.get('projectName', 'N/A'), 
-                department_name, 
-                p.get('projectLead', 'N/A'), 
-                status  # Use the new detailed status string
-            ])
-            item.setData(0, Qt.ItemDataRole.UserRole, p.get('id'))
-            
-            # Color logic for base status
-            base_status = p.get('status', 'PENDING')
-            status_column_index = 4
-            if base_status == "FULFILLED":
-                item.setForeground(status_column_index, QBrush(QColor("darkgreen")))
-            elif base_status == "PARTIALLY_FULFILLED":
-                item.setForeground(status_column_index, QBrush(QColor("darkorange")))
-            
-            self.project_tree.addTopLevelItem(item)
+        self.project_tree.setPlaceholderText("No projects found.")
+        self.project_model.set_projects(self.controller.all_projects_data)
+
+    def update_project_row(self, project_id):
+        """Patches the row of a single saved project instead of rebuilding the whole list."""
+        if not self.controller.app_ready: return
+        project = self.controller.projects_by_id.get(project_id)
+        if project is None: return
+        self.project_model.upsert_project(project)
+        # A save can move a project in or out of the current search results.
+        if self.project_proxy.is_filtering(): self.apply_project_search()
             
     def handle_log_item_click(self, item, column):
         project_id = item.data(0, Qt.ItemDataRole.UserRole)
@@ -443,13 +567,13 @@ class HomeView(PageFrame):
 
     def load_activity_log(self):
         self.log_viewer.clear()
-        log_file = utils.get_app_config_base_path() / "activity_log.json"
-        if log_file.exists():
+        # Newest entries come straight off the end of the indexed log table, however long it gets.
+        log_items = utils.get_recent_activity(200)
+        if log_items:
+            self.log_viewer.setHeaderLabels(["Date", "Time", "Activity"])
             try:
-                with open(log_file, 'r', encoding='utf-8') as f: lines = f.readlines()[-200:]
-                log_items = [json.loads(line) for line in lines if line.strip()]
-                for log_data in reversed(log_items):
-                    # Parse the UTC timestamp from the log file
+                for log_data in log_items:
+                    # Parse the UTC timestamp from the log
                     dt_obj_utc = datetime.datetime.fromisoformat(log_data["timestamp"]) #
                     
                     # Convert UTC time to the user's local timezone
@@ -464,7 +588,7 @@ class HomeView(PageFrame):
                     self.log_viewer.addTopLevelItem(item)
                 self.log_viewer.resizeColumnToContents(0); self.log_viewer.resizeColumnToContents(1)
             except Exception as e:
-                self.log_viewer.addTopLevelItem(QTreeWidgetItem([f"Error reading log file: {e}"]))
+                self.log_viewer.addTopLevelItem(QTreeWidgetItem([f"Error reading activity log: {e}"]))
         else:
             self.log_viewer.setHeaderLabels(["No activity yet."])
 
@@ -476,11 +600,11 @@ class HomeView(PageFrame):
     def toggle_ui_elements(self, enable):
         for widget in [self.project_tree, self.edit_update_button, self.new_project_button, self.open_folder_button, self.preview_button, self.details_button, self.refresh_button]:
             widget.setEnabled(enable)
-        if not enable: self.project_tree.clear(); QTreeWidgetItem(self.project_tree, ["", "Set working folder to view projects.", "", "", ""])
+        if not enable: self.project_model.set_projects([]); self.project_tree.setPlaceholderText("Set working folder to view projects.")
     
-    def on_project_double_click(self, item): self.view_project_details()
+    def on_project_double_click(self, index): self.view_project_details()
     def get_selected_project_id(self):
-        selected_item = self.project_tree.currentItem(); return selected_item.data(0, Qt.ItemDataRole.UserRole) if selected_item else None
+        index = self.project_tree.currentIndex(); return index.siblingAtColumn(0).data(Qt.ItemDataRole.UserRole) if index.isValid() else None
     def create_new_project(self): self.controller.set_current_project_for_editing(None); self.navigate_request.emit("NewProjectP2_Department")
     def edit_selected_project(self):
         project_id = self.get_selected_project_id()
@@ -496,7 +620,7 @@ class HomeView(PageFrame):
         else: QMessageBox.warning(self, "Selection Required", "Please select a project to preview.")
     def open_project_folder_action(self):
         project_id = self.get_selected_project_id()
-        project = next((p for p in self.controller.all_projects_data if p.get('id') == project_id), None) if project_id else None
+        project = self.controller.projects_by_id.get(project_id) if project_id else None
         
         folder_path = project.get('projectFolderPath') if project else None
 
@@ -582,14 +706,14 @@ class NewProjectP2_Department(PageFrame):
         dept_details = self._get_section_data()
         self.department_combobox.blockSignals(True)
         self.department_combobox.clear()
-        departments_from_db = utils.get_all_departments_from_db(self.controller.departments_db_path)
+        departments_from_db = self.controller.department_cache.get_all()
         self.department_combobox.addItem("<Select Department>")
         self.department_combobox.addItems([d['name'] for d in departments_from_db])
         self.department_combobox.blockSignals(False)
         current_dept_id = self.controller.current_project_data.get('departmentId')
         selected_dept_name = "<Select Department>"
         if current_dept_id:
-            dept_info = utils.get_department_by_id(self.controller.departments_db_path, current_dept_id)
+            dept_info = self.controller.department_cache.get_by_id(current_dept_id)
             if dept_info and dept_info.get('name'):
                 selected_dept_name = dept_info['name']
         self.department_combobox.setCurrentText(selected_dept_name)
@@ -607,8 +731,7 @@ class NewProjectP2_Department(PageFrame):
             dept_details['address'] = ""
             self.controller.current_project_data['departmentId'] = None
             return
-        all_depts = utils.get_all_departments_from_db(self.controller.departments_db_path)
-        selected_dept = next((d for d in all_depts if d['name'] == selected_dept_name), None)
+        selected_dept = self.controller.department_cache.get_by_name(selected_dept_name)
         if selected_dept:
             dept_details['name'] = selected_dept['name']
             dept_details['address'] = selected_dept['address']
@@ -789,6 +912,7 @@ class NewProjectP2A_Enquiry(PageFrame):
                 if isinstance(doc_data, dict):
                     item = QTreeWidgetItem([doc_data.get('name', 'N/A')])
                     item.setData(0, Qt.ItemDataRole.UserRole, idx)
+                    self.mark_document_status(item, doc_data)
                     self.enquiry_documents_tree.addTopLevelItem(item)
 
     def _add_enquiry_documents(self):
@@ -827,7 +951,7 @@ class NewProjectP2A_Enquiry(PageFrame):
                     try:
                         file_path = Path(project_folder) / doc.get('path', '')
                         if file_path.exists() and file_path.is_file():
-                            file_path.unlink()
+                            documents.remove_document(file_path)
                     except Exception as e:
                         QMessageBox.warning(self, "Deletion Warning", f"Could not delete physical file: {doc.get('name')}\n{e}")
 
@@ -1085,9 +1209,25 @@ class TenderManagementPage(PageFrame):
         
         self.biddersDocs_tree = QTreeWidget(); self.biddersDocs_tree.setHeaderLabels(["File Name"])
         self.biddersDocs_tree.header().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        layout.addWidget(self.biddersDocs_tree)
+        self.bidder_doc_preview = DocumentPreviewPane(self.controller)
+        self.biddersDocs_tree.currentItemChanged.connect(lambda item, _previous: self._preview_document('biddersDocs', item, self.bidder_doc_preview))
+        layout.addWidget(self.biddersDocs_tree, 1)
+        layout.addWidget(self.bidder_doc_preview, 1)
         return widget
 
+    def _preview_document(self, doc_key, item, preview):
+        if item is None:
+            preview.clear()
+            return
+        docs_list = []
+        if doc_key == "biddersDocs":
+            selected_bidder = self.get_selected_bidder()
+            if selected_bidder: docs_list = selected_bidder.get('docs', [])
+        else:
+            docs_list = (self._get_section_data() or {}).get(doc_key, [])
+        idx = item.data(0, Qt.ItemDataRole.UserRole)
+        preview.show_document(docs_list[idx] if isinstance(idx, int) and idx < len(docs_list) else None)
+
     def _add_document_to_selected_bidder(self):
         selected_bidder = self.get_selected_bidder()
         if not selected_bidder:
@@ -1103,7 +1243,7 @@ class TenderManagementPage(PageFrame):
             return
 
         bidder_name = selected_bidder.get('name', 'Unnamed_Bidder')
-        safe_bidder_name = "".join(c for c in bidder_name if c.isalnum() or c in (' ', '_', '-')).rstrip().replace(" ", "_")
+        safe_bidder_name = utils.sanitize_folder_name(bidder_name)
         if not safe_bidder_name:
             safe_bidder_name = f"bidder_{uuid.uuid4().hex[:8]}"
 
@@ -1113,18 +1253,15 @@ class TenderManagementPage(PageFrame):
             
         docs_list_ref = selected_bidder.setdefault('docs', [])
         
-        for fp_str in filepaths:
-            original_file = Path(fp_str)
-            destination_path = target_path / original_file.name
-            try:
-                shutil.copy2(original_file, destination_path)
-                relative_path = destination_path.relative_to(project_main_folder_str)
-                new_doc_data = {'name': original_file.name, 'path': str(relative_path), 'type': 'project_file'}
+        def on_file_done(original_file, destination_path, error, sha256):
+            if error is None:
+                new_doc_data = documents.project_file_entry(original_file, destination_path, project_main_folder_str, sha256)
                 docs_list_ref.append(new_doc_data)
-            except Exception as e:
-                QMessageBox.critical(self, "File Copy Error", f"Could not copy file: {e}")
-        
-        self.refresh_doc_tree('biddersDocs')
+                self.refresh_doc_tree('biddersDocs')
+
+        copies = [(Path(fp_str), target_path / Path(fp_str).name) for fp_str in filepaths]
+        self.controller.document_service.ingest_with_progress(self, copies, on_file_done,
+                                                              record_as=(self.controller.current_project_data.get('id'), self.page_data_key))
 
     def _remove_document_from_selected_bidder(self):
         selected_bidder = self.get_selected_bidder()
@@ -1158,7 +1295,12 @@ class TenderManagementPage(PageFrame):
         
         tree = QTreeWidget(); tree.setHeaderLabels(["File Name"])
         tree.header().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        layout.addWidget(tree)
+        preview = DocumentPreviewPane(self.controller)
+        tree.currentItemChanged.connect(lambda item, _previous: self._preview_document(doc_key, item, preview))
+        doc_splitter = QSplitter(Qt.Orientation.Horizontal)
+        doc_splitter.addWidget(tree); doc_splitter.addWidget(preview)
+        doc_splitter.setSizes([500, 300])
+        layout.addWidget(doc_splitter, 1)
         
         setattr(self, f"{doc_key}_tree", tree)
         target_subfolder = SUBFOLDER_NAMES.get(doc_key, "Tender_Documents")
@@ -1197,6 +1339,7 @@ class TenderManagementPage(PageFrame):
         for idx, doc_data in enumerate(docs_list):
             item = QTreeWidgetItem([doc_data.get('name', 'N/A')])
             item.setData(0, Qt.ItemDataRole.UserRole, idx)
+            self.mark_document_status(item, doc_data)
             tree.addTopLevelItem(item)
 
     def refresh_all_doc_trees(self):
@@ -1278,7 +1421,11 @@ class LimitedTenderView(PageFrame):
         self.notice_docs_tree = QTreeWidget()
         self.notice_docs_tree.setHeaderLabels(["File Name"])
         self.notice_docs_tree.itemDoubleClicked.connect(self._open_document_link)
-        notice_layout.addWidget(self.notice_docs_tree)
+        self.notice_doc_preview = DocumentPreviewPane(self.controller)
+        self.notice_docs_tree.currentItemChanged.connect(lambda item, _previous: self._preview_document(item, self.notice_doc_preview))
+        notice_row = QHBoxLayout()
+        notice_row.addWidget(self.notice_docs_tree, 2); notice_row.addWidget(self.notice_doc_preview, 1)
+        notice_layout.addLayout(notice_row)
         content_layout.addWidget(notice_frame)
 
         # --- Main Content Splitter ---
@@ -1330,10 +1477,13 @@ class LimitedTenderView(PageFrame):
         self.bidder_docs_tree = QTreeWidget()
         self.bidder_docs_tree.setHeaderHidden(True)
         self.bidder_docs_tree.itemDoubleClicked.connect(self._open_document_link)
+        self.bidder_doc_preview = DocumentPreviewPane(self.controller)
+        self.bidder_docs_tree.currentItemChanged.connect(lambda item, _previous: self._preview_document(item, self.bidder_doc_preview))
 
         right_layout.addWidget(self.docs_label)
         right_layout.addLayout(doc_button_layout)
         right_layout.addWidget(self.bidder_docs_tree, 1)
+        right_layout.addWidget(self.bidder_doc_preview, 1)
         
         main_splitter.addWidget(left_panel)
         main_splitter.addWidget(right_panel)
@@ -1430,6 +1580,7 @@ class LimitedTenderView(PageFrame):
             item.setData(0, Qt.ItemDataRole.UserRole, doc)
             item.setForeground(0, QBrush(QColor("#0969DA")))
             item.setToolTip(0, "Double-click to open file")
+            self.mark_document_status(item, doc)
             self.bidder_docs_tree.addTopLevelItem(item)
 
     def _add_document_to_bidder(self):
@@ -1438,10 +1589,10 @@ class LimitedTenderView(PageFrame):
             QMessageBox.warning(self, "Selection Error", "Please select a bidder first.")
             return
         target_subfolder = SUBFOLDER_NAMES.get("limitedTenderBidders", "Limited_Tender_Documents")
-        bidder_folder = "".join(c for c in bidder['name'] if c.isalnum() or c in (' ', '_', '-')).rstrip()
+        bidder_folder = utils.sanitize_folder_name(bidder['name'], replace_spaces=False)
         full_target_subfolder = Path(target_subfolder) / bidder_folder
-        self._handle_document_selection('docs', None, str(full_target_subfolder), allow_multiple=True, target_dict=bidder)
-        QTimer.singleShot(100, self._refresh_bidder_document_tree)
+        self._handle_document_selection('docs', None, str(full_target_subfolder), allow_multiple=True, target_dict=bidder,
+                                        on_added=self._refresh_bidder_document_tree)
 
     def _remove_document_from_bidder(self):
         bidder = self._get_selected_bidder()
@@ -1457,7 +1608,7 @@ class LimitedTenderView(PageFrame):
                 project_folder = self.controller.current_project_data.get('projectFolderPath')
                 if project_folder and doc_to_remove.get('path'):
                     try:
-                        (Path(project_folder) / doc_to_remove['path']).unlink(missing_ok=True)
+                        documents.remove_document(Path(project_folder) / doc_to_remove['path'], missing_ok=True)
                     except Exception as e:
                         QMessageBox.warning(self, "Deletion Error", f"Could not delete file: {e}")
             self._refresh_bidder_document_tree()
@@ -1471,6 +1622,10 @@ class LimitedTenderView(PageFrame):
                 QDesktopServices.openUrl(QUrl.fromLocalFile(str(full_path)))
             else:
                 QMessageBox.warning(self, "File Not Found", f"Could not find file: {full_path}")
+
+    def _preview_document(self, item, preview):
+        if item is None: preview.clear()
+        else: preview.show_document(item.data(0, Qt.ItemDataRole.UserRole))
     
     # --- NEW METHODS FOR TENDER NOTICE DOCS ---
     def _refresh_tender_notice_tree(self):
@@ -1481,13 +1636,14 @@ class LimitedTenderView(PageFrame):
             item.setData(0, Qt.ItemDataRole.UserRole, doc)
             item.setForeground(0, QBrush(QColor("#0969DA")))
             item.setToolTip(0, "Double-click to open file")
+            self.mark_document_status(item, doc)
             self.notice_docs_tree.addTopLevelItem(item)
 
     def _add_tender_notice_docs(self):
         target_subfolder = SUBFOLDER_NAMES.get("limitedTenderBidders", "Limited_Tender_Documents")
         # Save notice docs in the root of the limited tender folder
-        self._handle_document_selection('tenderNoticeDocs', None, target_subfolder, allow_multiple=True)
-        QTimer.singleShot(100, self._refresh_tender_notice_tree) # Use a timer to allow file dialog to close
+        self._handle_document_selection('tenderNoticeDocs', None, target_subfolder, allow_multiple=True,
+                                        on_added=self._refresh_tender_notice_tree)
 
     def _remove_tender_notice_docs(self):
         selected_item = self.notice_docs_tree.currentItem()
@@ -1505,7 +1661,7 @@ class LimitedTenderView(PageFrame):
                 project_folder = self.controller.current_project_data.get('projectFolderPath')
                 if project_folder and doc_to_remove.get('path'):
                     try:
-                        (Path(project_folder) / doc_to_remove['path']).unlink(missing_ok=True)
+                        documents.remove_document(Path(project_folder) / doc_to_remove['path'], missing_ok=True)
                     except Exception as e:
                         QMessageBox.warning(self, "Deletion Error", f"Could not delete file: {e}")
             self._refresh_tender_notice_tree()
@@ -1662,6 +1818,7 @@ class NewProjectP3_OEM(PageFrame):
                 if isinstance(doc_data, dict):
                     item = QTreeWidgetItem([doc_data.get('name', 'N/A')])
                     item.setData(0, Qt.ItemDataRole.UserRole, idx)
+                    self.mark_document_status(item, doc_data)
                     self.oem_documents_tree.addTopLevelItem(item)
 
     def _add_oem_documents(self):
@@ -1700,7 +1857,7 @@ class NewProjectP3_OEM(PageFrame):
                     try:
                         file_path = Path(project_folder) / doc.get('path', '')
                         if file_path.exists() and file_path.is_file():
-                            file_path.unlink()
+                            documents.remove_document(file_path)
                     except Exception as e:
                         QMessageBox.warning(self, "Deletion Warning", f"Could not delete physical file: {doc.get('name')}\n{e}")
 
@@ -2295,11 +2452,12 @@ class NewProjectP5_OEN(PageFrame):
 # Class 10: DocumentLinksDialog (Helper for Details View)
 # ========================================================================
 class DocumentLinksDialog(QDialog):
-    def __init__(self, parent, docs_list, project_folder_path):
+    def __init__(self, parent, docs_list, project_folder_path, document_index=None):
         super().__init__(parent)
         self.setWindowTitle("Document Links")
         self.setMinimumSize(400, 300)
         self.project_folder_path = project_folder_path
+        self.document_index = document_index
         layout = QVBoxLayout(self)
 
         # Use our new custom widget
@@ -2323,7 +2481,10 @@ class DocumentLinksDialog(QDialog):
                 full_path = Path(self.project_folder_path) / path_str
             elif doc.get('type', '').startswith('local_file_link'):
                 full_path = Path(path_str)
-            if full_path and full_path.exists():
+            # The last integrity scan answers for files it covered; only unscanned ones are checked on disk.
+            status = self.document_index.status(full_path) if full_path and self.document_index else None
+            exists = status != documents.MISSING if status else bool(full_path and full_path.exists())
+            if full_path and exists:
                 html += f'<a href="{full_path.as_uri()}">{doc_name}</a><br>'
             else:
                 html += f'{doc_name} (File Missing)<br>'
@@ -2400,6 +2561,30 @@ class ProjectDetailsView(PageFrame):
         events_tab_layout.addLayout(event_buttons)
         tab_widget.addTab(events_tab, "Fulfillment Events")
 
+        # Tab 3: Activity Timeline (paged from the activity log)
+        timeline_tab = QWidget()
+        timeline_tab_layout = QVBoxLayout(timeline_tab)
+        self.timeline_tree = QTreeWidget()
+        self.timeline_tree.setHeaderLabels(["Date", "Time", "Activity"])
+        self.timeline_tree.setRootIsDecorated(False)
+        self.timeline_tree.header().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        self.timeline_tree.header().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
+        self.timeline_tree.header().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        timeline_tab_layout.addWidget(self.timeline_tree)
+
+        timeline_buttons = QHBoxLayout()
+        self.timeline_count_label = QLabel("")
+        self.timeline_more_button = QPushButton("Load Older Entries")
+        self.timeline_more_button.clicked.connect(self.load_more_timeline)
+        timeline_buttons.addWidget(self.timeline_count_label)
+        timeline_buttons.addStretch()
+        timeline_buttons.addWidget(self.timeline_more_button)
+        timeline_tab_layout.addLayout(timeline_buttons)
+        tab_widget.addTab(timeline_tab, "Activity Timeline")
+        self._timeline_project_id = None
+        self._timeline_cursor = None
+        self._timeline_total = 0
+
         self.main_layout.addWidget(tab_widget, 1)
 
         # --- Bottom Navigation ---
@@ -2429,6 +2614,32 @@ class ProjectDetailsView(PageFrame):
         
         self.populate_bom_table(project)
         self.populate_fulfillment_tree(project)
+        self.reset_timeline(project.get('id'))
+
+    TIMELINE_PAGE_SIZE = 50
+
+    def reset_timeline(self, project_id):
+        self.timeline_tree.clear()
+        self._timeline_project_id = project_id
+        self._timeline_cursor = None
+        self._timeline_total = utils.count_project_activity(project_id) if project_id else 0
+        self.load_more_timeline()
+
+    def load_more_timeline(self):
+        project_id = self._timeline_project_id
+        entries = utils.get_project_activity(project_id, before=self._timeline_cursor, limit=self.TIMELINE_PAGE_SIZE) if project_id else []
+        for entry in entries:
+            try:
+                dt_obj_local = datetime.datetime.fromisoformat(entry["timestamp"]).astimezone(None)
+                date_text, time_text = dt_obj_local.strftime("%d-%m-%Y"), dt_obj_local.strftime("%I:%M:%S:%p")
+            except ValueError:
+                date_text, time_text = entry["timestamp"], ""
+            self.timeline_tree.addTopLevelItem(QTreeWidgetItem([date_text, time_text, entry.get("message", "")]))
+        if entries:
+            self._timeline_cursor = (entries[-1]["timestamp"], entries[-1]["id"])
+        shown = self.timeline_tree.topLevelItemCount()
+        self.timeline_count_label.setText(f"Showing {shown} of {self._timeline_total} entries")
+        self.timeline_more_button.setEnabled(len(entries) == self.TIMELINE_PAGE_SIZE and shown < self._timeline_total)
 
     def _save_and_refresh(self):
         project = self.controller.current_project_data
@@ -2556,7 +2767,8 @@ class ProjectDetailsView(PageFrame):
             return
 
         event_data = selected.data(0, Qt.ItemDataRole.UserRole)
-        dialog = EditFulfillmentEventDialog(event_data.copy(), self.controller.current_project_data.get('projectFolderPath'), self)
+        dialog = EditFulfillmentEventDialog(event_data.copy(), self.controller.current_project_data.get('projectFolderPath'), self.controller.document_service, self,
+                                            project_id=self.controller.current_project_data.get('id'))
         
         if dialog.exec() == QDialog.DialogCode.Accepted:
             updated_data = dialog.get_updated_data()
@@ -2761,6 +2973,7 @@ class FinancialDetailsView(PageFrame):
         for doc in trans_data.get('documents', []):
             item = QTreeWidgetItem([doc['name']]); item.setData(0, Qt.ItemDataRole.UserRole, doc)
             item.setForeground(0, QBrush(QColor("#0969DA"))); item.setToolTip(0, "Double-click to open file")
+            self.mark_document_status(item, doc)
             self.doc_viewer_tree.addTopLevelItem(item)
     
     def _open_document_link(self, item, column):
@@ -2899,11 +3112,13 @@ class VendorPaymentView(PageFrame):
         for doc in payment_data.get('invoice', {}).get('documents', []):
             item = QTreeWidgetItem([doc['name'], "Invoice"]); item.setData(0, Qt.ItemDataRole.UserRole, doc)
             item.setForeground(0, QBrush(QColor("#0969DA"))); item.setToolTip(0, "Double-click to open file")
+            self.mark_document_status(item, doc)
             self.docs_tree.addTopLevelItem(item)
 
         for doc in payment_data.get('challan', {}).get('documents', []):
             item = QTreeWidgetItem([doc['name'], "Challan"]); item.setData(0, Qt.ItemDataRole.UserRole, doc)
             item.setForeground(0, QBrush(QColor("#0969DA"))); item.setToolTip(0, "Double-click to open file")
+            self.mark_document_status(item, doc)
             self.docs_tree.addTopLevelItem(item)
 
     def add_vendor_payment(self):
@@ -2948,11 +3163,11 @@ class VendorPaymentView(PageFrame):
         project_main_folder = self.controller.current_project_data.get('projectFolderPath')
         if not project_main_folder: QMessageBox.warning(self, "File Management", "Project folder path not set. Files cannot be copied."); return
         target_path = Path(project_main_folder) / target_subfolder_name; target_path.mkdir(parents=True, exist_ok=True)
-        for fp_str in filepaths:
-            original_file = Path(fp_str); destination_path = target_path / original_file.name
-            try: shutil.copy2(original_file, destination_path); new_doc_data = {'name': original_file.name, 'path': str(destination_path.relative_to(project_main_folder)), 'type': 'project_file'}; temp_list.append(new_doc_data)
-            except Exception as e: QMessageBox.critical(self, "File Copy Error", f"Could not copy file: {e}")
-        self._refresh_doc_tree(doc_key_name)
+        def on_file_done(original_file, destination_path, error, sha256):
+            if error is None: temp_list.append(documents.project_file_entry(original_file, destination_path, project_main_folder, sha256)); self._refresh_doc_tree(doc_key_name)
+        copies = [(Path(fp_str), target_path / Path(fp_str).name) for fp_str in filepaths]
+        self.controller.document_service.ingest_with_progress(self, copies, on_file_done,
+                                                              record_as=(self.controller.current_project_data.get('id'), self.page_data_key))
 # ========================================================================
 # Class 14: FulfillmentView
 # ========================================================================
@@ -3177,17 +3392,15 @@ class FulfillmentView(PageFrame):
         target_path = Path(project_main_folder) / target_subfolder_name
         target_path.mkdir(parents=True, exist_ok=True)
         
-        for fp_str in filepaths:
-            original_file = Path(fp_str)
-            destination_path = target_path / original_file.name
-            try:
-                shutil.copy2(original_file, destination_path)
-                new_doc_data = {'name': original_file.name, 'path': str(destination_path.relative_to(project_main_folder)), 'type': 'project_file'}
+        def on_file_done(original_file, destination_path, error, sha256):
+            if error is None:
+                new_doc_data = documents.project_file_entry(original_file, destination_path, project_main_folder, sha256)
                 temp_list.append(new_doc_data)
-            except Exception as e:
-                QMessageBox.critical(self, "File Copy Error", f"Could not copy file: {e}")
-        
-        self._refresh_doc_tree(doc_key_name)
+                self._refresh_doc_tree(doc_key_name)
+
+        copies = [(Path(fp_str), target_path / Path(fp_str).name) for fp_str in filepaths]
+        self.controller.document_service.ingest_with_progress(self, copies, on_file_done,
+                                                              record_as=(self.controller.current_project_data.get('id'), self.page_data_key))
 
 # ========================================================================
 # Class 15: ProjectCreationPreview (REVISED AND ENHANCED)
@@ -3715,7 +3928,7 @@ class AdminDepartmentView(PageFrame):
         
     def _refresh_department_list(self):
         self.department_tree.clear()
-        self.departments = utils.get_all_departments_from_db(self.controller.departments_db_path)
+        self.departments = self.controller.department_cache.get_all()
         for dept in self.departments:
             item = QTreeWidgetItem([str(dept['id']), dept['name'], dept['address']])
             self.department_tree.addTopLevelItem(item)
@@ -3749,6 +3962,7 @@ class AdminDepartmentView(PageFrame):
             return
         
         added_id = utils.add_department_to_db(self.controller.departments_db_path, name, address)
+        self.controller.department_cache.invalidate()
         if added_id:
             QMessageBox.information(self, "Success", f"Department '{name}' added successfully.")
             self._clear_form()
@@ -3764,7 +3978,9 @@ class AdminDepartmentView(PageFrame):
             QMessageBox.warning(self, "Input Error", "Department Name cannot be empty.")
             return
         
-        if utils.update_department_in_db(self.controller.departments_db_path, self.editing_dept_id, name, address):
+        updated = utils.update_department_in_db(self.controller.departments_db_path, self.editing_dept_id, name, address)
+        self.controller.department_cache.invalidate()
+        if updated:
             QMessageBox.information(self, "Success", f"Department '{name}' updated successfully.")
             self._clear_form()
             self._refresh_department_list()
@@ -3787,6 +4003,7 @@ class AdminDepartmentView(PageFrame):
             dept_id = int(item.text(0))
             if utils.delete_department_from_db(self.controller.departments_db_path, self.controller.db_path, dept_id):
                 deleted_count += 1
+        self.controller.department_cache.invalidate()
         
         if deleted_count > 0:
             QMessageBox.information(self, "Success", f"{deleted_count} department(s) deleted successfully.")
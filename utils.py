@@ -19,6 +19,10 @@ import sqlite3
 import datetime
 import json
 import hashlib
+import threading
+import copy
+import functools
+from collections.abc import Mapping
 from pathlib import Path
 from tkinter import messagebox
 
@@ -26,6 +30,8 @@ from tkinter import messagebox
 from PyQt6.QtGui import QPixmap, QImage
 from PyQt6.QtCore import QBuffer, QIODevice
 
+from config import initial_project_data_template
+
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     try:
@@ -34,8 +40,9 @@ def resource_path(relative_path):
         base_path = Path(os.path.abspath("."))
     return str(base_path / relative_path)
 
+@functools.lru_cache(maxsize=None)
 def get_app_config_base_path():
-    """ Returns the base path to the config directory in a user-writable, cross-platform location. """
+    """ Returns the base path to the config directory in a user-writable, cross-platform location (created once per run). """
     app_name = "WorkflowApp"
     app_data_dir = Path.home() / "Documents" / app_name
     app_data_dir.mkdir(parents=True, exist_ok=True)
@@ -45,10 +52,122 @@ def get_app_config_path():
     """ Returns the full path to the config file (e.g., app_config.json). """
     return str(get_app_config_base_path() / "app_config.json")
 
+@functools.lru_cache(maxsize=4096)
+def sanitize_folder_name(name, replace_spaces=True):
+    """ Folder-safe form of a project, department or bidder name (letters, digits, space, '_' and '-'). May be empty. """
+    safe_name = "".join(c for c in name if c.isalnum() or c in (' ', '_', '-')).rstrip()
+    return safe_name.replace(" ", "_") if replace_spaces else safe_name
+
 def get_departments_database_path():
     """ Returns the fixed path to the separate departments database file. """
     return str(get_app_config_base_path() / "departments.db")
 
+# --- Shared SQLite Connection Manager ---
+# One long-lived connection per database file per thread. Opening a connection
+# (and the file locking that comes with it) is expensive on network shares, so
+# helpers borrow the pooled connection instead of calling sqlite3.connect().
+# Connections are only ever used and closed by the thread that opened them.
+DB_CACHE_SIZE_KB = 16384           # page cache per connection (~16 MB)
+DB_MMAP_SIZE = 256 * 1024 * 1024   # memory-mapped I/O window
+DB_CACHED_STATEMENTS = 256
+# File systems on which SQLite's WAL mode (shared-memory index) and mmap are unsafe.
+NETWORK_FILESYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs", "ceph", "glusterfs", "davfs", "fuse.davfs2"}
+DRIVE_REMOTE = 4  # GetDriveTypeW
+
+_thread_db_connections = threading.local()
+_db_connections_generation = 0  # bumped by close_db_connections() so every thread drops its pool on next use
+
+@functools.lru_cache(maxsize=64)
+def is_network_path(path):
+    """ True if path lives on a network share (UNC path, mapped network drive, NFS/SMB mount). """
+    path = os.path.abspath(str(path))
+    if path.startswith(("\\\\", "//")): return True
+    if sys.platform == "win32":
+        import ctypes
+        drive = os.path.splitdrive(path)[0]
+        return bool(drive) and ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == DRIVE_REMOTE
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    best_mount, best_type = "", ""
+    for mount_point, fs_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best_mount):
+            best_mount, best_type = mount_point, fs_type
+    return best_type in NETWORK_FILESYSTEMS
+
+def _close_connections(connections, optimize=False):
+    for conn in connections.values():
+        try:
+            if optimize: conn.execute("PRAGMA optimize")
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Error closing database connection: {e}")
+    connections.clear()
+
+def get_db_connection(db_path):
+    """
+    Returns this thread's pooled connection to db_path, opening and tuning it on first use.
+    Databases on network shares use a rollback journal: WAL needs shared memory that
+    network file systems do not provide, and can corrupt the database there.
+    """
+    key = os.path.abspath(str(db_path))
+    connections = getattr(_thread_db_connections, 'by_path', None)
+    if connections is None or getattr(_thread_db_connections, 'generation', None) != _db_connections_generation:
+        if connections: _close_connections(connections)  # stale pool from before close_db_connections()
+        connections = _thread_db_connections.by_path = {}
+        _thread_db_connections.generation = _db_connections_generation
+    conn = connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(key, cached_statements=DB_CACHED_STATEMENTS)
+        if is_network_path(os.path.dirname(key)):
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.execute("PRAGMA synchronous=FULL")
+        else:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        connections[key] = conn
+    return conn
+
+def release_thread_db_connections():
+    """ Closes the pooled connections owned by the calling thread (for worker threads that are finishing). """
+    _close_connections(getattr(_thread_db_connections, 'by_path', None) or {})
+
+def close_db_connections():
+    """
+    Closes the calling thread's pooled connections and makes every other thread drop
+    its own pool the next time it asks for a connection. Long-running workers that
+    must not hold a file open (e.g. before a restore replaces it) release their own
+    connections with release_thread_db_connections(). Call on shutdown or before
+    replacing database files.
+    """
+    global _db_connections_generation
+    _db_connections_generation += 1
+    _close_connections(getattr(_thread_db_connections, 'by_path', None) or {}, optimize=True)
+
+def snapshot_database(source_path, destination_path, pages_per_step=256, progress=None):
+    """
+    Copies a live database into destination_path with SQLite's online backup API.
+    The copy is transactionally consistent (WAL contents included) and is taken a
+    few pages at a time, so writers on other connections are only briefly blocked.
+    progress, if given, receives a 0-100 percentage after each step.
+    """
+    def report(status, remaining, total):
+        if progress and total: progress(int(((total - remaining) / total) * 100))
+
+    source = get_db_connection(source_path)
+    destination = sqlite3.connect(str(destination_path))
+    try:
+        source.backup(destination, pages=pages_per_step, progress=report, sleep=0.005)
+        # Make the snapshot a single self-contained file.
+        destination.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        destination.close()
+
 # --- NEW: User Database Path ---
 def get_users_database_path():
     """ Returns the fixed path to the user database file. """
@@ -58,7 +177,7 @@ def get_users_database_path():
 def init_users_db(db_path):
     """Initializes/upgrades the users table in the SQLite database."""
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -101,7 +220,7 @@ def add_user(db_path, username, password, user_photo_blob=None, background_image
     """Adds a new user to the database."""
     hashed_pass = hash_password(password)
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
             
@@ -120,9 +239,9 @@ def add_user(db_path, username, password, user_photo_blob=None, background_image
 def get_user_by_username(db_path, username):
     """Retrieves user data by username."""
     try:
-        with sqlite3.connect(db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             # MODIFIED: Select new columns
             cursor.execute("SELECT id, username, password_hash, user_photo, background_image, full_name, email FROM users WHERE username = ?", (username,))
             user_data = cursor.fetchone()
@@ -134,7 +253,7 @@ def get_user_by_username(db_path, username):
 def update_user_details(db_path, user_id, new_username, new_full_name, new_email):
     """Updates a user's username, full name, and email in the database."""
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
             cursor.execute("""
@@ -155,7 +274,7 @@ def update_user_details(db_path, user_id, new_username, new_full_name, new_email
 def update_user_profile_image(db_path, user_id, user_photo_blob=None):
     """Updates a user's profile photo."""
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
             cursor.execute("UPDATE users SET user_photo = ?, updatedAt = ? WHERE id = ?",
@@ -169,7 +288,7 @@ def update_user_profile_image(db_path, user_id, user_photo_blob=None):
 def update_user_background_image(db_path, user_id, background_image_blob=None):
     """Updates a user's custom background image."""
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
             cursor.execute("UPDATE users SET background_image = ?, updatedAt = ? WHERE id = ?",
@@ -184,7 +303,7 @@ def update_user_password(db_path, user_id, new_password):
     """Updates a user's password in the database."""
     hashed_pass = hash_password(new_password)
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
             cursor.execute("UPDATE users SET password_hash = ?, updatedAt = ? WHERE id = ?",
@@ -251,7 +370,7 @@ def blob_to_qpixmap(blob):
 def init_departments_db(db_path):
     """Initializes the departments table in the SQLite database."""
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS departments (
@@ -269,7 +388,7 @@ def init_departments_db(db_path):
 def add_department_to_db(db_path, name, address):
     """Adds a new department to the database."""
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
             cursor.execute("INSERT INTO departments (name, address, createdAt, updatedAt) VALUES (?, ?, ?, ?)",
@@ -285,9 +404,9 @@ def add_department_to_db(db_path, name, address):
 def get_all_departments_from_db(db_path):
     """Retrieves all departments from the database."""
     try:
-        with sqlite3.connect(db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             cursor.execute("SELECT id, name, address FROM departments ORDER BY name COLLATE NOCASE")
             return [dict(row) for row in cursor.fetchall()]
     except sqlite3.Error as e:
@@ -298,9 +417,9 @@ def get_department_by_id(db_path, dept_id):
     """Retrieves a single department by its ID from the database."""
     if dept_id is None: return None
     try:
-        with sqlite3.connect(db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             cursor.execute("SELECT id, name, address FROM departments WHERE id = ?", (dept_id,))
             row = cursor.fetchone()
             return dict(row) if row else None
@@ -311,7 +430,7 @@ def get_department_by_id(db_path, dept_id):
 def update_department_in_db(db_path, dept_id, new_name, new_address):
     """Updates an existing department's details."""
     try:
-        with sqlite3.connect(db_path) as conn:
+        with get_db_connection(db_path) as conn:
             cursor = conn.cursor()
             timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
             cursor.execute("UPDATE departments SET name = ?, address = ?, updatedAt = ? WHERE id = ?",
@@ -327,17 +446,18 @@ def update_department_in_db(db_path, dept_id, new_name, new_address):
 def delete_department_from_db(departments_db_path, projects_db_path, dept_id):
     """Deletes a department, checking for linked projects first."""
     try:
-        with sqlite3.connect(projects_db_path) as projects_conn:
+        with get_db_connection(projects_db_path) as projects_conn:
             projects_cursor = projects_conn.cursor()
-            projects_cursor.execute("SELECT COUNT(*) FROM projects WHERE departmentId = ?", (dept_id,))
-            if projects_cursor.fetchone()[0] > 0:
+            # Served by idx_projects_departmentId; stops at the first linked project.
+            projects_cursor.execute("SELECT EXISTS(SELECT 1 FROM projects WHERE departmentId = ?)", (dept_id,))
+            if projects_cursor.fetchone()[0]:
                 # This dependency on tkinter.messagebox is the only UI call here.
                 # In a pure backend, this would return an error code or raise an exception.
                 # For this project, it's acceptable.
                 messagebox.showerror("Deletion Error", "Cannot delete department. It is still linked to one or more projects.")
                 return False
 
-        with sqlite3.connect(departments_db_path) as departments_conn:
+        with get_db_connection(departments_db_path) as departments_conn:
             departments_cursor = departments_conn.cursor()
             departments_cursor.execute("DELETE FROM departments WHERE id = ?", (dept_id,))
             departments_conn.commit()
@@ -346,6 +466,279 @@ def delete_department_from_db(departments_db_path, projects_db_path, dept_id):
         print(f"Error deleting department: {e}")
         return False
 
+class DepartmentCache:
+    """
+    In-memory copy of the departments table. Loaded on first use and served from
+    memory afterwards; call invalidate() after any add/update/delete. Callbacks
+    registered with subscribe() run after every invalidate().
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._departments = None
+        self._by_id = {}
+        self._by_name = {}
+        self._listeners = []
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _ensure_loaded(self):
+        if self._departments is not None: return
+        self._departments = get_all_departments_from_db(self.db_path)
+        self._by_id = {d['id']: d for d in self._departments}
+        self._by_name = {d['name']: d for d in self._departments}
+
+    def invalidate(self):
+        self._departments = None
+        self._by_id = {}
+        self._by_name = {}
+        for callback in list(self._listeners): callback()
+
+    def get_all(self):
+        """ Returns all departments ordered by name, as dicts with id, name and address. """
+        self._ensure_loaded()
+        return list(self._departments)
+
+    def get_by_id(self, dept_id):
+        if dept_id is None: return None
+        self._ensure_loaded()
+        return self._by_id.get(dept_id)
+
+    def get_by_name(self, name):
+        self._ensure_loaded()
+        return self._by_name.get(name)
+
+    def get_name(self, dept_id, default=None):
+        dept = self.get_by_id(dept_id)
+        return dept['name'] if dept else default
+
+    def get_id(self, name):
+        dept = self.get_by_name(name)
+        return dept['id'] if dept else None
+
+# --- Lazily loaded project records ---
+# JSON section columns (dicts/lists in the template) are only decoded when first read.
+PROJECT_SECTION_KEYS = [k for k, v in initial_project_data_template.items() if isinstance(v, (dict, list))]
+PROJECT_SCALAR_KEYS = ['id'] + [k for k in initial_project_data_template if k not in PROJECT_SECTION_KEYS]
+
+def _guarded_json(column, expr):
+    return f"CASE WHEN json_valid({column}) THEN {expr} END"
+
+# Values the home list needs from inside sections, read with JSON1 so the sections stay unparsed.
+# Only used for presence checks (list fields report their length).
+PROJECT_SUMMARY_FIELDS = {
+    ('tenderDetails', 'qualifiedBidder'): _guarded_json('tenderDetails', "json_extract(tenderDetails, '$.qualifiedBidder')"),
+    ('limitedTenderDetails', 'winner'): _guarded_json('limitedTenderDetails', "json_extract(limitedTenderDetails, '$.winner')"),
+    ('oemVendorDetails', 'price'): _guarded_json('oemVendorDetails', "json_extract(oemVendorDetails, '$.price')"),
+    ('proposalOrderDetails', 'officeProposalId'): _guarded_json('proposalOrderDetails', "json_extract(proposalOrderDetails, '$.officeProposalId')"),
+    ('proposalOrderDetails', 'departmentWorkOrderId'): _guarded_json('proposalOrderDetails', "json_extract(proposalOrderDetails, '$.departmentWorkOrderId')"),
+    ('billOfMaterials', 'items'): _guarded_json('billOfMaterials', "json_array_length(billOfMaterials, '$.items')"),
+}
+
+def decode_project_section(key, raw_value):
+    """ Decodes one JSON section column, falling back to a fresh template value when empty or corrupt. """
+    if isinstance(raw_value, str) and raw_value:
+        try: return json.loads(raw_value)
+        except json.JSONDecodeError: pass
+    elif isinstance(raw_value, (dict, list)):
+        return raw_value
+    return copy.deepcopy(initial_project_data_template[key])
+
+class ProjectRecord(Mapping):
+    """
+    Read-only view of a saved project for the in-memory project index.
+    Scalar columns and a few summary values are loaded up front; each JSON
+    section is fetched and decoded from the database on first access.
+    """
+    def __init__(self, db_path, values, summary=None):
+        self.db_path = db_path
+        self._values = dict(values)
+        self._summary = dict(summary or {})
+
+    @classmethod
+    def from_summary_row(cls, db_path, row):
+        values = {k: row[k] for k in PROJECT_SCALAR_KEYS}
+        summary = {field: row[f"summary_{i}"] for i, field in enumerate(PROJECT_SUMMARY_FIELDS)}
+        return cls(db_path, values, summary)
+
+    @staticmethod
+    def summary_select_sql():
+        """ Column list for the projection that from_summary_row() expects. """
+        fields = [f"{expr} AS summary_{i}" for i, expr in enumerate(PROJECT_SUMMARY_FIELDS.values())]
+        return ", ".join(PROJECT_SCALAR_KEYS + fields)
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            if key not in PROJECT_SECTION_KEYS: raise KeyError(key)
+            self._load_sections([key])
+        return self._values[key]
+
+    def __iter__(self):
+        yield from self._values
+        yield from (k for k in PROJECT_SECTION_KEYS if k not in self._values)
+
+    def __len__(self):
+        return len(self._values) + sum(1 for k in PROJECT_SECTION_KEYS if k not in self._values)
+
+    def __contains__(self, key):
+        return key in self._values or key in PROJECT_SECTION_KEYS
+
+    def is_loaded(self, key):
+        return key in self._values
+
+    def peek(self, section, field):
+        """ Reads a field inside a section without loading the section; good for presence checks only. """
+        if section in self._values:
+            return (self._values[section] or {}).get(field)
+        return self._summary.get((section, field))
+
+    def _load_sections(self, keys):
+        columns = ", ".join(keys)
+        # A plain read, not `with conn:`: the pooled connection may be inside a caller's transaction, which must not be committed here.
+        row = get_db_connection(self.db_path).execute(f"SELECT {columns} FROM projects WHERE id = ?", (self._values['id'],)).fetchone()
+        for i, key in enumerate(keys):
+            self._values[key] = decode_project_section(key, row[i] if row else None)
+
+    def hydrate(self):
+        """ Loads every remaining section in one query and returns the complete project as a plain dict. """
+        missing = [k for k in PROJECT_SECTION_KEYS if k not in self._values]
+        if missing: self._load_sections(missing)
+        return dict(self._values)
+
+    def updated(self, changes):
+        """ Returns a new record with changes applied; loaded sections are shared, the rest stay lazy. """
+        values = dict(self._values); values.update(changes)
+        return ProjectRecord(self.db_path, values, self._summary)
+
+class CopyOnWriteProject(dict):
+    """
+    Editable working copy of a project. It starts as a shallow copy, sharing its
+    section objects with the cached snapshot (or the template), and deep-copies a
+    section the first time it is handed out (indexing, get, setdefault, pop, items,
+    values, iteration-based copies such as dict(project)), so opening a project
+    copies nothing and untouched sections are never copied. raw_items() is the one
+    read-only view of the shared objects, for comparing against the snapshot.
+    """
+    def __init__(self, base=None):
+        super().__init__(base or {})
+        self._owned = set()
+
+    def _own(self, key):
+        value = dict.__getitem__(self, key)
+        if key not in self._owned:
+            if isinstance(value, (dict, list)):
+                value = copy.deepcopy(value)
+                dict.__setitem__(self, key, value)
+            self._owned.add(key)
+        return value
+
+    def __getitem__(self, key):
+        if dict.__contains__(self, key): return self._own(key)
+        return dict.__getitem__(self, key)
+
+    def __iter__(self):
+        # Overriding __iter__ also makes dict(project) and {**project} go through keys()/__getitem__.
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        return self._own(key) if dict.__contains__(self, key) else default
+
+    def setdefault(self, key, default=None):
+        if not dict.__contains__(self, key): self[key] = default
+        return self._own(key)
+
+    def pop(self, key, *default):
+        if dict.__contains__(self, key): self._own(key)
+        self._owned.discard(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key = next(reversed(dict.keys(self)))
+        return key, self.pop(key)
+
+    def items(self):
+        return [(key, self._own(key)) for key in dict.keys(self)]
+
+    def values(self):
+        return [self._own(key) for key in dict.keys(self)]
+
+    def raw_items(self):
+        """ (key, value) pairs without copying; values may be shared with the snapshot and must not be modified. """
+        return dict.items(self)
+
+    def copy(self):
+        return dict(self)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._owned.add(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items(): self[key] = value
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(dict(self.raw_items()), memo)
+
+# --- Full-text search document for a project ---
+# Column order matches the projects_fts virtual table; weights are used by bm25() when ranking.
+PROJECT_FTS_COLUMNS = ["name", "department", "refs", "bom", "parties", "transactions", "documents"]
+PROJECT_FTS_WEIGHTS = [10.0, 4.0, 6.0, 3.0, 4.0, 1.0, 1.0]
+PROJECT_FTS_PAGE_SIZE = 500  # quick-search results fetched per page
+# Sections whose contents feed the index; a save that touches none of them leaves the index alone.
+PROJECT_FTS_SOURCE_SECTIONS = {
+    "projectName", "departmentDetails", "oemVendorDetails", "proposalOrderDetails", "oenDetails",
+    "billOfMaterials", "tenderDetails", "limitedTenderDetails", "financialDetails", "vendorPayments",
+    "departmentEnquiryDetails", "scopeOfWorkDetails", "fulfillmentDocs",
+}
+
+def _collect_document_names(value, names):
+    """Walks a project section and collects the file names of every attached document."""
+    if isinstance(value, dict):
+        if 'path' in value and value.get('name'): names.append(str(value['name']))
+        for v in value.values(): _collect_document_names(v, names)
+    elif isinstance(value, list):
+        for v in value: _collect_document_names(v, names)
+
+def department_search_text(name, address):
+    """ Text of the projects_fts 'department' column for a department. """
+    return " ".join(str(v) for v in (name, address) if v not in (None, ""))
+
+def build_project_search_row(project):
+    """ Flattens a project into the text columns of the projects_fts index (see PROJECT_FTS_COLUMNS). """
+    def joined(*values): return " ".join(str(v) for v in values if v not in (None, ""))
+    dept = project.get('departmentDetails') or {}
+    oem = project.get('oemVendorDetails') or {}
+    proposal = project.get('proposalOrderDetails') or {}
+    oen = project.get('oenDetails') or {}
+    bom_items = (project.get('billOfMaterials') or {}).get('items', [])
+    tender = project.get('tenderDetails') or {}
+    limited = project.get('limitedTenderDetails') or {}
+    transactions = (project.get('financialDetails') or {}).get('transactions', [])
+    vendor_payments = project.get('vendorPayments') or []
+
+    bidders = [b.get('name') for b in tender.get('bidders', []) + limited.get('bidders', []) if isinstance(b, dict)]
+    documents = []
+    for section in PROJECT_FTS_SOURCE_SECTIONS:
+        _collect_document_names(project.get(section), documents)
+
+    return (
+        joined(project.get('projectName')),
+        department_search_text(dept.get('name'), dept.get('address')),
+        joined(dept.get('memoId'), proposal.get('officeProposalId'), proposal.get('departmentWorkOrderId'),
+               oen.get('oenRegistrationNo'), oen.get('officeOenNo'), oen.get('officeWorkOrderId'),
+               *[(p.get('invoice') or {}).get('refNo') for p in vendor_payments],
+               *[(p.get('challan') or {}).get('refNo') for p in vendor_payments]),
+        joined(*[joined(i.get('hsn'), i.get('item'), i.get('specs')) for i in bom_items]),
+        joined(oem.get('oemName'), oem.get('vendorName'), tender.get('qualifiedBidder'), limited.get('winner'), *bidders),
+        joined(*[t.get('transactionDetails') for t in transactions]),
+        joined(*documents),
+    )
+
+def build_fts_query(text):
+    """ Turns free text into an FTS5 MATCH expression: every word must match, each as a prefix. """
+    terms = [t.replace('"', '""') for t in text.split() if t.strip('"')]
+    return " ".join(f'"{t}"*' for t in terms)
+
 def convert_number_to_words(number):
     # This function is purely computational and remains unchanged.
     if not isinstance(number, (int, float)): return "Invalid Number"
@@ -377,19 +770,205 @@ def convert_number_to_words(number):
         final_words += f" and Paise {paise_words}"
     return final_words.strip() + " Only"
 
-def log_activity(message, project_id=None):
-    """Appends a structured log entry (JSON) to the activity log."""
-    log_file_path = get_app_config_base_path() / "activity_log.json"
+def get_activity_log_database_path():
+    """ Returns the path to the activity log database, kept next to the config file. """
+    return str(get_app_config_base_path() / "activity_log.db")
+
+_activity_log_initialized = False
+_activity_log_init_lock = threading.Lock()
+_activity_log_scope = None
+
+def activity_log_scope_key(db_path):
+    """ The value stored in activity_log.source_db for a working folder's projects database. """
+    return os.path.normcase(os.path.abspath(str(db_path)))
+
+def init_activity_log_db(db_path=None):
+    """
+    Creates the activity_log table and its indexes. An old activity_log.json file
+    is imported once and renamed, so the home screen never has to read it again.
+    """
+    global _activity_log_initialized
+    if _activity_log_initialized: return
+    # The GUI thread and the writer thread can both get here first; only one may import the legacy file.
+    with _activity_log_init_lock:
+        if _activity_log_initialized: return
+        db_path = db_path or get_activity_log_database_path()
+        with get_db_connection(db_path) as conn:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS activity_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                message TEXT,
+                project_id INTEGER,
+                source_db TEXT
+            )''')
+            # Project ids restart in every working folder, so each entry records which projects database it belongs to.
+            if "source_db" not in {row[1] for row in conn.execute("PRAGMA table_info(activity_log)")}:
+                conn.execute("ALTER TABLE activity_log ADD COLUMN source_db TEXT")
+            # (source_db, id) serves the newest-first home feed, (source_db, project_id, timestamp) a project's history.
+            conn.execute("DROP INDEX IF EXISTS idx_activity_log_project")
+            conn.execute("DROP INDEX IF EXISTS idx_activity_log_timestamp")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_log_recent ON activity_log (source_db, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_log_scope ON activity_log (source_db, project_id, timestamp)")
+
+            legacy_log = get_app_config_base_path() / "activity_log.json"
+            if legacy_log.exists():
+                entries = []
+                with open(legacy_log, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try: entry = json.loads(line)
+                        except json.JSONDecodeError: continue
+                        if isinstance(entry, dict) and entry.get("timestamp"):
+                            entries.append((entry["timestamp"], entry.get("message", ""), entry.get("project_id")))
+                conn.executemany("INSERT INTO activity_log (timestamp, message, project_id) VALUES (?, ?, ?)", entries)
+            else:
+                legacy_log = None
+        # Renamed only after the import has been committed.
+        if legacy_log: legacy_log.replace(legacy_log.with_name("activity_log.json.migrated"))
+        _activity_log_initialized = True
+
+def set_activity_log_scope(db_path):
+    """
+    Makes db_path's working folder the one new entries are recorded against and the
+    history is read from. Entries written before the log was scoped are adopted by
+    the first working folder opened after the upgrade, the one they most likely came from.
+    """
+    global _activity_log_scope
+    flush_activity_log()
+    _activity_log_scope = activity_log_scope_key(db_path)
+    try:
+        init_activity_log_db()
+        with get_db_connection(get_activity_log_database_path()) as conn:
+            conn.execute("UPDATE activity_log SET source_db = ? WHERE source_db IS NULL", (_activity_log_scope,))
+    except (sqlite3.Error, OSError) as e:
+        print(f"Failed to migrate activity log: {e}")
+
+class _ActivityLogWriter:
+    """
+    Buffers activity entries in memory and writes them to the activity_log table in
+    batches from a background thread: every FLUSH_INTERVAL seconds, or sooner once
+    FLUSH_THRESHOLD entries are waiting. flush() writes everything pending right away.
+    """
+    FLUSH_INTERVAL = 2.0
+    FLUSH_THRESHOLD = 50
+
+    def __init__(self):
+        self._pending = []
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()   # keeps batches in order between the thread and flush()
+        self._thread = None
+        self._stopping = False
+
+    def add(self, entry):
+        with self._condition:
+            self._pending.append(entry)
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="ActivityLogWriter", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.FLUSH_THRESHOLD:
+                self._condition.notify()
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._stopping or len(self._pending) >= self.FLUSH_THRESHOLD, timeout=self.FLUSH_INTERVAL)
+                    stopping = self._stopping
+                self._write_pending()
+                if stopping: break
+        finally:
+            release_thread_db_connections()
+
+    def _write_pending(self):
+        with self._write_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+            if not batch: return
+            try:
+                if not _activity_log_initialized: init_activity_log_db()
+                with get_db_connection(get_activity_log_database_path()) as conn:
+                    conn.executemany("INSERT INTO activity_log (timestamp, message, project_id, source_db) VALUES (?, ?, ?, ?)", batch)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Failed to write to activity log: {e}")
+
+    def flush(self):
+        self._write_pending()
+
+    def shutdown(self):
+        """ Writes everything still queued and stops the background thread. """
+        with self._condition:
+            thread = self._thread
+            self._stopping = True
+            self._condition.notify()
+        if thread is not None: thread.join()
+        self._write_pending()
+
+_activity_log_writer = _ActivityLogWriter()
+
+def log_activity(message, project_id=None, db_path=None):
+    """
+    Queues a structured entry for the activity log; it is written in the next batch.
+    It is recorded against db_path's working folder, or the current one if not given.
+    """
     timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
-    
-    log_entry = {
-        "timestamp": timestamp,
-        "message": message,
-        "project_id": project_id
-    }
-    
+    source_db = activity_log_scope_key(db_path) if db_path else _activity_log_scope
+    _activity_log_writer.add((timestamp, message, project_id, source_db))
+
+def flush_activity_log():
+    """Writes all queued activity entries now (blocking)."""
+    _activity_log_writer.flush()
+
+def shutdown_activity_log():
+    """Flushes the activity log and stops its writer thread. Call on exit/restart."""
+    _activity_log_writer.shutdown()
+
+def get_recent_activity(limit=200):
+    """Returns the current working folder's newest log entries first, as dicts with timestamp, message and project_id."""
+    flush_activity_log()
     try:
-        with open(log_file_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(log_entry) + '\n')
-    except Exception as e:
-        print(f"Failed to write to activity log: {e}")
+        if not _activity_log_initialized: init_activity_log_db()
+        with get_db_connection(get_activity_log_database_path()) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute("SELECT timestamp, message, project_id FROM activity_log WHERE source_db IS ? ORDER BY id DESC LIMIT ?",
+                           (_activity_log_scope, limit))
+            return [dict(row) for row in cursor.fetchall()]
+    except (sqlite3.Error, OSError) as e:
+        print(f"Failed to read activity log: {e}")
+        return []
+
+def get_project_activity(project_id, before=None, limit=50):
+    """
+    Returns one page of a project's history, newest first. Pass the (timestamp, id)
+    of the last row of the previous page as `before` to get the next page; the
+    (source_db, project_id, timestamp) index serves every page without an OFFSET scan.
+    """
+    flush_activity_log()
+    try:
+        if not _activity_log_initialized: init_activity_log_db()
+        with get_db_connection(get_activity_log_database_path()) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            if before is None:
+                cursor.execute("SELECT id, timestamp, message FROM activity_log WHERE source_db IS ? AND project_id = ? "
+                               "ORDER BY timestamp DESC, id DESC LIMIT ?", (_activity_log_scope, project_id, limit))
+            else:
+                cursor.execute("SELECT id, timestamp, message FROM activity_log WHERE source_db IS ? AND project_id = ? AND (timestamp, id) < (?, ?) "
+                               "ORDER BY timestamp DESC, id DESC LIMIT ?", (_activity_log_scope, project_id, before[0], before[1], limit))
+            return [dict(row) for row in cursor.fetchall()]
+    except (sqlite3.Error, OSError) as e:
+        print(f"Failed to read project activity: {e}")
+        return []
+
+def count_project_activity(project_id):
+    """Number of activity entries recorded for a project."""
+    flush_activity_log()
+    try:
+        if not _activity_log_initialized: init_activity_log_db()
+        with get_db_connection(get_activity_log_database_path()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM activity_log WHERE source_db IS ? AND project_id = ?",
+                                (_activity_log_scope, project_id)).fetchone()[0]
+    except (sqlite3.Error, OSError) as e:
+        print(f"Failed to count project activity: {e}")
+        return 0